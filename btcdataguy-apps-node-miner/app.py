@@ -1,157 +1,228 @@
 #!/usr/bin/env python3
-from flask import Flask, jsonify, request, send_file, send_from_directory
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
-import json
 import subprocess
+import selectors
+import json
+import logging
 import os
 import signal
 import psutil
-import re
+import threading
 from threading import Thread
 import time
+import statistics
+from bisect import bisect_left
+
+from miner_parser import (
+    parse_line, to_hs, CoreHashrate, ShareResult, ShareFound, ShareDifficulty,
+    StratumDifficulty, NewJob, MinerError
+)
+from buffers import TimeSeriesBuffer, LineBuffer, CoreHistory
+from config_store import ConfigStore
+from events import EventHub, encode_event
+from system_stats import SystemStatsSampler
+from hashrate_store import HashrateStore
+from downsample import METHODS as DOWNSAMPLE_METHODS, average_buckets
+from stratum import probe_pool
+from pool_manager import PoolManager
+from stratum_proxy import StratumProxy
+from fleet import FleetPoller, peer_entry
+from throttle import create_throttle, available_backends
+from tuner import TuneJob, affinity_mask
+from governor import Governor
+from placement import Placement, parse_cpu_list
+from start_job import StartJob
+from miner_session import MinerSession, StatusCache
+from logs import setup_logging, suppressed_counts
+from estimator import ESTIMATORS, create_estimator
+from metrics import Registry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from serving import StaticFiles, HtmlPage, compress
+from session_ledger import SessionLedger
 
-app = Flask(__name__)
+try:
+    from waitress import serve as waitress_serve
+except ImportError:  # Optional - falls back to the Flask development server
+    waitress_serve = None
+
+app = Flask(__name__, static_folder=None)  # /static is served by send_static
 CORS(app)
 
 # Configuration file path
 CONFIG_FILE = '/data/config.json' if os.path.exists('/data') else 'config.json'
+# Persistent data (hashrate history etc.)
+DATA_DIR = '/data' if os.path.exists('/data') else '.'
+# HTTP server: waitress, or the Flask development server with HTTP_SERVER=flask
+HTTP_SERVER = os.environ.get('HTTP_SERVER', 'waitress')
+HTTP_THREADS = int(os.environ.get('HTTP_THREADS', '16'))
+# Every open /api/stream holds a server thread; these stay free for everything else
+HTTP_RESERVED_THREADS = 6
+STREAM_CLIENTS = max(1, HTTP_THREADS - HTTP_RESERVED_THREADS)
+
+# cpuminer errors that count towards pool failover
+CONNECTION_ERRORS = {'connection_failed', 'connection_refused', 'dns_failed', 'empty_reply',
+                     'connection_interrupted', 'timeout'}
 
-# Global variables for miner process
-miner_process = None
-cpulimit_process = None
-miner_output = []
-current_hashrate = "0 H/s"
-current_hashrate_value = 0.0
-current_hashrate_unit = "kH"
-cpu_core_hashrates = {}  # {"CPU #0": {"value": 2205.0, "timestamp": 1704545557.123}}
-last_accepted_hashrate = 0.0
-hashrate_history = []
+# Buffer sizes
+MINER_OUTPUT_LINES = 500       # Terminal output lines kept in memory
+CHART_HISTORY_POINTS = 300     # 10 minutes at 2-second intervals
+CHART_HISTORY_SECONDS = 10 * 60
+CORE_HISTORY_POINTS = 900      # Per-core rates: 30 minutes at 2-second intervals
+SLOW_CORE_RATIO = 0.85         # Cores averaging below this share of the median are flagged
+
+# stdout, the /api/logs ring and rotated miner output files (logs.py)
+log_ring = setup_logging(DATA_DIR)
+log = logging.getLogger('node_miner')
+hashrate_log = logging.getLogger('node_miner.hashrate')  # rate-limited
+chart_log = logging.getLogger('node_miner.chart')  # rate-limited
+output_log = logging.getLogger('miner_output')  # miner.log files only
+
+# The miner: process, throttle, hashrate and difficulty tracking (miner_session.py)
+miner = MinerSession()
+throttle_backends = None  # Backends usable on this system, detected once
+tune_job = None  # Latest benchmark sweep (tuner.py)
+miner_output = LineBuffer(MINER_OUTPUT_LINES)  # Every line gets a sequence number for incremental polling
+hashrate_history = TimeSeriesBuffer(300)
 # Dedizierte Variablen für Chart (getrennt von anderen Systemen)
-chart_history = []  # Nur für den Chart, wird nirgendwo anders verwendet
-mining_stopped_time = None  # Timestamp when mining was stopped (for smooth chart transition)
-session_best_difficulty = 0.0
-all_time_best_difficulty = 0.0
-mining_start_time = None
+# Nur für den Chart, wird nirgendwo anders verwendet (timestamps in ms, values in H/s)
+chart_history = TimeSeriesBuffer(CHART_HISTORY_POINTS, max_age=CHART_HISTORY_SECONDS * 1000)
+# Per-core rates on the same 2-second ticks (timestamps in ms, values in H/s), for /api/cores
+core_history = CoreHistory(CORE_HISTORY_POINTS)
+# Live updates for /api/stream (Server-Sent Events)
+event_hub = EventHub(max_subscribers=STREAM_CLIENTS)
+# CPU / RAM / temperature sampled every 2 seconds by one background thread
+system_sampler = SystemStatsSampler(interval=2.0, history_points=CHART_HISTORY_POINTS)
+# On-disk hashrate history (raw 2s / minute / hour tiers), fed by chart_history_writer
+hashrate_store = HashrateStore(os.path.join(DATA_DIR, 'hashrate'), raw_interval=2.0)
+# Every mining session (pool, budget, results) in SQLite, for /api/sessions
+session_ledger = SessionLedger(os.path.join(DATA_DIR, 'sessions.db'))
+# /api/status payload, built once per chart tick (or on demand when older than 1 second)
+status_cache = StatusCache(lambda: build_status(), max_age=1.0)
+# Pool list, latency ranking and failover decisions
+pool_manager = PoolManager()
+
+# /metrics (Prometheus text format). Miner metrics are only written by the reader thread - no locks.
+metrics = Registry()
+metrics.gauge('node_miner_running', "1 while the miner process is running",
+              function=lambda: int(miner.snapshot.running))
+metrics.gauge('node_miner_hashrate_hs', "Total hashrate (weighted accepted/per-core) in H/s",
+              function=lambda: miner.snapshot.hashrate_hs)
+metrics.gauge('node_miner_hashrate_band_hs', "95% band of the hashrate estimate in H/s", ('bound',),
+              function=lambda: [(('low',), miner.snapshot.hashrate_low_hs), (('high',), miner.snapshot.hashrate_high_hs)])
+metrics.gauge('node_miner_core_hashrate_hs', "Per-core hashrate reported by cpuminer in H/s", ('core',),
+              function=lambda: core_hashrates_hs(miner.snapshot))
+metric_shares = metrics.counter('node_miner_shares_total', "Shares answered by the pool", ('result',))
+metric_shares_accepted = metric_shares.labels('accepted')
+metric_shares_rejected = metric_shares.labels('rejected')
+metric_lines = metrics.counter('node_miner_lines_parsed_total', "Miner output lines processed")
+metric_reconnects = metrics.counter('node_miner_pool_reconnects_total', "Pool connection errors (cpuminer reconnects after each)")
+metric_share_difficulty = metrics.histogram(
+    'node_miner_share_difficulty', "Difficulty of found shares",
+    (0.0001, 0.001, 0.01, 0.1, 1, 10, 100, 1000, 10000, 100000, 1000000))
+metric_share_latency = metrics.histogram(
+    'node_miner_share_accept_latency_seconds', "Share submit to pool answer",
+    (0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+metric_line_time = metrics.histogram(
+    'node_miner_line_processing_seconds', "Parsing and bookkeeping time per miner output line",
+    (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01))
+metric_requests = metrics.histogram(
+    'node_miner_http_request_duration_seconds', "HTTP request handling time", (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+    ('endpoint',), lock=True)
+metrics.gauge('node_miner_threads', "Threads in the app process", function=threading.active_count)
+# Optional Stratum aggregation proxy (one upstream connection for many miners)
+stratum_proxy = StratumProxy(host='0.0.0.0', port=3334)
+# Fleet view: other node-miner instances polled concurrently (fleet_peers in config)
+fleet_poller = FleetPoller()
+# Lowers the CPU budget live when the box runs hot or the node needs the CPU
+governor = Governor(temperature=lambda: get_system_stats()['cpu_temp'])
+
+# Default config (written on first start)
+DEFAULT_CONFIG = {
+    "pool_url": "",
+    "pools": [],  # Optional failover list: [{"url": "...", "priority": 0}], lower priority = preferred
+    "pool_failover": True,
+    "pool_failure_threshold": 3,  # Consecutive connection errors before switching
+    "pool_stall_minutes": 20,  # Switch if no share was accepted for this long (0 = off)
+    "pool_probe_interval": 300,
+    "proxy_enabled": False,  # Run the Stratum proxy and point the local miner at it
+    "proxy_port": 3334,
+    "fleet_peers": [],  # Other node-miner instances: ["http://host:5000", {"url": "...", "name": "..."}]
+    "fleet_poll_interval": 5,
+    "fleet_timeout": 3,
+    "btc_address": "",
+    "worker_name": "",
+    "cpu_percentage": 10,
+    "throttle_backend": "auto",  # auto, cgroup, threads or cpulimit
+    "hashrate_estimator": "ewma",  # ewma, kalman or blend (the old fixed 70/30)
+    "hashrate_half_life": 30,  # Seconds until a hashrate sample counts half
+    "miner_cpus": "",  # CPUs the miner may use, e.g. "2-7" (empty = all)
+    "reserve_cores": 0,  # Keep the first N CPUs free for the node
+    "miner_nice": 0,  # 0-19
+    "miner_sched_idle": False,  # Only mine when nothing else wants the CPU
+    "tune_profile": None,  # Best threads/affinity/throttle found by the tune job
+    "use_tune_profile": True,
+    "governor_enabled": False,  # Adjust the CPU budget live (never above cpu_percentage)
+    "governor_temp_target": 75,  # °C
+    "governor_min_percentage": 5,
+    "governor_headroom": 10,  # % of total CPU kept free for bitcoind, electrs, ...
+    "mining_active": False,
+    "all_time_best_difficulty": 0.0,
+    "all_time_best_difficulty_date": None
+}
+
+# Parsed config kept in memory, re-read only when config.json changes on disk
+config_store = ConfigStore(CONFIG_FILE, DEFAULT_CONFIG)
+# Config ETags are "<process start>-<config version>", so a restart never reuses one
+CONFIG_ETAG_PREFIX = f"{int(time.time()):x}"
+
+# Fingerprinted static files and the dashboard page (serving.py)
+static_files = StaticFiles(os.path.join(app.root_path, 'static'))
+index_page = HtmlPage(os.path.join(app.root_path, 'index.html'), static_files)
 
 def load_config():
-    """Load configuration from JSON file"""
-    try:
-        if os.path.exists(CONFIG_FILE):
-            with open(CONFIG_FILE, 'r') as f:
-                return json.load(f)
-        else:
-            # Return default config
-            default_config = {
-                "pool_url": "",
-                "btc_address": "",
-                "worker_name": "",
-                "cpu_percentage": 10,
-                "mining_active": False,
-                "all_time_best_difficulty": 0.0,
-                "all_time_best_difficulty_date": None
-            }
-            save_config(default_config)
-            return default_config
-    except Exception as e:
-        print(f"Error loading config: {e}")
-        return {
-            "pool_url": "",
-            "btc_address": "",
-            "worker_name": "",
-            "cpu_percentage": 50,
-            "mining_active": False,
-            "all_time_best_difficulty": 0.0,
-            "all_time_best_difficulty_date": None
-        }
+    """Load configuration (cached, re-read only when the JSON file changes)"""
+    return config_store.load()
 
 def save_config(config):
-    """Save configuration to JSON file"""
-    try:
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(config, f, indent=2)
-        return True
-    except Exception as e:
-        print(f"Error saving config: {e}")
-        return False
+    """Save configuration to JSON file (atomic replace)"""
+    return config_store.save(config)
 
-def calculate_cpu_limit(cpu_percentage):
+def calculate_cpu_limit(cpu_percentage, cpu_count=None):
     """Calculate cpulimit value based on CPU percentage
     
     cpulimit uses a percentage relative to a single core.
     For multi-core systems: 100% = 1 core, 200% = 2 cores, etc.
     So for 4 cores at 50% usage: 50 * 4 = 200%
+    cpu_count is the number of CPUs the miner may use (default: all).
     """
-    cpu_count = psutil.cpu_count()
+    if cpu_count is None:
+        cpu_count = psutil.cpu_count()
     limit = int(cpu_percentage * cpu_count)
     return limit
 
+def get_throttle_backends():
+    """Which throttling backends work here (cgroup detection runs once)"""
+    global throttle_backends
+    if throttle_backends is None:
+        throttle_backends = available_backends()
+    return throttle_backends
+
 def get_system_stats():
-    """Get live system statistics"""
-    stats = {
-        'cpu_usage_live': 0.0,
-        'cpu_temp': None,
-        'cpu_temp_warning': None,
-        'ram_used_gb': 0.0,
-        'ram_total_gb': 0.0,
-        'ram_percent': 0.0
-    }
-    
-    try:
-        # Non-blocking CPU usage measurement
-        # Uses system average since last call (more accurate, no blocking)
-        stats['cpu_usage_live'] = psutil.cpu_percent(interval=None)
-        
-        # RAM usage
-        ram = psutil.virtual_memory()
-        stats['ram_used_gb'] = round(ram.used / (1024**3), 1)
-        stats['ram_total_gb'] = round(ram.total / (1024**3), 1)
-        stats['ram_percent'] = ram.percent
-        
-        # CPU Temperature - try different sensor names
-        try:
-            temps = psutil.sensors_temperatures()
-            
-            # Try common sensor names
-            if 'coretemp' in temps and temps['coretemp']:
-                # Linux desktop/server (Intel/AMD)
-                stats['cpu_temp'] = round(temps['coretemp'][0].current, 1)
-            elif 'cpu_thermal' in temps and temps['cpu_thermal']:
-                # Raspberry Pi
-                stats['cpu_temp'] = round(temps['cpu_thermal'][0].current, 1)
-            elif 'k10temp' in temps and temps['k10temp']:
-                # AMD Ryzen
-                stats['cpu_temp'] = round(temps['k10temp'][0].current, 1)
-            elif 'zenpower' in temps and temps['zenpower']:
-                # AMD Ryzen (alternative driver)
-                stats['cpu_temp'] = round(temps['zenpower'][0].current, 1)
-            else:
-                # No known sensor found
-                if temps:
-                    # Try first available sensor
-                    first_sensor = list(temps.keys())[0]
-                    if temps[first_sensor]:
-                        stats['cpu_temp'] = round(temps[first_sensor][0].current, 1)
-                    else:
-                        stats['cpu_temp_warning'] = 'Temperature sensor not available'
-                else:
-                    stats['cpu_temp_warning'] = 'Temperature sensor not available'
-        except (AttributeError, OSError):
-            # sensors_temperatures() not supported on this system
-            stats['cpu_temp_warning'] = 'Temperature sensor not available'
-    
-    except Exception as e:
-        print(f"Error getting system stats: {e}")
-    
-    return stats
+    """Get live system statistics (latest snapshot from the background sampler)"""
+    return system_sampler.snapshot()
 
 def get_mining_uptime():
     """Get mining uptime in seconds"""
-    global mining_start_time
+    start_time = miner.snapshot.start_time
     
-    if mining_start_time is None:
+    if start_time is None:
         return 0
     
-    return time.time() - mining_start_time
+    return time.time() - start_time
+
+def core_hashrates_hs(snapshot):
+    """[((core id,), H/s), ...] from a session snapshot"""
+    return [((core,), hs) for core, hs, _ in snapshot.cores]
 
 def format_uptime(seconds):
     """Format uptime seconds to HH:MM:SS"""
@@ -187,232 +258,368 @@ def normalize_pool_url(pool_url):
     
     return pool_url
 
+def configured_pools(config):
+    """Pool list from config ('pools', falling back to the single 'pool_url')"""
+    pools = []
+    for index, pool in enumerate(config.get('pools') or []):
+        if isinstance(pool, str):
+            pool = {'url': pool}
+        url = normalize_pool_url(pool.get('url', ''))
+        if url:
+            pools.append({'url': url, 'priority': pool.get('priority', index)})
+    if not pools and config.get('pool_url'):
+        pools.append({'url': normalize_pool_url(config['pool_url']), 'priority': 0})
+    return pools
+
+def select_pool(config, username, password):
+    """Load the pool list into the pool manager and pick the best pool"""
+    pool_manager.failure_threshold = config.get('pool_failure_threshold', 3)
+    pool_manager.stall_minutes = config.get('pool_stall_minutes', 20)
+    pool_manager.probe_interval = config.get('pool_probe_interval', 300)
+    pool_manager.set_pools(configured_pools(config))
+    pool_manager.set_credentials(username, password)
+    
+    if len(pool_manager.urls) > 1:
+        # Probe all pools concurrently (a few seconds at most) and rank them
+        for result in pool_manager.probe_all(timeout=5):
+            status = f"{result['connect_ms']}ms" if result['ok'] else result['error_code']
+            log.info(f"Pool probe: {result['pool_url']}: {status}")
+    return pool_manager.best()
+
+def mining_credentials(config):
+    """Stratum username/password for the configured address (start difficulty 0.1)"""
+    return f"{config.get('btc_address', '')}.{config.get('worker_name', 'worker1')}", "d=0.1"
+
+def start_proxy(config, pool_url=None):
+    """Start the Stratum proxy (or switch its upstream) on the given or best pool"""
+    username, password = mining_credentials(config)
+    if pool_url is None:
+        pool_url = select_pool(config, username, password)
+    if not pool_url:
+        return False, "Pool URL is required"
+    if not stratum_proxy.running:
+        stratum_proxy.port = config.get('proxy_port', 3334)
+    return stratum_proxy.start(pool_url, username, password)
+
+def configure_fleet(config):
+    """Apply the fleet settings from config to the poller"""
+    fleet_poller.interval = max(1, config.get('fleet_poll_interval', 5))
+    fleet_poller.timeout = max(0.5, config.get('fleet_timeout', 3))
+    fleet_poller.set_peers(config.get('fleet_peers') or [])
+
+def configure_governor(config):
+    """Apply the governor settings from the config"""
+    governor.configure(
+        bool(config.get('governor_enabled', False)),
+        float(config.get('governor_temp_target', 75)),
+        int(config.get('governor_min_percentage', 5)),
+        float(config.get('governor_headroom', 10))
+    )
+
+def get_tune_profile(config, placement):
+    """Saved tune profile if enabled and still valid for this box, CPU set and budget"""
+    profile = config.get('tune_profile')
+    if not profile or not config.get('use_tune_profile', True):
+        return None
+    if profile.get('cpu_count') != placement.cpu_count or profile.get('cpu_percentage', 0) > config.get('cpu_percentage', 10):
+        # Tuned on other hardware or for a higher budget than allowed now
+        return None
+    if profile.get('cpus') and not set(profile['cpus']) <= set(placement.cpus):
+        # Tuned affinity would move threads out of the miner's CPU set
+        return None
+    return profile
+
+def save_tune_profile(profile):
+    """Store the best profile found by the tune job"""
+    config_store.update({'tune_profile': profile})
+    log.info(f"Tune profile saved: {profile['threads']} threads, affinity {profile['affinity']}, "
+             f"{profile['cpu_percentage']}% via {profile['backend']} = {profile['hashrate_hs']:.0f} H/s")
+
+def failover_enabled():
+    return len(pool_manager.urls) > 1 and load_config().get('pool_failover', True)
+
+def switch_pool(reason):
+    """Restart the miner on the next best pool (runs on its own thread, after miner.try_begin_switch())"""
+    try:
+        previous = pool_manager.active_url
+        next_url = pool_manager.next_pool()
+        if next_url is None:
+            log.warning(f"⚠️ {reason}, but no other pool is available - staying on {previous}")
+            pool_manager.reset_tracking()
+            return
+        
+        log.info(f"🔀 Switching pool {previous} -> {next_url}: {reason}")
+        stop_mining(switching=True, reason=f"failover: {reason}")
+        success, message, job = start_mining(load_config(), pool_url=next_url, failover_from=previous, reason=reason)
+        if success:
+            success, message = job.wait()
+        if not success:
+            log.warning(f"Pool switch failed: {message}")
+            miner.detach()  # Ends the session (chart cooldown starts now)
+            pool_manager.deactivate()
+    finally:
+        miner.end_switch()
+
 def save_hashrate_to_history(value, unit):
     """Save hashrate to history for charting (always in H/s for consistency)"""
-    global hashrate_history
-    
-    # Convert all values to H/s (base unit) for consistent charting
-    value_in_hs = value
-    if unit == 'kH':
-        value_in_hs = value * 1000
-    elif unit == 'MH':
-        value_in_hs = value * 1000000
-    elif unit == 'GH':
-        value_in_hs = value * 1000000000
-    # 'H' stays as is
-    
     # Convert to milliseconds for JavaScript Date compatibility
-    timestamp = time.time() * 1000
-    hashrate_history.append({
-        'timestamp': timestamp,
-        'value': value_in_hs,  # Always in H/s
-        'unit': 'H'            # Always H (base unit)
-    })
-    
-    # Keep only last 300 datapoints (10 minutes at 2-second intervals)
-    if len(hashrate_history) > 300:
-        hashrate_history.pop(0)
+    # Buffer keeps only the last 300 datapoints (10 minutes at 2-second intervals)
+    hashrate_history.append(time.time() * 1000, to_hs(value, unit))
 
 def add_to_chart_history(value, unit):
     """Add current hashrate to chart history (synchronized with UI updates)"""
-    global chart_history
-    
-    current_time = time.time()
-    
     # No rate limiting - updates are already naturally limited by miner output frequency
     
     # Convert all values to H/s (base unit) for consistent charting
-    value_in_hs = value
-    if unit == 'kH':
-        value_in_hs = value * 1000
-    elif unit == 'MH':
-        value_in_hs = value * 1000000
-    elif unit == 'GH':
-        value_in_hs = value * 1000000000
-    # 'H' stays as is
+    value_in_hs = to_hs(value, unit)
     
     # Convert to milliseconds for JavaScript Date compatibility
-    timestamp = current_time * 1000
-    chart_history.append({
-        'timestamp': timestamp,
-        'value': value_in_hs,  # Always in H/s
-        'unit': 'H'            # Always H (base unit)
-    })
-    
-    # Cleanup: Remove entries older than 10 minutes
-    ten_minutes_ago = (current_time * 1000) - (10 * 60 * 1000)
-    chart_history[:] = [
-        item for item in chart_history 
-        if item['timestamp'] > ten_minutes_ago
-    ]
-    
-    # Keep only last 300 datapoints
-    if len(chart_history) > 300:
-        chart_history.pop(0)
+    # The buffer drops entries older than 10 minutes and keeps at most 300 datapoints
+    timestamp = time.time() * 1000
+    chart_history.append(timestamp, value_in_hs)
     
-    print(f"Chart history updated: {len(chart_history)} datapoints, value: {value_in_hs:.1f} H/s")
+    chart_log.debug("Chart history updated: %d datapoints, value: %.1f H/s", len(chart_history), value_in_hs)
+    return timestamp, value_in_hs
+
+def publish_chart_point(point):
+    """Persist a new chart datapoint and push it to stream clients"""
+    timestamp, value_in_hs = point
+    hashrate_store.append(timestamp / 1000, value_in_hs)
+    event_hub.publish('hashrate', {'timestamp': timestamp, 'value': value_in_hs})
 
 def chart_history_writer():
     """Background thread that saves current hashrate to chart every 2 seconds when mining is active"""
-    global current_hashrate_value, current_hashrate_unit, chart_history, miner_process, mining_stopped_time
-    
     while True:
         time.sleep(2)  # Wait 2 seconds
         
-        # Check if mining is running
-        mining_active = miner_process is not None and miner_process.poll() is None
+        # One consistent view of the miner for this tick (estimate aged to now)
+        if miner.running:
+            miner.publish()
+        snapshot = miner.snapshot
+        value, unit = snapshot.hashrate_value, snapshot.hashrate_unit
         
-        if mining_active:
+        if miner.running:
             # Mining is active - write current hashrate
-            add_to_chart_history(current_hashrate_value, current_hashrate_unit)
-            print(f"Chart history writer: {current_hashrate_value:.1f} {current_hashrate_unit}/s")
-        elif mining_stopped_time is not None:
+            publish_chart_point(add_to_chart_history(value, unit))
+            core_history.record(time.time() * 1000, ((core, hs) for core, hs, _ in snapshot.cores))
+            session_ledger.sample(snapshot.hashrate_hs, get_system_stats()['cpu_temp'])
+            chart_log.debug("Chart history writer: %.1f %s/s", value, unit)
+        elif snapshot.stopped_time is not None:
             # Mining stopped recently - continue writing for smooth transition (30 seconds)
-            time_since_stop = time.time() - mining_stopped_time
+            time_since_stop = time.time() - snapshot.stopped_time
             if time_since_stop < 30:
                 # Still within 30 second grace period - write current value (should be declining to 0)
-                add_to_chart_history(current_hashrate_value, current_hashrate_unit)
-                print(f"Chart history writer (cooldown): {current_hashrate_value:.1f} {current_hashrate_unit}/s")
+                publish_chart_point(add_to_chart_history(value, unit))
+                chart_log.debug("Chart history writer (cooldown): %.1f %s/s", value, unit)
             # After 30 seconds: thread waits but doesn't write (chart frozen)
         # If mining never started: thread waits but doesn't write (no unnecessary 0-values)
+        
+        # Status snapshot (incl. system stats) built once per tick for /api/status and stream clients
+        _, status, _ = status_cache.refresh()
+        if event_hub.has_subscribers:
+            event_hub.publish('status', status)
 
-def update_hashrate_from_cores():
-    """Calculate hashrate from CPU core values with timeout cleanup"""
-    global cpu_core_hashrates, current_hashrate, current_hashrate_value, current_hashrate_unit
-    global last_accepted_hashrate
+def publish_output(lines, last_seq):
+    """Push new miner output lines to stream clients (same shape as LineBuffer.since)"""
+    event_hub.publish('output', {
+        'epoch': miner_output.epoch,
+        'first_seq': miner_output.first_seq,
+        'last_seq': last_seq,
+        'from_seq': last_seq - len(lines) + 1,
+        'lines': lines
+    })
+
+def handle_miner_line(session, line_str):
+    """Log buffer and stats for one miner output line. Returns the parsed event."""
+    started = time.perf_counter()
+    # Buffer keeps only the last 500 lines (increased for full output)
+    seq = miner_output.append(line_str)
+    if event_hub.has_subscribers:
+        publish_output([line_str], seq)
     
-    # Cleanup: Remove cores older than 30 seconds
-    current_time = time.time()
-    cpu_core_hashrates = {
-        k: v for k, v in cpu_core_hashrates.items()
-        if current_time - v["timestamp"] < 30
-    }
+    event = parse_line(line_str)
+    event_type = type(event)
+    metric_lines.inc()
     
-    # Calculate sum of all cores
-    cores_sum = sum(v["value"] for v in cpu_core_hashrates.values())
+    failover_reason = None
     
-    if cores_sum > 0:
-        # Weighted average: 70% accepted (precise), 30% cores_sum (current)
-        if last_accepted_hashrate > 0:
-            current_hashrate_value = (last_accepted_hashrate * 0.7) + (cores_sum * 0.3)
-        else:
-            # No accepted value yet, use only cores
-            current_hashrate_value = cores_sum
+    # PRIORITY 1: Track individual CPU cores (fast feedback!)
+    if event_type is CoreHashrate:
+        # Store core hashrate and recalculate the total
+        session.core_hashrate(event.core_id, event.hs)
+        snapshot = session.snapshot
         
-        current_hashrate = f"{current_hashrate_value:.1f} {current_hashrate_unit}/s"
+        hashrate_log.debug("Core update: %s = %s %s/s, Total: %s", event.core_id, event.value, event.unit, snapshot.hashrate)
         
-        # Chart history is now updated by background thread every 2 seconds
-
-def monitor_miner_output():
-    """Monitor miner output for hashrate and status"""
-    global miner_process, miner_output, current_hashrate
-    global current_hashrate_value, current_hashrate_unit
-    global cpu_core_hashrates, last_accepted_hashrate
-    global hashrate_history, session_best_difficulty, all_time_best_difficulty
+        # No accepted share for too long (only checked if shares are expected in the window)
+        if snapshot.stratum_difficulty and snapshot.hashrate_hs > 0:
+            expected_share_seconds = snapshot.stratum_difficulty * 2**32 / snapshot.hashrate_hs
+            if pool_manager.stalled(expected_share_seconds):
+                failover_reason = f"No accepted share for {pool_manager.stall_minutes} minutes"
     
-    if miner_process is None:
-        return
-    
-    try:
-        for line in iter(miner_process.stdout.readline, b''):
-            if miner_process.poll() is not None:
-                break
-            
-            line_str = line.decode('utf-8', errors='ignore').strip()
-            miner_output.append(line_str)
+    # PRIORITY 2: Track "accepted:" lines (precise total hashrate)
+    elif event_type is ShareResult:
+        latency_ms = pool_manager.share_result(event.accepted)
+        if latency_ms is not None:
+            metric_share_latency.observe(latency_ms / 1000)
+        (metric_shares_accepted if event.accepted else metric_shares_rejected).inc()
+        session.shares.record(event.accepted, session.snapshot.stratum_difficulty, event.share_diff)
+        session_ledger.share(event.accepted)
+        if event.value is not None:
+            # Reference for weighting with the core sum
+            session.accepted_hashrate(to_hs(event.value, event.unit))
             
-            # Keep only last 500 lines (increased for full output)
-            if len(miner_output) > 500:
-                miner_output.pop(0)
+            # Chart history is now updated by background thread every 2 seconds
             
-            # PRIORITY 1: Track individual CPU cores (fast feedback!)
-            if 'CPU #' in line_str and '/s' in line_str:
-                core_match = re.search(r'CPU #(\d+):\s*([\d.]+)\s*(H|kH|MH|GH)/s', line_str, re.IGNORECASE)
-                if core_match:
-                    core_id = f"CPU #{core_match.group(1)}"
-                    value = float(core_match.group(2))
-                    unit = core_match.group(3)
-                    timestamp = time.time()
-                    
-                    # Store core hashrate with timestamp
-                    cpu_core_hashrates[core_id] = {
-                        "value": value,
-                        "timestamp": timestamp
-                    }
-                    
-                    # Update unit if this is the first core
-                    if not current_hashrate_unit or current_hashrate_unit == "kH":
-                        current_hashrate_unit = unit
-                    
-                    # Calculate total hashrate from cores
-                    update_hashrate_from_cores()
-                    
-                    print(f"Core update: {core_id} = {value} {unit}/s, Total: {current_hashrate}")
-            
-            # PRIORITY 2: Track "accepted:" lines (precise total hashrate)
-            elif 'accepted:' in line_str:
-                hashrate_match = re.search(r'accepted:.*?([\d.]+)\s*(H|kH|MH|GH)/s', line_str, re.IGNORECASE)
-                if hashrate_match:
-                    accepted_value = float(hashrate_match.group(1))
-                    unit = hashrate_match.group(2)
-                    
-                    # Store as reference for weighting
-                    last_accepted_hashrate = accepted_value
-                    current_hashrate_unit = unit
-                    
-                    # Calculate cores sum
-                    cores_sum = sum(v["value"] for v in cpu_core_hashrates.values())
-                    
-                    # Weighted average: 70% accepted, 30% cores_sum
-                    if cores_sum > 0:
-                        current_hashrate_value = (accepted_value * 0.7) + (cores_sum * 0.3)
-                    else:
-                        current_hashrate_value = accepted_value
-                    
-                    current_hashrate = f"{current_hashrate_value:.1f} {unit}/s"
-                    
-                    # Chart history is now updated by background thread every 2 seconds
-                    
-                    print(f"Accepted: {accepted_value} {unit}/s, Weighted: {current_hashrate}")
+            hashrate_log.info("Accepted: %s %s/s, Weighted: %s", event.value, event.unit, session.snapshot.hashrate)
+        
+        event_hub.publish('share', {
+            'accepted': event.accepted,
+            'accepted_count': event.accepted_count,
+            'total_count': event.total_count,
+            'share_diff': event.share_diff,
+            'hashrate': session.snapshot.hashrate
+        })
+    
+    # PRIORITY 3: Track share difficulty (ONLY "share diff" lines!)
+    # "Stratum difficulty" and "block diff" lines are separate event types
+    elif event_type is ShareDifficulty:
+        difficulty = event.difficulty
+        metric_share_difficulty.observe(difficulty)
+        session_best, all_time_best = session.share_difficulty(difficulty)
+        session_ledger.difficulty(difficulty)
+        
+        if session_best:
+            log.info(f"🎉 New session best difficulty: {difficulty}")
+        
+        if all_time_best:
+            log.info(f"🏆 NEW ALL-TIME BEST DIFFICULTY: {difficulty}")
             
-            # PRIORITY 3: Track share difficulty (ONLY "share diff" lines!)
-            if 'share diff' in line_str:
-                # Only parse "share diff X.XXX" - NOT "Stratum difficulty" or "block diff"
-                diff_match = re.search(r'share diff ([\d.]+)', line_str, re.IGNORECASE)
-                if diff_match:
-                    difficulty = float(diff_match.group(1))
-                    
-                    # Update Session Best
-                    if difficulty > session_best_difficulty:
-                        session_best_difficulty = difficulty
-                        print(f"🎉 New session best difficulty: {difficulty}")
-                    
-                    # Update All-Time Best
-                    if difficulty > all_time_best_difficulty:
-                        all_time_best_difficulty = difficulty
-                        print(f"🏆 NEW ALL-TIME BEST DIFFICULTY: {difficulty}")
-                        
-                        # Save to config.json
-                        try:
-                            config = load_config()
-                            config['all_time_best_difficulty'] = difficulty
-                            config['all_time_best_difficulty_date'] = time.time()
-                            save_config(config)
-                        except Exception as e:
-                            print(f"Error saving all-time best difficulty: {e}")
+            # Save to config.json (coalesced, written in the background)
+            config_store.update_deferred({
+                'all_time_best_difficulty': difficulty,
+                'all_time_best_difficulty_date': time.time()
+            })
+        
+        snapshot = session.snapshot
+        event_hub.publish('difficulty', {
+            'difficulty': difficulty,
+            'session_best_difficulty': snapshot.session_best_difficulty,
+            'all_time_best_difficulty': snapshot.all_time_best_difficulty
+        })
+    
+    
+    elif event_type is ShareFound:
+        # Submitted now, the pool's answer is the next share result
+        pool_manager.share_submitted()
+    
+    elif event_type is StratumDifficulty:
+        session.set_stratum_difficulty(event.difficulty)
+        pool_manager.connection_ok()
+    
+    elif event_type is NewJob:
+        pool_manager.connection_ok()
+        if event.network_difficulty:
+            session.shares.set_network_difficulty(event.network_difficulty)
+    
+    elif event_type is MinerError:
+        if event.kind in CONNECTION_ERRORS:
+            # cpuminer reconnects after every connection error
+            metric_reconnects.inc()
+            if pool_manager.connection_failed(event.kind):
+                failover_reason = f"{pool_manager.failure_threshold} consecutive connection errors ({event.kind})"
+    
+    if failover_reason and failover_enabled() and session.try_begin_switch():
+        Thread(target=switch_pool, args=(failover_reason,), daemon=True).start()
+    
+    output_log.info(line_str)
+    metric_line_time.observe(time.perf_counter() - started)
+    return event
+
+def monitor_miner_output(session, process, job=None):
+    """The only reader of the miner's stdout
+    
+    Lines go to the log buffer and stats parser (handle_miner_line) and,
+    while job is validating, to its validator. The selector timeout is the
+    rest of the validation window, so it ends even if the miner is silent.
+    """
+    fd = process.stdout.fileno()
+    os.set_blocking(fd, False)
+    selector = selectors.DefaultSelector()
+    selector.register(fd, selectors.EVENT_READ)
+    partial = b''
+    try:
+        while True:
+            ready = selector.select(job.remaining() if job is not None else None)
+            if not ready:
+                if job is not None and job.remaining() == 0.0:
+                    # No verdict within the window, but the miner is still running
+                    finish_start(session, job, process, True, "Mining started (validating...)")
+                continue
+            try:
+                chunk = os.read(fd, 65536)
+            except BlockingIOError:
+                continue
+            if not chunk:
+                break  # EOF - the miner exited
             
-            print(f"Miner: {line_str}")
+            lines = (partial + chunk).split(b'\n')
+            partial = lines.pop()
+            for line in lines:
+                line_str = line.decode('utf-8', errors='ignore').strip()
+                event = handle_miner_line(session, line_str)
+                if job is not None and job.pending:
+                    verdict = job.observe(event, line_str)
+                    if verdict is not None:
+                        finish_start(session, job, process, *verdict)
+        if partial:
+            handle_miner_line(session, partial.decode('utf-8', errors='ignore').strip())
     except Exception as e:
-        print(f"Error monitoring miner: {e}")
+        log.error(f"Error monitoring miner: {e}")
+    finally:
+        selector.close()
+        if job is not None and job.pending:
+            finish_start(session, job, process, False, "Mining process terminated unexpectedly")
+        # The miner exited: readers should see running=False right away
+        session.publish()
+        session_ledger.end('miner exited', pid=process.pid)  # No-op if stop_mining ended it
+        status_cache.invalidate()
+
+def finish_start(session, job, process, success, message):
+    """End a start job: activate the pool, or clean up the failed/cancelled miner"""
+    status_cache.invalidate()
+    if success and not job.cancelled:
+        log.info(f"Connection validated: {message}")
+        pool_manager.activate(job.pool_url, job.reason, previous=job.previous)
+        config_store.update({'mining_active': True})
+        job.finish(True, message)
+        return
+    
+    log.warning(f"Connection validation failed: {message}" if not job.cancelled else "Start cancelled")
+    try:
+        process.kill()
+    except Exception:
+        pass
+    session_ledger.discard(process.pid)
+    throttle = session.snapshot.throttle
+    if session.detach(process):
+        # Not already cleaned up by stop_mining
+        governor.detach()
+        if throttle is not None:
+            throttle.release()
+        config_store.update({'mining_active': False})
+    job.finish(False, "Start cancelled" if job.cancelled else message)
 
 def test_pool_connection(pool_url, btc_address, worker_name="test"):
-    """Test connection to mining pool with fast feedback"""
+    """Test connection to mining pool with a native Stratum handshake
+    Returns: (success: bool, message: str, probe: dict or None)
+    """
     try:
         # Normalize pool URL
         pool_url = normalize_pool_url(pool_url)
         
         if not pool_url or not btc_address:
-            return False, "Pool URL and Bitcoin address are required"
+            return False, "Pool URL and Bitcoin address are required", None
         
         username = f"{btc_address}.{worker_name}"
         
@@ -422,406 +629,307 @@ def test_pool_connection(pool_url, btc_address, worker_name="test"):
         # Format password with difficulty
         password = f"d={start_difficulty}"
         
-        # Start cpuminer test
-        cmd = [
-            'cpuminer',
-            '-a', 'sha256d',
-            '-o', pool_url,
-            '-u', username,
-            '-p', password,
-            '-t', '1',  # Just 1 thread for testing
-            '--no-color'
-        ]
-        
-        print(f"Testing connection to: {pool_url}")
+        log.info(f"Testing connection to: {pool_url}")
         
-        # Start process
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            bufsize=1
-        )
-        
-        output_lines = []
-        start_time = time.time()
-        connection_successful = False
-        error_message = None
+        # subscribe + authorize directly, no cpuminer process needed
+        probe = probe_pool(pool_url, username, password, timeout=10)
         
-        # Success indicators - any of these means connection works
-        success_indicators = [
-            'Stratum difficulty set to',
-            'Stratum session id:',
-            'asks job'
-        ]
+        if probe['ok']:
+            log.info(f"✅ Connection successful after {probe['total_ms']:.0f}ms "
+                     f"(connect {probe['connect_ms']}ms, subscribe {probe['subscribe_ms']}ms, "
+                     f"authorize {probe['authorize_ms']}ms)")
+            message = f"Connection successful! ({probe['total_ms']:.0f}ms) Pool: {pool_url}"
+            if probe['difficulty'] is not None:
+                message += f", difficulty {probe['difficulty']:g}"
+            return True, message, probe
         
-        # Error patterns - any of these means connection failed
-        error_patterns = {
-            'Empty reply from server': "Pool did not respond - check URL and port",
-            'Connection refused': "Connection refused - pool may be offline",
-            'Could not resolve host': "Could not resolve hostname - check pool URL",
-            'Failed to connect': "Failed to connect - check URL and port",
-            'Connection failed': "Connection failed - check URL and port",
-            'Timeout': "Connection timeout - pool may be unreachable"
-        }
-        
-        # Monitor output for max 10 seconds (but exit early on success/failure)
-        while time.time() - start_time < 10:
-            if process.poll() is not None:
-                break
-            
-            line = process.stdout.readline()
-            if line:
-                line_str = line.decode('utf-8', errors='ignore').strip()
-                output_lines.append(line_str)
-                print(f"Test output: {line_str}")
-                
-                # Check for SUCCESS - exit immediately!
-                for indicator in success_indicators:
-                    if indicator in line_str:
-                        connection_successful = True
-                        elapsed = time.time() - start_time
-                        print(f"✅ Connection successful after {elapsed:.1f}s")
-                        break
-                
-                # If success found, break outer loop too
-                if connection_successful:
-                    break
-                
-                # Check for ERRORS - exit immediately!
-                for pattern, message in error_patterns.items():
-                    if pattern in line_str:
-                        error_message = message
-                        elapsed = time.time() - start_time
-                        print(f"❌ Connection failed after {elapsed:.1f}s: {pattern}")
-                        break
-                
-                # If error found, break outer loop too
-                if error_message:
-                    break
-        
-        # Kill the test process
-        try:
-            process.terminate()
-            process.wait(timeout=2)
-        except:
-            process.kill()
-        
-        # Determine result
-        elapsed_total = time.time() - start_time
-        
-        if connection_successful:
-            return True, f"Connection successful! ({elapsed_total:.1f}s) Pool: {pool_url}"
-        elif error_message:
-            return False, f"{error_message} ({elapsed_total:.1f}s)"
-        else:
-            return False, "Could not establish connection within 10 seconds"
+        log.warning(f"❌ Connection failed after {probe['total_ms']:.0f}ms: {probe['error_code']}")
+        return False, f"{probe['error']} ({probe['total_ms']:.0f}ms)", probe
             
     except Exception as e:
-        return False, f"Test failed: {str(e)}"
+        return False, f"Test failed: {str(e)}", None
 
-def validate_mining_connection(process, timeout=5):
-    """
-    Monitor miner output for timeout seconds to validate connection
-    Returns: (success: bool, message: str)
+def start_mining(config, pool_url=None, failover_from=None, reason="start"):
+    """Start mining in the background
+    
+    Checks the config, then launches and validates cpuminer on a job thread.
+    Returns (success, message, job) right away - job.wait() blocks until the
+    miner is validated, the status endpoint shows its progress.
+    pool_url defaults to the best configured pool. failover_from is set when
+    switching pools mid-session (keeps the session stats and chart).
     """
-    start_time = time.time()
-    output_buffer = []
-    
-    # Success patterns
-    success_patterns = [
-        "Stratum difficulty set",
-        "new job",
-        "accepted"
-    ]
+    if miner.running:
+        return False, "Mining is already running", None
+    if miner.start_job is not None and miner.start_job.pending:
+        return False, "Mining is already starting", None
+    if tune_job is not None and tune_job.running:
+        return False, "Tuning is running - cancel it or wait until it finishes", None
     
-    # Failure patterns
-    failure_patterns = [
-        "connection failed",
-        "Connection refused",
-        "Failed to connect",
-        "Invalid address",
-        "authentication failed"
-    ]
+    # Validate configuration
+    if not config.get('pool_url') and not config.get('pools'):
+        return False, "Pool URL is required", None
+    if not config.get('btc_address'):
+        return False, "BTC address is required", None
     
-    while time.time() - start_time < timeout:
-        # Check if process died
-        if process.poll() is not None:
-            return False, "Mining process terminated unexpectedly"
-        
-        # Read output (non-blocking)
-        try:
-            line = process.stdout.readline()
-            if line:
-                line_str = line.decode('utf-8', errors='ignore').strip()
-                output_buffer.append(line_str)
-                
-                # Check for failure
-                for pattern in failure_patterns:
-                    if pattern.lower() in line_str.lower():
-                        # Extract specific error
-                        return False, f"Connection failed: {line_str}"
-                
-                # Check for success
-                for pattern in success_patterns:
-                    if pattern.lower() in line_str.lower():
-                        return True, "Connected successfully"
-        except:
-            pass
+    if config.get('pool_url') and not config.get('pools'):
+        # Normalize pool URL (fix for the issue!)
+        config['pool_url'] = normalize_pool_url(config.get('pool_url'))
         
-        time.sleep(0.1)
+        # Save the normalized URL back to config
+        config_store.update({'pool_url': config['pool_url']})
     
-    # Timeout reached - check if still running
-    if process.poll() is None:
-        # Still running, no errors detected
-        return True, "Mining started (validating...)"
-    else:
-        return False, "Mining process failed to start"
-
-def start_mining(config):
-    """Start the cpuminer-multi process with cpulimit"""
-    global miner_process, cpulimit_process, miner_output, current_hashrate
-    global current_hashrate_value, current_hashrate_unit
-    global cpu_core_hashrates, last_accepted_hashrate
-    global hashrate_history, session_best_difficulty, all_time_best_difficulty
-    global mining_start_time, mining_stopped_time
-    
-    if miner_process is not None and miner_process.poll() is None:
-        return False, "Mining is already running"
-    
-    # Reset session stats
-    session_best_difficulty = 0.0
-    # Keep hashrate_history - don't reset! Background thread will manage it
-    mining_start_time = time.time()
-    mining_stopped_time = None  # Reset stopped time (new session starting)
-    
-    # Clear chart history for clean start
-    global chart_history
-    chart_history = []
-    print("Chart history cleared for new mining session")
-    
-    # Reset hashrate tracking
-    cpu_core_hashrates = {}
-    last_accepted_hashrate = 0.0
-    current_hashrate_value = 0.0
-    current_hashrate_unit = "kH"
-    current_hashrate = "0 H/s"
-    
-    # Load all-time best from config
-    all_time_best_difficulty = config.get('all_time_best_difficulty', 0.0)
-    print(f"All-time best difficulty: {all_time_best_difficulty}")
-    
-    # Validate configuration
-    if not config.get('pool_url'):
-        return False, "Pool URL is required"
-    if not config.get('btc_address'):
-        return False, "BTC address is required"
+    job = StartJob(reason, previous=failover_from)
+    miner.set_start_job(job)
+    status_cache.invalidate()
+    Thread(target=run_start_job, args=(miner, job, config, pool_url, failover_from), daemon=True).start()
+    return True, "Starting mining", job
+
+def run_start_job(session, job, config, pool_url, failover_from):
+    """Start job thread: launch cpuminer, then stay on as its output reader"""
+    process = launch_miner(session, job, config, pool_url, failover_from)
+    if process is not None:
+        monitor_miner_output(session, process, job)
+
+def launch_miner(session, job, config, pool_url, failover_from):
+    """Start the cpuminer-multi process with its CPU throttle
     
-    # Normalize pool URL (fix for the issue!)
-    pool_url = normalize_pool_url(config.get('pool_url'))
+    Returns the process (validation happens in its reader), or None if the
+    job already failed.
+    """
+    # Reset hashrate tracking and (unless failing over) the session stats;
+    # the all-time best comes from the config
+    all_time_best_difficulty = config.get('all_time_best_difficulty', 0.0)
+    estimator = create_estimator(config.get('hashrate_estimator', 'ewma'), float(config.get('hashrate_half_life', 30)))
+    session.begin(all_time_best_difficulty, keep_stats=failover_from is not None, estimator=estimator)
+    if failover_from is None:
+        # Keep hashrate_history - don't reset! Background thread will manage it
+        # Clear chart history for clean start
+        chart_history.clear()
+        core_history.clear()
+        event_hub.publish('history_reset', {})
+        log.info("Chart history cleared for new mining session")
+    log.info(f"All-time best difficulty: {all_time_best_difficulty}")
     
-    # Save the normalized URL back to config
-    config['pool_url'] = pool_url
-    save_config(config)
+    # CPU set and priority; the CPU budget is relative to the miner's CPU set
+    placement = Placement.from_config(config)
     
-    # Calculate CPU limit for cpulimit
+    # CPU budget and the throttling backend that enforces it
     cpu_percentage = config.get('cpu_percentage', 10)
-    cpu_limit = calculate_cpu_limit(cpu_percentage)
-    cpu_count = psutil.cpu_count()
+    cpu_count = placement.cpu_count
+    profile = get_tune_profile(config, placement)
+    if profile:
+        # Tuned threads/affinity; the tuned level may be below the configured budget
+        backend = config.get('throttle_backend', 'auto')
+        throttle = create_throttle(profile['backend'] if backend == 'auto' else backend,
+                                   profile['cpu_percentage'], cpu_count, threads=profile['threads'])
+        log.info(f"Using tune profile: {profile['threads']} threads, affinity {profile['affinity']}, "
+                 f"{profile['cpu_percentage']}% via {throttle.name}")
+    else:
+        throttle = create_throttle(config.get('throttle_backend', 'auto'), cpu_percentage, cpu_count)
     
     # Hardcoded start difficulty (optimal for CPU mining)
     start_difficulty = 0.1
     
-    # Build cpuminer command - use ALL available threads (0 = auto-detect)
+    # Build cpuminer command
     worker_name = config.get('worker_name', 'worker1')
     username = f"{config['btc_address']}.{worker_name}"
     
     # Format password with difficulty
     password = f"d={start_difficulty}"
     
+    # Best pool by priority and measured latency (probes all pools if there are several)
+    if pool_url is None:
+        job.step('starting', 'Selecting pool')
+        pool_url = select_pool(config, username, password)
+    job.pool_url = pool_url
+    if job.cancelled:
+        job.finish(False, "Start cancelled")
+        return None
+    
+    # In proxy mode the proxy holds the pool connection and cpuminer mines through it
+    miner_url = pool_url
+    if config.get('proxy_enabled'):
+        success, message = start_proxy(config, pool_url)
+        if not success:
+            job.finish(False, message)
+            return None
+        miner_url = f"stratum+tcp://127.0.0.1:{stratum_proxy.port}"
+        log.info(f"Mining through Stratum proxy {miner_url} -> {pool_url}")
+    
     # Log the configuration for debugging
-    print(f"Starting miner with normalized pool URL: {pool_url}")
-    print(f"Username: {username}")
-    print(f"Start Difficulty: {start_difficulty}")
-    print(f"Password: {password}")
-    print(f"CPU Cores: {cpu_count}")
-    print(f"Target CPU %: {cpu_percentage}%")
-    print(f"cpulimit value: {cpu_limit}%")
-    print(f"Using ALL available threads (controlled by cpulimit)")
+    log.info(f"Starting miner with normalized pool URL: {pool_url}")
+    log.info(f"Username: {username}")
+    log.info(f"Start Difficulty: {start_difficulty}")
+    log.info(f"Password: {password}")
+    log.info(f"CPU Cores: {cpu_count}")
+    log.info(f"Target CPU %: {cpu_percentage}%")
+    log.info(f"Throttle backend: {throttle.name} ({throttle.cores:.2f} cores, "
+             f"{throttle.threads() or 'all'} threads)")
+    log.info(f"Placement: CPUs {placement.cpus}, nice {placement.nice}"
+             f"{', SCHED_IDLE' if placement.sched_idle else ''}")
+    
+    # cpuminer's "all" means every CPU of the box, not just the allowed ones
+    threads = throttle.threads() or (cpu_count if placement.restricted else 0)
     
     cmd = [
         'cpuminer',
         '-a', 'sha256d',  # Algorithm (can be changed based on pool)
-        '-o', pool_url,
+        '-o', miner_url,
         '-u', username,
         '-p', password,  # Password with difficulty: d=0.1
-        '-t', '0',  # 0 = use all available threads
+        '-t', str(threads),  # 0 = use all available threads
         '--no-color',  # Disable ANSI colors for cleaner output parsing
         '--debug'  # Enable debug output for more information
     ]
+    if profile and profile.get('cpus'):
+        cmd += ['--cpu-affinity', affinity_mask(profile['cpus'])]
+    
+    # Clear previous output (the reader appends from the first line on)
+    miner_output.clear()
+    publish_output([], miner_output.last_seq)
     
+    process = None
     try:
-        # Start the miner process
-        miner_process = subprocess.Popen(
+        # Start the miner process (its reader uses non-blocking reads on the raw pipe)
+        job.step('launching', f"Starting cpuminer on {pool_url}")
+        process = subprocess.Popen(
             cmd,
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
-            bufsize=1
+            bufsize=0,
+            preexec_fn=placement.preexec()  # CPU set, nice and scheduling class for every thread
         )
+        session.attach(process, throttle, placement)
         
         # Get the PID of the miner process
-        miner_pid = miner_process.pid
-        print(f"Miner process started with PID: {miner_pid}")
-        
-        # Wait a moment for the miner to fully start
-        time.sleep(1)
-        
-        # Start cpulimit to control CPU usage
-        cpulimit_cmd = [
-            'cpulimit',
-            '-p', str(miner_pid),
-            '-l', str(cpu_limit),
-            '-z'  # sleep when limit is reached (saves energy)
-        ]
-        
-        cpulimit_process = subprocess.Popen(
-            cpulimit_cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
-        
-        print(f"cpulimit started with PID: {cpulimit_process.pid}")
-        print(f"CPU usage limited to {cpu_limit}% ({cpu_percentage}% of {cpu_count} cores)")
-        
-        # Clear previous output
-        miner_output = []
-        current_hashrate = "0 H/s"
-        
-        # Validate connection before declaring success
-        print("Validating mining connection...")
-        success, validation_msg = validate_mining_connection(miner_process, timeout=5)
-        
-        if not success:
-            # Connection failed - cleanup
-            print(f"Connection validation failed: {validation_msg}")
-            try:
-                miner_process.kill()
-            except:
-                pass
-            try:
-                cpulimit_process.kill()
-            except:
-                pass
-            
-            # Reset state
-            miner_process = None
-            cpulimit_process = None
-            config['mining_active'] = False
-            save_config(config)
-            
-            return False, validation_msg
+        miner_pid = process.pid
+        log.info(f"Miner process started with PID: {miner_pid}")
         
-        # Connection successful - start monitoring
-        print(f"Connection validated: {validation_msg}")
+        # Apply the CPU limit right away (cgroup quota / cpulimit)
+        throttle.attach(miner_pid)
+        governor.attach(throttle, miner_pid)
+        log.info(f"CPU usage limited to {cpu_percentage}% of {cpu_count} cores via {throttle.name}")
+        session_ledger.begin(miner_pid, pool_url, worker_name, throttle.cpu_percentage, threads or cpu_count, throttle.name)
         
-        # Start monitoring thread
-        monitor_thread = Thread(target=monitor_miner_output, daemon=True)
-        monitor_thread.start()
-        
-        # Update config
-        config['mining_active'] = True
-        save_config(config)
-        
-        return True, "Mining started successfully"
+        # Validated by the output reader (StartJob.observe)
+        log.info("Validating mining connection...")
+        job.step('validating', "Waiting for the pool")
+        return process
     except Exception as e:
         # Cleanup if something went wrong
-        if miner_process:
+        if process is not None:
             try:
-                miner_process.kill()
+                process.kill()
             except:
                 pass
-        if cpulimit_process:
-            try:
-                cpulimit_process.kill()
-            except:
-                pass
-        return False, f"Failed to start mining: {str(e)}"
+        governor.detach()
+        try:
+            throttle.release()
+        except Exception:
+            pass
+        session.detach()
+        job.finish(False, f"Failed to start mining: {str(e)}")
+        return None
 
-def stop_mining():
-    """Stop the cpuminer-multi process and cpulimit"""
-    global miner_process, cpulimit_process, current_hashrate, mining_start_time
-    global cpu_core_hashrates, last_accepted_hashrate, current_hashrate_value, mining_stopped_time
+def stop_mining(switching=False, reason="stopped"):
+    """Stop the cpuminer-multi process and its throttle (switching: restarted on another pool right after)
+    
+    reason is recorded as the end of the session in the session ledger.
+    """
+    status_cache.invalidate()
+    snapshot = miner.snapshot
+    start_job = snapshot.start_job
+    if start_job is not None and start_job.pending:
+        # Stopped before the start finished - the job ends as cancelled
+        start_job.cancel()
+        if snapshot.process is None:
+            return True, "Start cancelled"
     
-    if miner_process is None or miner_process.poll() is not None:
+    process, throttle = snapshot.process, snapshot.throttle
+    if process is None or process.poll() is not None:
         return False, "Mining is not running"
     
     try:
         # Terminate both processes
-        print("Stopping mining processes...")
+        log.info("Stopping mining processes...")
         
-        # Stop cpulimit first
-        if cpulimit_process and cpulimit_process.poll() is None:
+        # Stop the throttle first (cpulimit would SIGCONT/SIGSTOP a dying process)
+        governor.detach()
+        if throttle is not None:
             try:
-                cpulimit_process.terminate()
-                cpulimit_process.wait(timeout=2)
-                print("cpulimit stopped")
-            except subprocess.TimeoutExpired:
-                cpulimit_process.kill()
-                cpulimit_process.wait()
-                print("cpulimit killed (timeout)")
+                throttle.release()
+                log.info(f"{throttle.name} throttle released")
             except Exception as e:
-                print(f"Error stopping cpulimit: {e}")
+                log.error(f"Error releasing {throttle.name} throttle: {e}")
+        
+        # Close the session before the miner's exit reaches its reader
+        session_ledger.end(reason, pid=process.pid)
         
         # Then stop the miner
-        miner_process.terminate()
+        process.terminate()
         
         # Wait for process to end (with timeout)
         try:
-            miner_process.wait(timeout=5)
-            print("Miner stopped")
+            process.wait(timeout=5)
+            log.info("Miner stopped")
         except subprocess.TimeoutExpired:
             # Force kill if it doesn't terminate
-            miner_process.kill()
-            miner_process.wait()
-            print("Miner killed (timeout)")
+            process.kill()
+            process.wait()
+            log.warning("Miner killed (timeout)")
         
-        miner_process = None
-        cpulimit_process = None
+        # Reset hashrate tracking completely; a switch keeps the session open
+        miner.detach(process, stopped=not switching)
         
-        # Mark when mining was stopped (for chart cooldown period)
-        mining_stopped_time = time.time()
+        if switching:
+            return True, "Mining stopped for pool switch"
         
-        # Reset hashrate tracking completely
-        cpu_core_hashrates = {}
-        last_accepted_hashrate = 0.0
-        current_hashrate_value = 0.0
-        current_hashrate = "0 H/s"
-        mining_start_time = None
+        pool_manager.deactivate()
         
         # Update config
-        config = load_config()
-        config['mining_active'] = False
-        save_config(config)
+        config_store.update({'mining_active': False})
         
         return True, "Mining stopped successfully"
     except Exception as e:
         return False, f"Failed to stop mining: {str(e)}"
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    started = g.get('request_started')
+    if started is not None:
+        metric_requests.labels(request.endpoint or 'not_found').observe(time.perf_counter() - started)
+    return response
+
+@app.after_request
+def compress_response(response):
+    return compress(request, response)
+
 @app.route('/')
 def index():
-    """Serve the main dashboard page"""
-    return send_file('index.html')
+    """Serve the main dashboard page (static URLs fingerprinted with ?v=<hash>)"""
+    return index_page.serve(request)
 
 @app.route('/static/<path:path>')
 def send_static(path):
-    """Serve static files"""
-    return send_from_directory('static', path)
+    """Serve static files (cached for a year when requested with the current ?v=<hash>)"""
+    return static_files.serve(request, path)
 
 @app.route('/api/config', methods=['GET'])
 def get_config():
-    """Get current configuration"""
-    config = load_config()
-    return jsonify(config)
+    """Get current configuration (304 if the client's ETag is still current)"""
+    version, config = config_store.load_versioned()
+    etag = f"{CONFIG_ETAG_PREFIX}-{version}"
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(config)
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @app.route('/api/config', methods=['POST'])
 def update_config():
@@ -834,20 +942,61 @@ def update_config():
         if cpu_percentage < 1 or cpu_percentage > 100:
             return jsonify({"success": False, "message": "CPU percentage must be between 1 and 100"}), 400
         
-        # Load current config and update fields
-        config = load_config()
-        
         # Normalize pool URL before saving
         pool_url = normalize_pool_url(new_config.get('pool_url', ''))
         
-        config.update({
+        changes = {
             'pool_url': pool_url,
             'btc_address': new_config.get('btc_address', ''),
             'worker_name': new_config.get('worker_name', ''),
             'cpu_percentage': cpu_percentage
-        })
+        }
+        # Optional failover pool list and settings (only if the client sends them)
+        if 'pools' in new_config:
+            if not isinstance(new_config['pools'], list):
+                return jsonify({"success": False, "message": "pools must be a list"}), 400
+            changes['pools'] = configured_pools({'pools': new_config['pools']})
+        for key in ('pool_failover', 'pool_failure_threshold', 'pool_stall_minutes', 'pool_probe_interval',
+                    'proxy_enabled', 'proxy_port', 'fleet_peers', 'fleet_poll_interval', 'fleet_timeout',
+                    'throttle_backend', 'miner_cpus', 'reserve_cores', 'miner_nice', 'miner_sched_idle',
+                    'governor_enabled', 'governor_temp_target',
+                    'governor_min_percentage', 'governor_headroom', 'hashrate_estimator', 'hashrate_half_life'):
+            if key in new_config:
+                changes[key] = new_config[key]
+        if 'fleet_peers' in changes and (not isinstance(changes['fleet_peers'], list)
+                                         or any(peer_entry(entry) is None for entry in changes['fleet_peers'])):
+            return jsonify({"success": False,
+                            "message": "fleet_peers must be a list of URLs or {\"url\", \"name\"} objects"}), 400
+        if 'proxy_port' in changes and (isinstance(changes['proxy_port'], bool) or not isinstance(changes['proxy_port'], int)
+                                        or not 1024 <= changes['proxy_port'] <= 65535 or changes['proxy_port'] == 5000):
+            return jsonify({"success": False, "message": "proxy_port must be a port from 1024 to 65535 (not 5000)"}), 400
+        for key in ('fleet_poll_interval', 'fleet_timeout'):
+            if key in changes and (isinstance(changes[key], bool) or not isinstance(changes[key], (int, float))):
+                return jsonify({"success": False, "message": f"{key} must be a number of seconds"}), 400
+        try:
+            parse_cpu_list(changes.get('miner_cpus'))
+        except ValueError:
+            return jsonify({"success": False, "message": "miner_cpus must be a CPU list like \"2-7\" or [2, 3]"}), 400
+        if changes.get('throttle_backend', 'auto') not in ('auto', 'cgroup', 'threads', 'cpulimit'):
+            return jsonify({"success": False, "message": "throttle_backend must be auto, cgroup, threads or cpulimit"}), 400
+        if changes.get('hashrate_estimator', 'ewma') not in ESTIMATORS:
+            return jsonify({"success": False, "message": "hashrate_estimator must be ewma, kalman or blend"}), 400
+        if 'hashrate_half_life' in changes:
+            try:
+                changes['hashrate_half_life'] = max(2.0, min(600.0, float(changes['hashrate_half_life'])))
+            except (TypeError, ValueError):
+                return jsonify({"success": False, "message": "hashrate_half_life must be a number of seconds"}), 400
         
-        if save_config(config):
+        # Update fields of the current config
+        if config_store.update(changes):
+            if 'fleet_peers' in changes:
+                configure_fleet(load_config())
+            configure_governor(load_config())
+            status_cache.invalidate()
+            # Apply a new CPU budget to the running miner where the backend allows it
+            if governor.attached and governor.ceiling != cpu_percentage:
+                if not governor.set_ceiling(cpu_percentage):
+                    return jsonify({"success": True, "message": "Configuration saved - restart mining to apply the CPU change"})
             return jsonify({"success": True, "message": "Configuration saved successfully"})
         else:
             return jsonify({"success": False, "message": "Failed to save configuration"}), 500
@@ -858,10 +1007,11 @@ def update_config():
 def start():
     """Start mining"""
     config = load_config()
-    success, message = start_mining(config)
+    success, message, job = start_mining(config)
     
     if success:
-        return jsonify({"success": True, "message": message})
+        # Progress and the validation result are in /api/status ("start")
+        return jsonify({"success": True, "message": message, "job_id": job.id})
     else:
         return jsonify({"success": False, "message": message}), 400
 
@@ -884,29 +1034,140 @@ def test_connection():
         btc_address = data.get('btc_address', '')
         worker_name = data.get('worker_name', 'test')
         
-        success, message = test_pool_connection(pool_url, btc_address, worker_name)
+        success, message, probe = test_pool_connection(pool_url, btc_address, worker_name)
         
         if success:
-            return jsonify({"success": True, "message": message})
+            return jsonify({"success": True, "message": message, "probe": probe})
         else:
-            return jsonify({"success": False, "message": message}), 400
+            return jsonify({"success": False, "message": message, "probe": probe}), 400
     except Exception as e:
         return jsonify({"success": False, "message": f"Test error: {str(e)}"}), 500
 
-@app.route('/api/status', methods=['GET'])
-def status():
-    """Get mining status"""
-    global miner_process, cpulimit_process, current_hashrate, miner_output
-    global session_best_difficulty, all_time_best_difficulty
+@app.route('/api/pools', methods=['GET'])
+def get_pools():
+    """Configured pools with latency stats, time spent on each and recent switch decisions"""
+    if not pool_manager.urls:
+        pool_manager.set_pools(configured_pools(load_config()))
+    return jsonify(pool_manager.snapshot())
+
+@app.route('/api/pools/probe', methods=['POST'])
+def probe_pools():
+    """Probe all configured pools now (concurrently)"""
+    config = load_config()
+    if not miner.running:
+        pool_manager.set_pools(configured_pools(config))
+    username, password = mining_credentials(config)
+    pool_manager.probe_all(username, password, timeout=5)
+    return jsonify(pool_manager.snapshot())
+
+@app.route('/api/proxy', methods=['GET'])
+def get_proxy():
+    """Stratum proxy state, fleet-wide share rate and connected miners"""
+    return jsonify(stratum_proxy.snapshot())
+
+@app.route('/api/proxy/start', methods=['POST'])
+def proxy_start():
+    """Start the Stratum proxy on the best configured pool"""
+    config = load_config()
+    if not config.get('btc_address'):
+        return jsonify({"success": False, "message": "BTC address is required"}), 400
+    success, message = start_proxy(config, pool_manager.active_url)
+    if success:
+        return jsonify({"success": True, "message": message})
+    return jsonify({"success": False, "message": message}), 400
+
+@app.route('/api/proxy/stop', methods=['POST'])
+def proxy_stop():
+    """Stop the Stratum proxy (miners connected through it lose their pool)"""
+    success, message = stratum_proxy.stop()
+    if success:
+        return jsonify({"success": True, "message": message})
+    return jsonify({"success": False, "message": message}), 400
+
+@app.route('/api/fleet', methods=['GET'])
+def get_fleet():
+    """Combined and per-node view of this instance and all fleet peers
+    
+    Served from the poller's cached snapshots, never waits for a peer.
+    ?history=0 skips the merged hashrate history.
+    """
+    include_history = request.args.get('history', '1') != '0'
+    local_history = chart_history.last(CHART_HISTORY_POINTS) if include_history else None
+    return jsonify(fleet_poller.snapshot(status_cache.get()[0], local_history, include_history))
+
+@app.route('/api/tune', methods=['GET'])
+def get_tune():
+    """Progress and results of the current/last tune job"""
+    if tune_job is None:
+        return jsonify({"state": "idle", "profile": load_config().get('tune_profile')})
+    progress = tune_job.progress()
+    progress['profile'] = load_config().get('tune_profile')
+    return jsonify(progress)
+
+@app.route('/api/tune/start', methods=['POST'])
+def tune_start():
+    """Start a benchmark sweep in the background (mining must be stopped)"""
+    global tune_job
+    if miner.running:
+        return jsonify({"success": False, "message": "Stop mining before tuning"}), 400
+    if miner.start_job is not None and miner.start_job.pending:
+        # The start job probes pools before cpuminer exists - the benchmark would run next to it
+        return jsonify({"success": False, "message": "Mining is starting - stop it before tuning"}), 400
+    if tune_job is not None and tune_job.running:
+        return jsonify({"success": False, "message": "Tuning is already running"}), 400
     
-    is_running = miner_process is not None and miner_process.poll() is None
-    cpulimit_running = cpulimit_process is not None and cpulimit_process.poll() is None
+    data = request.get_json(silent=True) or {}
+    step_seconds = data.get('step_seconds', 20)
+    if not 5 <= step_seconds <= 300:
+        return jsonify({"success": False, "message": "step_seconds must be between 5 and 300"}), 400
+    
+    config = load_config()
+    placement = Placement.from_config(config)
+    tune_job = TuneJob(
+        config.get('cpu_percentage', 10),
+        placement.cpu_count,
+        cpus=placement.cpus,
+        preexec=placement.preexec(),
+        throttle_backend=config.get('throttle_backend', 'auto'),
+        step_seconds=step_seconds,
+        warmup_seconds=min(5, step_seconds / 3),
+        temperature=lambda: get_system_stats()['cpu_temp'],
+        on_complete=save_tune_profile
+    )
+    tune_job.start()
+    progress = tune_job.progress()
+    return jsonify({"success": True, "message": f"Tuning started ({progress['total_steps']} steps)",
+                    "total_steps": progress['total_steps'],
+                    "eta_seconds": progress['eta_seconds']})
+
+@app.route('/api/tune/cancel', methods=['POST'])
+def tune_cancel():
+    """Cancel the running tune job (the saved profile is left unchanged)"""
+    if tune_job is None or not tune_job.running:
+        return jsonify({"success": False, "message": "Tuning is not running"}), 400
+    tune_job.cancel()
+    return jsonify({"success": True, "message": "Tuning cancelled"})
+
+@app.route('/api/governor', methods=['GET'])
+def get_governor():
+    """Governor state and every budget adjustment with its reason"""
+    return jsonify(governor.snapshot())
+
+def build_status():
+    """Build the scalar part of the mining status (shared by /api/status and /api/stream)
+    
+    Use status_cache.get() instead of calling this per request.
+    """
+    snapshot = miner.snapshot
+    is_running = snapshot.running and snapshot.process.poll() is None
+    throttle = snapshot.throttle if is_running else None
     
     # Get CPU info
     cpu_count = psutil.cpu_count()
     config = load_config()
     cpu_percentage = config.get('cpu_percentage', 50)
-    cpu_limit = calculate_cpu_limit(cpu_percentage)
+    placement = snapshot.placement if is_running else None
+    cpu_limit = calculate_cpu_limit(cpu_percentage, placement.cpu_count if placement else None)
     
     # Get live system stats
     system_stats = get_system_stats()
@@ -915,13 +1176,23 @@ def status():
     uptime_seconds = get_mining_uptime()
     uptime_formatted = format_uptime(uptime_seconds) if is_running else "00:00:00"
     
-    return jsonify({
+    return {
         "running": is_running,
-        "hashrate": current_hashrate if is_running else "0 H/s",
+        "hashrate": snapshot.hashrate if is_running else "0 H/s",
+        "hashrate_hs": snapshot.hashrate_hs if is_running else 0.0,
+        "hashrate_band_hs": [snapshot.hashrate_low_hs, snapshot.hashrate_high_hs] if is_running else [0.0, 0.0],
+        "hashrate_estimator": config.get('hashrate_estimator', 'ewma'),
         "cpu_count": cpu_count,
         "cpu_percentage": cpu_percentage if is_running else 0,
         "cpu_limit": cpu_limit if is_running else 0,
-        "cpulimit_active": cpulimit_running,
+        "cpulimit_active": throttle is not None and throttle.name == 'cpulimit' and throttle.active,
+        "throttle_backend": throttle.name if throttle else None,
+        "throttle": throttle.describe() if throttle else None,
+        "throttle_available": get_throttle_backends(),
+        "placement": placement.describe(snapshot.pid) if placement else None,
+        "tuning": tune_job is not None and tune_job.running,
+        "start": snapshot.start_job.snapshot() if snapshot.start_job is not None else None,
+        "governor": governor.snapshot(limit=5),
         "cpu_usage_live": system_stats['cpu_usage_live'],
         "cpu_temp": system_stats['cpu_temp'],
         "cpu_temp_warning": system_stats['cpu_temp_warning'],
@@ -930,47 +1201,319 @@ def status():
         "ram_percent": system_stats['ram_percent'],
         "mining_uptime": uptime_formatted,
         "mining_uptime_seconds": uptime_seconds,
-        "session_best_difficulty": session_best_difficulty,
+        "session_best_difficulty": snapshot.session_best_difficulty,
         "all_time_best_difficulty": config.get('all_time_best_difficulty', 0.0),
         "all_time_best_difficulty_date": config.get('all_time_best_difficulty_date'),
-        "recent_output": miner_output[-50:] if miner_output else [],  # Show last 50 lines
-        "full_output": miner_output if miner_output else []  # Full output available
+        "pool": pool_manager.active_url if is_running else None,
+        "pool_switching": snapshot.pool_switching,
+        "proxy_active": stratum_proxy.running,
+    }
+
+@app.route('/api/status', methods=['GET'])
+def status():
+    """Get mining status
+    
+    With ?since=<seq> only miner output lines newer than seq are returned
+    (in "output"), instead of the full recent_output/full_output lists.
+    Clients also send the epoch seq came with (&epoch=); after a restart
+    it no longer matches and all buffered lines are returned.
+    """
+    _, status_json = status_cache.get()
+    
+    since = request.args.get('since', type=int)
+    if since is not None:
+        # Incremental: only lines the client hasn't seen yet
+        output = {"output": miner_output.since(since, epoch=request.args.get('epoch'))._asdict()}
+    else:
+        full_output = miner_output.lines()
+        output = {
+            "recent_output": full_output[-50:],  # Show last 50 lines
+            "full_output": full_output,  # Full output available
+            "output_last_seq": miner_output.last_seq
+        }
+    
+    # Splice the per-request output into the cached status JSON: {...status,...output}
+    body = status_json[:-1] + b',' + json.dumps(output, separators=(',', ':')).encode('utf-8')[1:]
+    return Response(body, mimetype='application/json')
+
+@app.route('/api/cores', methods=['GET'])
+def get_cores():
+    """Per-core hashrate: current, average, min and max per core plus a heatmap matrix
+    
+    heatmap.values has one row per core (same order as heatmap.cores) and one
+    column per tick, averaged down to at most ?columns=<n> (default 60).
+    A core with no value in a column is null. Cores averaging below 85% of the
+    median core are flagged as slow (throttling, SMT contention, bad pinning).
+    """
+    columns = request.args.get('columns', 60, type=int)
+    columns = max(1, min(columns, CORE_HISTORY_POINTS))
+    
+    timestamps, core_ids, rows = core_history.matrix()
+    current = {core: hs for core, hs, _ in miner.snapshot.cores}
+    
+    cores = []
+    for core_id, row in zip(core_ids, rows):
+        values = [v for v in row if v == v]  # v == v drops NaN (ticks without this core)
+        cores.append({
+            "core": core_id,
+            "current": current.get(core_id),
+            "avg": sum(values) / len(values) if values else None,
+            "min": min(values) if values else None,
+            "max": max(values) if values else None,
+            "samples": len(values)
+        })
+    averages = [core["avg"] for core in cores if core["avg"]]
+    median = statistics.median(averages) if averages else None
+    for core in cores:
+        core["relative"] = core["avg"] / median if median and core["avg"] is not None else None
+        core["slow"] = core["relative"] is not None and core["relative"] < SLOW_CORE_RATIO
+    
+    heat_timestamps, heat_rows = average_buckets(timestamps, rows, columns)
+    placement = miner.snapshot.placement
+    return jsonify({
+        "cores": cores,
+        "median_hs": median,
+        "heatmap": {"timestamps": heat_timestamps, "cores": core_ids, "values": heat_rows},
+        "ticks": len(timestamps),
+        "cpus": placement.cpus if placement else None
     })
 
-@app.route('/api/hashrate-history', methods=['GET'])
-def get_hashrate_history():
-    """Get hashrate history for charting"""
-    global chart_history
+@app.route('/api/sessions', methods=['GET'])
+def get_sessions():
+    """Past mining sessions (newest first) with aggregates per pool and per config
+    
+    ?limit=<n> (default 50, max 500) and ?offset=<n> page through the
+    sessions; ?pool=<url>, ?from=<ms> and ?to=<ms> filter sessions and
+    aggregates alike. Aggregate hashrate and temperature are averages
+    weighted by session length. "current" is the open session, if any.
+    """
+    limit = max(1, min(request.args.get('limit', 50, type=int), 500))
+    offset = max(0, request.args.get('offset', 0, type=int))
+    start_ms = request.args.get('from', type=float)
+    end_ms = request.args.get('to', type=float)
+    result = session_ledger.query(
+        limit=limit,
+        offset=offset,
+        pool=request.args.get('pool') or None,
+        since=start_ms / 1000 if start_ms is not None else None,
+        until=end_ms / 1000 if end_ms is not None else None
+    )
+    result.update(limit=limit, offset=offset)
+    return jsonify(result)
+
+@app.route('/api/shares', methods=['GET'])
+def get_share_stats():
+    """Share ledger: effective hashrate over sliding windows, reject ratio, difficulty histogram, time to block"""
+    snapshot = miner.snapshot
+    stats = miner.shares.snapshot(snapshot.hashrate_hs)
+    stats["reported_hashrate_hs"] = snapshot.hashrate_hs
+    stats["pool_difficulty"] = snapshot.stratum_difficulty
+    return jsonify(stats)
+
+@app.route('/api/output', methods=['GET'])
+def get_output():
+    """Get miner output page by page (newest first, use ?before=<from_seq> for older lines)"""
+    before = request.args.get('before', type=int)
+    limit = request.args.get('limit', 100, type=int)
+    limit = max(1, min(limit, MINER_OUTPUT_LINES))
+    
+    return jsonify(miner_output.page(before, limit)._asdict())
+
+@app.route('/api/logs', methods=['GET'])
+def get_logs():
+    """App log entries [time, level, logger, message] after ?since=<seq>&epoch=<epoch> (optionally ?level=WARNING and up)"""
+    since = request.args.get('since', 0, type=int)
+    limit = request.args.get('limit', 200, type=int)
+    level = logging.getLevelName(request.args.get('level', 'NOTSET').upper())
+    if not isinstance(level, int):
+        return jsonify({"success": False, "message": "Unknown log level"}), 400
     
-    # Optional limit parameter
+    result = log_ring.since(since, level, max(1, min(limit, 1000)), request.args.get('epoch'))._asdict()
+    result["suppressed"] = suppressed_counts()
+    return jsonify(result)
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text exposition (cheap: no config read, no psutil calls)"""
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/api/system-history', methods=['GET'])
+def get_system_history():
+    """Get CPU usage, RAM and temperature history for charting (columnar)"""
     limit = request.args.get('limit', 100, type=int)
-    limit = min(limit, 300)  # Max 300 datapoints (10 minutes at 2-second intervals)
+    limit = max(1, min(limit, CHART_HISTORY_POINTS))
     
-    # Return chart_history (already sorted by timestamp, no sorting needed)
-    history_slice = chart_history[-limit:] if chart_history else []
+    return jsonify(system_sampler.history(limit))
+
+@app.route('/api/stream', methods=['GET'])
+def stream():
+    """Server-Sent Events stream: status, hashrate, share, difficulty and output events
     
-    return jsonify({
-        "history": history_slice,
-        "count": len(chart_history)
+    Each stream holds a server thread, so at most STREAM_CLIENTS are open at
+    once; further clients get a 503 and poll /api/status instead.
+    """
+    subscriber = event_hub.subscribe()
+    if subscriber is None:
+        return jsonify({"success": False, "message": "Too many live streams - use /api/status"}), 503, {
+            'Retry-After': '60'
+        }
+    
+    def generate():
+        try:
+            # Reconnect delay for the browser + initial snapshot
+            yield b'retry: 3000\n\n'
+            yield encode_event('status', status_cache.get()[0])
+            while True:
+                messages = subscriber.wait(timeout=15)
+                # Comment line as keep-alive so proxies don't close idle streams
+                yield messages or b': keep-alive\n\n'
+        finally:
+            event_hub.unsubscribe(subscriber)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Disable proxy buffering (app_proxy / nginx)
     })
 
-if __name__ == '__main__':
-    # Initialize CPU monitoring (establish baseline)
-    print("Initializing CPU monitoring...")
-    psutil.cpu_percent(interval=1)  # Wait 1 second for baseline
-    print("CPU monitoring initialized")
+@app.route('/api/hashrate-history', methods=['GET'])
+def get_hashrate_history():
+    """Get hashrate history for charting
+    
+    Without 'from': the last 'limit' points of the live chart (max 300).
+    With 'from'/'to' (ms timestamps, 'to' defaults to now): points from the
+    persistent store, downsampled on the server to at most 'max_points'
+    (method=lttb keeps the shape, method=minmax keeps every spike).
+    format=columnar returns timestamps[]/values[] instead of row objects.
+    All values are in H/s.
+    """
+    columnar = request.args.get('format') == 'columnar'
+    start_ms = request.args.get('from', type=float)
+    
+    if start_ms is None:
+        # Optional limit parameter
+        limit = request.args.get('limit', 100, type=int)
+        limit = min(limit, CHART_HISTORY_POINTS)  # Max 300 datapoints (10 minutes at 2-second intervals)
+        
+        # Return chart_history (already sorted by timestamp, no sorting needed)
+        timestamps, values = chart_history.last(limit)
+        tier = 'live'
+        count = len(chart_history)
+    else:
+        end_ms = request.args.get('to', time.time() * 1000, type=float)
+        max_points = request.args.get('max_points', 500, type=int)
+        max_points = max(10, min(max_points, 5000))
+        method = request.args.get('method', 'lttb')
+        if method not in DOWNSAMPLE_METHODS:
+            return jsonify({"success": False, "message": f"Unknown method: {method}"}), 400
+        
+        if hashrate_store.is_open:
+            # Finest tier that covers the range (raw 1 day, minute 30 days, hour beyond)
+            result = hashrate_store.query(start_ms / 1000, end_ms / 1000)
+            timestamps = [ts * 1000 for ts in result['timestamps']]
+            values = result['values']
+            tier = result['tier']
+        else:
+            timestamps, values = chart_history.since(start_ms)
+            keep = bisect_left(timestamps, end_ms)
+            timestamps, values = timestamps[:keep], values[:keep]
+            tier = 'live'
+        
+        count = len(timestamps)
+        timestamps, values = DOWNSAMPLE_METHODS[method](timestamps, values, max_points)
+    
+    response = {
+        "count": count,
+        "tier": tier,
+        "unit": "H"  # Always H/s (base unit)
+    }
+    if columnar:
+        response["timestamps"] = timestamps
+        response["values"] = values
+    else:
+        response["history"] = [
+            {'timestamp': ts, 'value': value}
+            for ts, value in zip(timestamps, values)
+        ]
+    
+    return jsonify(response)
+
+_background_lock = threading.Lock()
+_background_started = False
+
+def start_background():
+    """Start the sampler, chart writer, pollers and proxy - once per process"""
+    global _background_started
+    with _background_lock:
+        if _background_started:
+            return
+        _background_started = True
+    
+    # Initialize CPU monitoring (sensor detection, baseline, sampler thread)
+    log.info("Initializing CPU monitoring...")
+    system_sampler.start()
+    log.info("CPU monitoring initialized (2 second sample interval)")
+    
+    # Open persistent hashrate history and warm up the chart with the last 10 minutes
+    try:
+        hashrate_store.open()
+        hashrate_store.start_flusher(interval=30)
+        timestamps, values = hashrate_store.recent(CHART_HISTORY_SECONDS)
+        for ts, value in zip(timestamps, values):
+            chart_history.append(ts * 1000, value)
+        log.info(f"Chart history restored: {len(chart_history)} datapoints")
+    except Exception as e:
+        log.error(f"Error opening hashrate store: {e}")
+    
+    # Mining session history (SQLite); closes sessions a crash left open
+    try:
+        session_ledger.open()
+        session_ledger.start_flusher(interval=60)
+    except Exception as e:
+        log.error(f"Error opening session ledger: {e}")
     
     # Start chart history writer thread for smooth, regular updates
     chart_thread = Thread(target=chart_history_writer, daemon=True)
     chart_thread.start()
-    print("Chart history writer started (2 second interval for smooth chart)")
+    log.info("Chart history writer started (2 second interval for smooth chart)")
+    
+    # Detect CPU throttling backends (cgroup v2 quota, threads, cpulimit)
+    log.info(f"Throttle backends: {get_throttle_backends()}")
+    
+    # Poll fleet peers in the background (idle without fleet_peers)
+    try:
+        configure_fleet(load_config())
+    except Exception as e:
+        log.error(f"Error in fleet settings: {e}")
+    fleet_poller.start()
+    configure_governor(load_config())
+    governor.start()
+    
+    # Re-probe configured pools in the background (only does work with 2+ pools)
+    pool_manager.start_prober()
     
-    # Check if mining was active on last run
     config = load_config()
+    
+    # Other nodes may mine through this proxy, so it runs independently of the local miner
+    if config.get('proxy_enabled') and config.get('btc_address'):
+        success, message = start_proxy(config)
+        log.info(f"Stratum proxy: {message}")
+    
+    # Check if mining was active on last run
     if config.get('mining_active'):
         # Don't auto-start, just reset the flag
-        config['mining_active'] = False
-        save_config(config)
-    
-    # Run Flask app
-    app.run(host='0.0.0.0', port=5000, debug=False)
+        config_store.update({'mining_active': False})
+
+def serve(host='0.0.0.0', port=5000):
+    """Run the web server (waitress unless HTTP_SERVER=flask or waitress is missing)"""
+    if HTTP_SERVER == 'flask' or waitress_serve is None:
+        if HTTP_SERVER != 'flask':
+            log.warning("waitress is not installed - using the Flask development server")
+        # No reloader: it would run a second copy of the background threads
+        app.run(host=host, port=port, debug=False, use_reloader=False, threaded=True)
+        return
+    log.info(f"Serving on {host}:{port} (waitress, {HTTP_THREADS} threads)")
+    waitress_serve(app, host=host, port=port, threads=HTTP_THREADS, ident='node-miner')
+
+if __name__ == '__main__':
+    start_background()
+    serve()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""Replay cpuminer logs with a known true hashrate through the estimators and report their error.
+
+Usage:
+    python3 bench/estimator_replay.py [--half-life 30]
+    python3 bench/estimator_replay.py --true-rate 34.4M bench/logs/cpuminer-sha256d-16t-synthetic.log
+
+Without log files a set of SYNTHETIC scenarios is replayed, produced by
+generate() below (same line format as cpuminer, fixed seed): steady
+mining, a CPU budget cut, threads stopping, and mixed kH/MH units. The
+bundled log is synthetic too (generated at 16 x 2150 kH/s = 34.4 MH/s).
+The estimator constants (STALE_INTERVALS, SHIFT_INTERVALS, JUMP_SIGMAS,
+...) were tuned on these same scenarios, so their results show the
+tuning, not an independent validation.
+
+To validate, capture a real log with a rate known independently of the
+log, e.g. the total of a cpuminer --benchmark run with the same threads
+and CPU budget, and pass it with --true-rate.
+
+Per estimator: mean absolute error and bias against the true rate, the
+share of time the true rate was inside the 95% band, and how long after
+a change the estimate took to get within 5% again.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from estimator import ESTIMATORS, create_estimator  # noqa: E402
+from miner_parser import parse_line, to_hs, CoreHashrate, ShareResult  # noqa: E402
+
+_TIMESTAMP = re.compile(r'^\[(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)\]')
+WARMUP_SECONDS = 15
+
+
+def _stamp(t):
+    return time.strftime('[%Y-%m-%d %H:%M:%S]', time.gmtime(t))
+
+
+def _rate(hs, unit):
+    return f"{hs / (1e6 if unit == 'MH' else 1e3):.2f} {unit}/s"
+
+
+def generate(cores, truth, seconds=600, interval=5.0, noise=0.03, share_seconds=20.0, mixed_units=False, seed=1):
+    """cpuminer-style lines for per-core true rates truth(core, t) (H/s, 0 = thread stopped)"""
+    rng = random.Random(seed)
+    start = 1704542400
+    lines = []
+    latest = {}
+    next_report = {core: rng.uniform(0, interval) for core in range(cores)}
+    next_share = rng.expovariate(1 / share_seconds)
+    accepted = 0
+    for step in range(int(seconds * 10)):
+        t = step / 10
+        for core in range(cores):
+            if t >= next_report[core]:
+                next_report[core] = t + interval * rng.uniform(0.8, 1.2)
+                rate = truth(core, t)
+                if rate <= 0:
+                    latest.pop(core, None)
+                    continue
+                latest[core] = rate * rng.gauss(1, noise)
+                unit = 'MH' if mixed_units and rng.random() < 0.5 else 'kH'
+                lines.append(f"{_stamp(start + t)} CPU #{core}: {_rate(latest[core], unit)}")
+        if t >= next_share:
+            next_share = t + rng.expovariate(1 / share_seconds)
+            accepted += 1
+            lines.append(f"{_stamp(start + t)} accepted: {accepted}/{accepted} (diff 0.100), "
+                         f"{_rate(sum(latest.values()), 'kH')} (yes!)")
+    return lines, lambda t: sum(truth(core, t - start) for core in range(cores))
+
+
+SCENARIOS = {
+    'steady (16 threads)': dict(cores=16, truth=lambda core, t: 2150e3),
+    'budget cut 50% -> 25% at 300 s': dict(cores=8, truth=lambda core, t: 2000e3 if t < 300 else 1000e3),
+    '2 of 8 threads stop at 300 s': dict(cores=8, truth=lambda core, t: 0 if core >= 6 and t >= 300 else 2000e3),
+    'mixed kH/MH units': dict(cores=4, truth=lambda core, t: 900e3, mixed_units=True),
+}
+
+
+def load_log(path):
+    with open(path, 'r', errors='ignore') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def replay(lines, true_rate, kind, half_life):
+    """(mean abs error %, bias %, band coverage %, settle seconds or None)"""
+    estimator = create_estimator(kind, half_life)
+    events = []
+    for line in lines:
+        m = _TIMESTAMP.match(line)
+        if not m:
+            continue
+        t = time.mktime(time.strptime(m.group(1), '%Y-%m-%d %H:%M:%S')) - time.timezone
+        event = parse_line(line)
+        if type(event) is CoreHashrate:
+            events.append((t, 'core', event.core_id, to_hs(event.value, event.unit)))
+        elif type(event) is ShareResult and event.value is not None:
+            events.append((t, 'total', None, to_hs(event.value, event.unit)))
+    if not events:
+        return None
+    start, end = events[0][0], events[-1][0]
+    errors, signed, covered = [], [], 0
+    settle, changed_at, previous_truth = None, None, true_rate(start)
+    index = 0
+    t = start
+    while t <= end:
+        while index < len(events) and events[index][0] <= t:
+            _, source, core_id, hs = events[index]
+            if source == 'core':
+                estimator.core(core_id, hs, events[index][0])
+            else:
+                estimator.total(hs, events[index][0])
+            index += 1
+        truth = true_rate(t)
+        estimate = estimator.estimate(t)
+        if truth != previous_truth:
+            changed_at, settle, previous_truth = t, None, truth
+        if changed_at is not None and settle is None and abs(estimate.value - truth) <= 0.05 * truth:
+            settle = t - changed_at
+        if t - start >= WARMUP_SECONDS:
+            errors.append(abs(estimate.value - truth) / truth)
+            signed.append((estimate.value - truth) / truth)
+            covered += estimate.low <= truth <= estimate.high
+        t += 1.0
+    n = max(1, len(errors))
+    return sum(errors) / n * 100, sum(signed) / n * 100, covered / n * 100, settle
+
+
+def parse_rate(text):
+    """'34.4M' / '900k' / '1500000' -> H/s"""
+    text = text.strip()
+    factor = {'k': 1e3, 'K': 1e3, 'M': 1e6, 'G': 1e9}.get(text[-1:], None)
+    return float(text[:-1]) * factor if factor else float(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('logs', nargs='*', help='recorded cpuminer logs (needs --true-rate)')
+    parser.add_argument('--true-rate', help='true total hashrate of the recorded logs, e.g. 34.4M')
+    parser.add_argument('--half-life', type=float, default=30.0, help='estimator half-life in seconds')
+    args = parser.parse_args()
+
+    if args.logs:
+        if not args.true_rate:
+            print("--true-rate is required for recorded logs")
+            return 1
+        rate = parse_rate(args.true_rate)
+        cases = [(os.path.basename(path), load_log(path), lambda t, rate=rate: rate) for path in args.logs]
+    else:
+        print("Synthetic scenarios (generated; the estimator constants were tuned on them)\n")
+        cases = [(f"{name} [synthetic]", *generate(**spec)) for name, spec in SCENARIOS.items()]
+
+    for name, lines, true_rate in cases:
+        print(f"{name} ({len(lines)} lines)")
+        print(f"  {'estimator':<10} {'mean err':>9} {'bias':>8} {'in band':>8} {'settle':>8}")
+        for kind in ESTIMATORS:
+            result = replay(lines, true_rate, kind, args.half_life)
+            if result is None:
+                print(f"  {kind:<10} no hashrate lines")
+                continue
+            error, bias, coverage, settle = result
+            settle_text = '-' if settle is None else f"{settle:.0f} s"
+            print(f"  {kind:<10} {error:>8.2f}% {bias:>+7.2f}% {coverage:>7.0f}% {settle_text:>8}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
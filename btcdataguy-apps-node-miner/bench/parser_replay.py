@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Replay cpuminer logs through the line parser and report lines/sec.
+
+Usage:
+    python3 bench/parser_replay.py [--seconds 3] [log files...]
+
+Without arguments all logs in bench/logs/ are replayed. The legacy
+substring + uncompiled re.search path from the old monitor_miner_output is
+measured as well so both numbers can be compared on the same box.
+
+The bundled cpuminer-sha256d-16t-synthetic.log is SYNTHETIC: generated in
+cpuminer-multi --debug --no-color format (16 threads reporting every 5 s,
+pool.example.com), not captured from a real miner. Its line mix is more
+regular than real output, so pass real captures (cpuminer ... -D 2>&1 |
+tee miner.log) for numbers that carry over.
+"""
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from miner_parser import parse_line  # noqa: E402
+
+
+def legacy_parse(line_str):
+    """Classification as done by monitor_miner_output before the parser module"""
+    event = None
+    if 'CPU #' in line_str and '/s' in line_str:
+        core_match = re.search(r'CPU #(\d+):\s*([\d.]+)\s*(H|kH|MH|GH)/s', line_str, re.IGNORECASE)
+        if core_match:
+            event = ('core', core_match.group(1), float(core_match.group(2)))
+    elif 'accepted:' in line_str:
+        hashrate_match = re.search(r'accepted:.*?([\d.]+)\s*(H|kH|MH|GH)/s', line_str, re.IGNORECASE)
+        if hashrate_match:
+            event = ('accepted', float(hashrate_match.group(1)))
+    if 'share diff' in line_str:
+        diff_match = re.search(r'share diff ([\d.]+)', line_str, re.IGNORECASE)
+        if diff_match:
+            event = ('share_diff', float(diff_match.group(1)))
+    return event
+
+
+def replay(parse, lines, seconds):
+    """Parse lines in a loop for ~seconds, return lines/sec"""
+    parsed = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for line in lines:
+            parse(line)
+        parsed += len(lines)
+    return parsed / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('logs', nargs='*', help='cpuminer log files (default: bench/logs/*.log)')
+    parser.add_argument('--seconds', type=float, default=3.0, help='time budget per parser')
+    args = parser.parse_args()
+
+    paths = args.logs or sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs', '*.log')))
+    if not paths:
+        print("No log files found")
+        return 1
+
+    lines = []
+    for path in paths:
+        with open(path, 'r', errors='ignore') as f:
+            lines.extend(line.strip() for line in f if line.strip())
+
+    kinds = Counter(type(parse_line(line)).__name__ for line in lines)
+    print(f"Replaying {len(lines)} lines from {len(paths)} file(s)")
+    synthetic = [os.path.basename(path) for path in paths if 'synthetic' in os.path.basename(path)]
+    if synthetic:
+        print(f"  synthetic (generated, not a real capture): {', '.join(synthetic)}")
+    for kind, count in kinds.most_common():
+        print(f"  {kind:<18} {count}")
+
+    legacy_rate = replay(legacy_parse, lines, args.seconds)
+    parser_rate = replay(parse_line, lines, args.seconds)
+
+    print(f"legacy (substring + re.search): {legacy_rate:>12,.0f} lines/sec")
+    print(f"miner_parser.parse_line:        {parser_rate:>12,.0f} lines/sec")
+    print(f"speedup:                        {parser_rate / legacy_rate:>12.2f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""Fixed-capacity buffers shared by the miner monitor, chart writer and API."""
+import math
+import os
+import re
+from array import array
+from collections import deque
+from itertools import islice
+from threading import Lock
+from typing import List, NamedTuple
+
+
+class TimeSeriesBuffer:
+    """Ring buffer of (timestamp, value) points.
+
+    Points live in two preallocated parallel float arrays (no per-point
+    objects). Appending is O(1): the oldest point is overwritten when the
+    buffer is full and points older than max_age are trimmed from the left.
+    Timestamps must be appended in non-decreasing order, which lets
+    since() binary-search instead of scanning.
+    """
+    __slots__ = ('capacity', 'max_age', '_ts', '_values', '_start', '_count', '_lock')
+
+    def __init__(self, capacity, max_age=None):
+        self.capacity = capacity
+        self.max_age = max_age  # same unit as the timestamps, None = no age limit
+        self._ts = array('d', bytes(8 * capacity))
+        self._values = array('d', bytes(8 * capacity))
+        self._start = 0
+        self._count = 0
+        self._lock = Lock()
+
+    def __len__(self):
+        return self._count
+
+    def append(self, timestamp, value):
+        """Add a point, dropping the oldest one when full"""
+        with self._lock:
+            if self._count == self.capacity:
+                idx = self._start
+                self._start = (self._start + 1) % self.capacity
+            else:
+                idx = (self._start + self._count) % self.capacity
+                self._count += 1
+            self._ts[idx] = timestamp
+            self._values[idx] = value
+
+            # Time-based trimming from the left (amortized O(1))
+            if self.max_age is not None:
+                cutoff = timestamp - self.max_age
+                while self._count and self._ts[self._start] <= cutoff:
+                    self._start = (self._start + 1) % self.capacity
+                    self._count -= 1
+
+    def clear(self):
+        """Drop all points (arrays stay allocated)"""
+        with self._lock:
+            self._start = 0
+            self._count = 0
+
+    def latest(self):
+        """Most recent (timestamp, value) or None if empty"""
+        with self._lock:
+            if not self._count:
+                return None
+            idx = (self._start + self._count - 1) % self.capacity
+            return self._ts[idx], self._values[idx]
+
+    def last(self, n):
+        """Last n points as (timestamps, values) lists, oldest first"""
+        with self._lock:
+            n = max(0, min(n, self._count))
+            return self._slice(self._count - n, self._count)
+
+    def since(self, timestamp):
+        """All points with a timestamp strictly greater than the given one"""
+        with self._lock:
+            # Binary search over logical indices
+            lo, hi = 0, self._count
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self._ts[(self._start + mid) % self.capacity] <= timestamp:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            return self._slice(lo, self._count)
+
+    def _slice(self, first, end):
+        """Copy logical range [first, end) out of the ring (caller holds the lock)"""
+        if first >= end:
+            return [], []
+        a = (self._start + first) % self.capacity
+        b = a + (end - first)
+        if b <= self.capacity:
+            return self._ts[a:b].tolist(), self._values[a:b].tolist()
+        b -= self.capacity
+        return (self._ts[a:].tolist() + self._ts[:b].tolist(),
+                self._values[a:].tolist() + self._values[:b].tolist())
+
+
+class LineSlice(NamedTuple):
+    """Contiguous run of lines out of a LineBuffer.
+
+    from_seq is the sequence number of lines[0] (last_seq + 1 if empty),
+    first_seq/last_seq describe what the buffer still holds. Sequence
+    numbers are only comparable within the same epoch.
+    """
+    epoch: str
+    first_seq: int
+    last_seq: int
+    from_seq: int
+    lines: List[str]
+
+
+class LineBuffer:
+    """Bounded buffer of text lines with monotonically increasing sequence numbers.
+
+    The first line ever appended gets seq 1. Sequence numbers keep counting
+    across clear(), so a client that remembers the last seq it has seen can
+    ask for just the newer lines and notice when older ones were dropped.
+    """
+    __slots__ = ('capacity', 'epoch', '_lines', '_last_seq', '_lock')
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        # Random id per buffer instance, lets clients detect a server restart
+        self.epoch = os.urandom(4).hex()
+        self._lines = deque(maxlen=capacity)
+        self._last_seq = 0
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._lines)
+
+    @property
+    def last_seq(self):
+        return self._last_seq
+
+    @property
+    def first_seq(self):
+        """Sequence number of the oldest buffered line (last_seq + 1 if empty)"""
+        with self._lock:
+            return self._last_seq - len(self._lines) + 1
+
+    def append(self, line):
+        """Add a line and return its sequence number"""
+        with self._lock:
+            self._lines.append(line)
+            self._last_seq += 1
+            return self._last_seq
+
+    def clear(self):
+        """Drop all lines (sequence numbers are not reset)"""
+        with self._lock:
+            self._lines.clear()
+
+    def lines(self):
+        """Copy of all buffered lines, oldest first"""
+        with self._lock:
+            return list(self._lines)
+
+    def since(self, seq, limit=None, epoch=None):
+        """Lines with a sequence number greater than seq (at most limit, oldest first)
+
+        epoch is the one the client got seq from; a different one (or, without
+        epoch, a seq beyond last_seq) is a cursor from a previous process.
+        """
+        with self._lock:
+            if (epoch is not None and epoch != self.epoch) or seq > self._last_seq:
+                # Cursor from a previous process (seq restarted) - send everything
+                seq = 0
+            first_seq = self._last_seq - len(self._lines) + 1
+            from_seq = max(seq + 1, first_seq)
+            start = from_seq - first_seq
+            stop = len(self._lines) if limit is None else min(len(self._lines), start + limit)
+            lines = list(islice(self._lines, start, stop)) if start < stop else []
+            return LineSlice(self.epoch, first_seq, self._last_seq, min(from_seq, self._last_seq + 1), lines)
+
+    def page(self, before=None, limit=100):
+        """Up to limit lines older than seq before (default: the newest lines)"""
+        with self._lock:
+            first_seq = self._last_seq - len(self._lines) + 1
+            end_seq = self._last_seq + 1 if before is None else min(before, self._last_seq + 1)
+            from_seq = max(first_seq, end_seq - max(0, limit))
+            if from_seq >= end_seq:
+                return LineSlice(self.epoch, first_seq, self._last_seq, end_seq, [])
+            lines = list(islice(self._lines, from_seq - first_seq, end_seq - first_seq))
+            return LineSlice(self.epoch, first_seq, self._last_seq, from_seq, lines)
+
+
+def _core_number(core_id):
+    """Sort key: "CPU #12" -> 12"""
+    m = re.search(r'(\d+)$', core_id)
+    return (int(m.group(1)) if m else -1, core_id)
+
+
+class CoreHistory:
+    """Per-core rates on a shared tick ring (one row per tick, one column per core).
+
+    One timestamp array for the ticks plus one preallocated float array per
+    core, allocated when the core first shows up - memory is
+    capacity * (cores + 1) doubles however long it runs. A core missing at a
+    tick is stored as NaN.
+    """
+    __slots__ = ('capacity', '_ts', '_cores', '_start', '_count', '_lock')
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._ts = array('d', bytes(8 * capacity))
+        self._cores = {}  # {"CPU #0": array of H/s}
+        self._start = 0
+        self._count = 0
+        self._lock = Lock()
+
+    def __len__(self):
+        return self._count
+
+    def record(self, timestamp, rates):
+        """One tick: rates is an iterable of (core id, H/s)"""
+        with self._lock:
+            if self._count == self.capacity:
+                idx = self._start
+                self._start = (self._start + 1) % self.capacity
+            else:
+                idx = (self._start + self._count) % self.capacity
+                self._count += 1
+            self._ts[idx] = timestamp
+            seen = set()
+            for core_id, hs in rates:
+                values = self._cores.get(core_id)
+                if values is None:
+                    values = self._cores[core_id] = array('d', [math.nan]) * self.capacity
+                values[idx] = hs
+                seen.add(core_id)
+            for core_id, values in self._cores.items():
+                if core_id not in seen:
+                    values[idx] = math.nan
+
+    def clear(self):
+        """Drop all ticks and cores"""
+        with self._lock:
+            self._cores = {}
+            self._start = 0
+            self._count = 0
+
+    def _ordered(self, values):
+        """Logical (oldest first) copy of one ring array (caller holds the lock)"""
+        end = self._start + self._count
+        if end <= self.capacity:
+            return values[self._start:end].tolist()
+        return values[self._start:].tolist() + values[:end - self.capacity].tolist()
+
+    def matrix(self):
+        """(timestamps, [core ids], [[H/s or NaN per tick] per core]) oldest first"""
+        with self._lock:
+            core_ids = sorted(self._cores, key=_core_number)
+            return self._ordered(self._ts), core_ids, [self._ordered(self._cores[core_id]) for core_id in core_ids]
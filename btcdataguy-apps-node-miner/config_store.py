@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""In-memory config.json cache with atomic writes and deferred flushes."""
+import atexit
+import copy
+import json
+import logging
+import os
+import stat
+import tempfile
+import time
+from threading import RLock, Timer
+
+log = logging.getLogger(__name__)
+
+
+class ConfigStore:
+    """Keeps the parsed config in memory and re-reads it only when the file changes.
+
+    - load() returns a copy of the cached config. The file is stat()ed at
+      most once per check_interval and only re-parsed when its mtime, size
+      or inode changed (e.g. edited by hand or replaced by a restore).
+    - save()/update() write through a temp file + os.replace, so a crash
+      mid-write never leaves a truncated config.json behind.
+    - update_deferred() applies changes in memory immediately and coalesces
+      them into a single background write after flush_delay seconds.
+    - version goes up whenever the cached config changes (ETags for clients).
+    """
+
+    def __init__(self, path, defaults, check_interval=1.0, flush_delay=5.0):
+        self.path = path
+        self.defaults = defaults
+        self.check_interval = check_interval
+        self.flush_delay = flush_delay
+        self._lock = RLock()
+        self._config = None
+        self._signature = None
+        self._last_check = 0.0
+        self._pending = {}
+        self._flush_timer = None
+        self.version = 0
+        atexit.register(self.flush)
+
+    def load(self):
+        """Return a copy of the current config (defaults are created on first use)"""
+        with self._lock:
+            self._check()
+            return copy.deepcopy(self._config)
+
+    def load_versioned(self):
+        """(version, copy of the config) read together"""
+        with self._lock:
+            self._check()
+            return self.version, copy.deepcopy(self._config)
+
+    def save(self, config):
+        """Replace the whole config and write it to disk atomically"""
+        with self._lock:
+            self._config = copy.deepcopy(config)
+            self._config.update(self._pending)
+            self.version += 1
+            return self._write()
+
+    def update(self, changes):
+        """Apply changes to the cached config and write it to disk atomically"""
+        with self._lock:
+            self._check()
+            self._config.update(changes)
+            self._config.update(self._pending)
+            self.version += 1
+            return self._write()
+
+    def update_deferred(self, changes):
+        """Apply changes in memory now, write them in the background later"""
+        with self._lock:
+            self._check()
+            self._config.update(changes)
+            self._pending.update(changes)
+            self.version += 1
+            if self._flush_timer is None:
+                self._flush_timer = Timer(self.flush_delay, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def flush(self):
+        """Write pending deferred changes (no-op if there are none)"""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if self._pending:
+                self._write()
+
+    def _check(self):
+        """Refresh from disk at most once per check_interval (caller holds the lock)"""
+        now = time.monotonic()
+        if self._config is None or now - self._last_check >= self.check_interval:
+            self._last_check = now
+            self._refresh()
+
+    def _refresh(self):
+        """Re-read the file if it changed since the last read (caller holds the lock)"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            if self._config is None:
+                # Create default config
+                self._config = copy.deepcopy(self.defaults)
+                self._config.update(self._pending)
+                self._write()
+            return
+        except OSError as e:
+            log.error(f"Error checking config: {e}")
+            if self._config is None:
+                self._config = copy.deepcopy(self.defaults)
+            return
+
+        signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+        if signature == self._signature and self._config is not None:
+            return
+
+        try:
+            with open(self.path, 'r') as f:
+                config = json.load(f)
+            self._signature = signature
+        except Exception as e:
+            log.error(f"Error loading config: {e}")
+            if self._config is None:
+                self._config = copy.deepcopy(self.defaults)
+            return
+
+        # Deferred changes not yet on disk win over the file contents
+        config.update(self._pending)
+        self._config = config
+        self.version += 1
+
+    def _write(self):
+        """Atomically write the cached config (caller holds the lock)"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            try:
+                mode = stat.S_IMODE(os.stat(self.path).st_mode)
+            except OSError:
+                mode = 0o644
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.config-', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    # mkstemp creates the file 0600 - keep config.json's permissions
+                    os.fchmod(f.fileno(), mode)
+                    json.dump(self._config, f, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+            st = os.stat(self.path)
+            self._signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+            self._pending.clear()
+            return True
+        except Exception as e:
+            log.error(f"Error saving config: {e}")
+            return False
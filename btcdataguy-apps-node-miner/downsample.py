@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Server-side downsampling of (x, y) series for charting."""
+
+
+def lttb(xs, ys, threshold):
+    """Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last point and, for every bucket in between, the
+    point that forms the largest triangle with the previously kept point
+    and the average of the next bucket. Preserves the visual shape of the
+    series (peaks and dips) far better than plain averaging.
+    Returns new (xs, ys) lists with at most threshold points.
+    """
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(xs), list(ys)
+
+    out_x = [xs[0]]
+    out_y = [ys[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+
+    for i in range(threshold - 2):
+        # Average of the next bucket
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        span = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / span
+        avg_y = sum(ys[next_start:next_end]) / span
+
+        # Point in the current bucket with the largest triangle area
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        ax = xs[a]
+        ay = ys[a]
+        best = start
+        best_area = -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = j
+        out_x.append(xs[best])
+        out_y.append(ys[best])
+        a = best
+
+    out_x.append(xs[-1])
+    out_y.append(ys[-1])
+    return out_x, out_y
+
+
+def minmax(xs, ys, max_points):
+    """Min/max bucket downsampling.
+
+    Splits the series into max_points // 2 buckets and keeps the lowest
+    and highest point of each (in time order), so no spike is ever lost.
+    Returns new (xs, ys) lists with at most max_points points.
+    """
+    n = len(xs)
+    buckets = max_points // 2
+    if n <= max_points or buckets < 1:
+        return list(xs), list(ys)
+
+    out_x = []
+    out_y = []
+    size = n / buckets
+    for b in range(buckets):
+        start = int(b * size)
+        end = int((b + 1) * size)
+        if start >= end:
+            continue
+        lo = hi = start
+        for j in range(start + 1, end):
+            if ys[j] < ys[lo]:
+                lo = j
+            elif ys[j] > ys[hi]:
+                hi = j
+        for j in sorted({lo, hi}):
+            out_x.append(xs[j])
+            out_y.append(ys[j])
+    return out_x, out_y
+
+
+METHODS = {
+    'lttb': lttb,
+    'minmax': minmax
+}
+
+
+def average_buckets(xs, rows, max_points):
+    """Average several aligned series (rows sharing xs) into at most max_points buckets.
+
+    NaN values are skipped; a bucket with no value left is None. Returns
+    (first x of every bucket, averaged rows) - the columns stay aligned
+    across rows, which per-series methods like lttb don't guarantee.
+    """
+    n = len(xs)
+    if n == 0:
+        return [], [[] for _ in rows]
+    buckets = max(1, min(max_points, n))
+    bounds = [round(i * n / buckets) for i in range(buckets + 1)]
+    out_x = [xs[bounds[i]] for i in range(buckets)]
+    out_rows = []
+    for row in rows:
+        out = []
+        for i in range(buckets):
+            chunk = [v for v in row[bounds[i]:bounds[i + 1]] if v == v]  # v == v drops NaN
+            out.append(sum(chunk) / len(chunk) if chunk else None)
+        out_rows.append(out)
+    return out_x, out_rows
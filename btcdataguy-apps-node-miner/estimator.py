@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""Hashrate estimators: per-core and total samples in, one H/s figure with a confidence band out.
+
+cpuminer reports two things: every thread's own rate ("CPU #3: ...") and,
+with each share, the total ("accepted: ..., 8820.41 kH/s"). All samples
+are converted to H/s by the caller. Each core and the total get their own
+filter; the cores are summed and combined with the total by inverse
+variance, so whichever source is fresher and steadier counts more.
+
+    ewma    exponential moving average with a half-life in seconds
+    kalman  random-walk Kalman filter, measurement noise learned online
+    blend   the old fixed 70% accepted / 30% core sum, for comparison
+
+The filters are time-aware: a sample's weight depends on its age, not on
+how many samples came after it. A real change of the rate (CPU budget
+cut, throttling) shows up as far-off samples on the same side, two in a
+row from one core or one each from two cores. The filters then let go of
+their history instead of needing several half-lives to catch up.
+
+A core that misses STALE_INTERVALS of its usual reports (at most
+stale_after seconds) fades out of the sum instead of dropping out at
+once. The uncertainty of a source grows with the time since its last
+sample (drift), so a stale total doesn't hold the estimate in place.
+
+estimate() returns the value and the 95% band in H/s.
+"""
+import math
+from typing import NamedTuple
+
+Z95 = 1.96
+# Relative uncertainty of a source with a single sample
+PRIOR_REL = 0.1
+# Relative drift of the true rate per sqrt(second) when unobserved
+DRIFT_REL = 0.01
+# Cores faded below this weight are forgotten
+MIN_CORE_WEIGHT = 0.01
+# STALE_INTERVALS, JUMP_* and SHIFT_INTERVALS were tuned on the synthetic scenarios of
+# bench/estimator_replay.py, not validated on real captures
+# A core is stale after missing this many of its usual reports (at most stale_after seconds)
+STALE_INTERVALS = 2
+# A level shift: this many samples in a row, all off by JUMP_SIGMAS in the same direction
+JUMP_SAMPLES = 2
+JUMP_SIGMAS = 4.0
+# ... or far-off samples of two cores, the same direction, within this many report intervals
+SHIFT_INTERVALS = 1.5
+
+
+class Estimate(NamedTuple):
+    value: float  # H/s
+    low: float
+    high: float
+
+
+class EwmaFilter:
+    """Time-aware EWMA of the samples, with their spread and the effective sample count"""
+    __slots__ = ('half_life', 'mean', 'spread', 'last', 'jumps', 'held', '_s1', '_s2', '_side')
+
+    def __init__(self, half_life):
+        self.half_life = half_life
+        self.mean = None
+        self.spread = 0.0  # Variance of the samples around the mean
+        self.last = None
+        self.jumps = 0
+        self.held = None  # (value, t) of a far-off sample waiting for confirmation
+        self._s1 = 0.0  # Sum of weights
+        self._s2 = 0.0  # Sum of squared weights
+        self._side = 0  # Consecutive far-off samples (+ above, - below)
+
+    def update(self, value, t):
+        if self.mean is None:
+            self.mean = value
+            self.spread = (PRIOR_REL * value) ** 2
+            self._s1 = self._s2 = 1.0
+        else:
+            decay = 0.5 ** (max(0.0, t - self.last) / self.half_life)
+            if _level_shift(self, value - self.mean, self.spread):
+                self.restart(value, t)
+                return
+            if self._side:
+                # Far off, not confirmed yet - an outlier until the next sample says otherwise
+                self.held = (value, t)
+                return
+            alpha = 1.0 / (decay * self._s1 + 1.0)  # Weight of this sample among all
+            diff = value - self.mean
+            self.mean += alpha * diff
+            self.spread = (1 - alpha) * (self.spread + alpha * diff * diff)
+            self._s1 = decay * self._s1 + 1.0
+            self._s2 = decay * decay * self._s2 + 1.0
+        self.held = None
+        self.last = t
+
+    def restart(self, value, t):
+        """Start over at a new level (the noise level stays)"""
+        self.mean = value
+        self._s1 = self._s2 = 1.0
+        self.last = t
+        self.held = None
+        self._side = 0
+
+    def variance(self, t):
+        """Uncertainty of the mean at time t"""
+        # Weighted mean of n_eff = s1^2/s2 samples, plus drift since the last one
+        drift = (DRIFT_REL * self.mean) ** 2 * max(0.0, t - self.last)
+        return self.spread * self._s2 / (self._s1 * self._s1) + drift
+
+
+class KalmanFilter:
+    """Scalar Kalman filter for a randomly drifting rate.
+
+    Process noise is DRIFT_REL of the rate per sqrt(second); the
+    measurement noise is estimated from the innovations with the half-life.
+    """
+    __slots__ = ('half_life', 'mean', 'error', 'noise', 'last', 'jumps', 'held', '_side')
+
+    def __init__(self, half_life):
+        self.half_life = half_life
+        self.mean = None
+        self.error = 0.0  # P: variance of the estimate
+        self.noise = 0.0  # R: measurement noise variance
+        self.last = None
+        self.jumps = 0
+        self.held = None
+        self._side = 0
+
+    def update(self, value, t):
+        if self.mean is None:
+            self.mean = value
+            self.error = self.noise = (PRIOR_REL * value) ** 2
+            self.last = t
+            return
+        dt = max(0.0, t - self.last)
+        error = self.error + (DRIFT_REL * self.mean) ** 2 * dt
+        innovation = value - self.mean
+        if _level_shift(self, innovation, error + self.noise):
+            # The rate moved: the old estimate is as uncertain as the jump
+            error += innovation * innovation
+        elif self._side:
+            # Far off, not confirmed yet - an outlier until the next sample says otherwise
+            self.held = (value, t)
+            return
+        # Innovation variance is P + R; learn R from what is left over
+        alpha = 1 - 0.5 ** (max(dt, 1.0) / self.half_life)
+        floor = (0.001 * self.mean) ** 2
+        self.noise = max(floor, (1 - alpha) * self.noise + alpha * max(0.0, innovation * innovation - error))
+        gain = error / (error + self.noise)
+        self.mean += gain * innovation
+        self.error = (1 - gain) * error
+        self.held = None
+        self.last = t
+
+    def restart(self, value, t):
+        """Start over at a new level, as uncertain as one measurement"""
+        self.mean = value
+        self.error = self.noise
+        self.last = t
+        self.held = None
+        self._side = 0
+
+    def variance(self, t):
+        return self.error + (DRIFT_REL * self.mean) ** 2 * max(0.0, t - self.last)
+
+
+def _level_shift(f, diff, variance):
+    """Track consecutive far-off samples on one side; True when they add up to a shift.
+
+    Afterwards f._side is non-zero while a far-off sample waits for confirmation.
+    """
+    if variance <= 0 or diff * diff <= JUMP_SIGMAS * JUMP_SIGMAS * variance:
+        f._side = 0
+        return False
+    side = 1 if diff > 0 else -1
+    f._side = f._side + side if f._side * side > 0 else side
+    if abs(f._side) >= JUMP_SAMPLES:
+        f._side = 0
+        f.jumps += 1
+        return True
+    return False
+
+
+FILTERS = {'ewma': EwmaFilter, 'kalman': KalmanFilter}
+
+
+class Estimator:
+    """Combines per-core filters (summed) with a filter on the reported total"""
+
+    def __init__(self, kind='ewma', half_life=30.0, stale_after=30.0):
+        self.kind = kind
+        self.half_life = half_life
+        self.stale_after = stale_after
+        self._filter = FILTERS[kind]
+        self._cores = {}
+        self._seen = {}  # {core id: (last report, average report interval or None)}
+        self._total = None
+        self._shift = None  # (side, t) of the last level shift of a core
+
+    def reset(self):
+        self._cores = {}
+        self._seen = {}
+        self._total = None
+        self._shift = None
+
+    def core(self, core_id, hs, t):
+        core = self._cores.get(core_id)
+        if core is None:
+            core = self._cores[core_id] = self._filter(self.half_life)
+        seen = self._seen.get(core_id)
+        if seen is None:
+            self._seen[core_id] = (t, None)
+        else:
+            last, interval = seen
+            dt = max(0.0, t - last)
+            self._seen[core_id] = (t, dt if interval is None else interval + 0.3 * (dt - interval))
+        jumps, before = core.jumps, core.mean
+        core.update(hs, t)
+        if core.jumps != jumps:
+            self._shift = (1 if hs > before else -1, t)
+        elif core.held is not None:
+            self._confirm_shift(core_id, core, t)
+
+    def _confirm_shift(self, core_id, core, t):
+        """A far-off core sample is a level shift right away if other cores moved the same way.
+
+        A budget cut or throttling hits every core at once, so one far-off
+        report from a second core confirms it - no need to wait for each
+        core's next report. The total is then dropped: it was summed from
+        the old levels and restarts with the next share.
+        """
+        side = 1 if core.held[0] > core.mean else -1
+        interval = self._seen[core_id][1]
+        window = SHIFT_INTERVALS * interval if interval else self.stale_after
+        others = [f for other_id, f in self._cores.items()
+                  if other_id != core_id and f.held is not None
+                  and (f.held[0] > f.mean) == (side > 0) and t - f.held[1] <= window]
+        recent = self._shift is not None and self._shift[0] == side and t - self._shift[1] <= window
+        if not others and not recent:
+            return
+        for f in others + [core]:
+            f.jumps += 1
+            f.restart(*f.held)
+        self._shift = (side, t)
+        self._total = None
+
+    def total(self, hs, t):
+        if self._total is None:
+            self._total = self._filter(self.half_life)
+        self._total.update(hs, t)
+
+    def _core_weight(self, core_id, t):
+        """1 while the core reports as usual, then halving every quarter of the stale time"""
+        last, interval = self._seen[core_id]
+        stale = self.stale_after if interval is None else min(self.stale_after, max(1.0, STALE_INTERVALS * interval))
+        age = t - last
+        if age <= stale:
+            return 1.0
+        return 0.5 ** ((age - stale) / (stale / 4))
+
+    def cores(self, t):
+        """{core id: (H/s, weight)} - forgets cores that have faded out"""
+        result = {}
+        for core_id, core in list(self._cores.items()):
+            weight = self._core_weight(core_id, t)
+            if weight < MIN_CORE_WEIGHT:
+                del self._cores[core_id]
+                del self._seen[core_id]
+            else:
+                result[core_id] = (core.mean, weight)
+        return result
+
+    def estimate(self, t):
+        sources = []
+        if self._cores:
+            value = variance = 0.0
+            for core_id, core in list(self._cores.items()):
+                weight = self._core_weight(core_id, t)
+                if weight < MIN_CORE_WEIGHT:
+                    continue
+                value += weight * core.mean
+                variance += weight * weight * core.variance(t)
+            if value > 0:
+                sources.append((value, variance))
+        if self._total is not None and self._total.mean > 0:
+            total = (self._total.mean, self._total.variance(t))
+            # The total only sums the threads that have reported (a few right after
+            # start) - far off the core sum, the cores are the better source
+            if not sources or (total[0] - sources[0][0]) ** 2 <= JUMP_SIGMAS ** 2 * (total[1] + sources[0][1]):
+                sources.append(total)
+        if not sources:
+            return Estimate(0.0, 0.0, 0.0)
+        if len(sources) == 1:
+            value, variance = sources[0]
+        else:
+            # Inverse-variance weighting (a source with no spread yet wins outright)
+            weights = [1.0 / variance if variance > 0 else 1e300 for _, variance in sources]
+            total_weight = sum(weights)
+            value = sum(w * v for w, (v, _) in zip(weights, sources)) / total_weight
+            variance = 1.0 / total_weight
+        band = Z95 * math.sqrt(max(0.0, variance))
+        return Estimate(value, max(0.0, value - band), value + band)
+
+
+class BlendEstimator:
+    """The original fixed blend: 70% last accepted total + 30% core sum, cores dropped after 30 s"""
+    kind = 'blend'
+
+    def __init__(self, kind='blend', half_life=None, stale_after=30.0):
+        self.half_life = half_life
+        self.stale_after = stale_after
+        self._cores = {}
+        self._accepted = 0.0
+
+    def reset(self):
+        self._cores = {}
+        self._accepted = 0.0
+
+    def core(self, core_id, hs, t):
+        self._cores = {c: v for c, v in self._cores.items() if t - v[1] < self.stale_after}
+        self._cores[core_id] = (hs, t)
+
+    def total(self, hs, t):
+        self._accepted = hs
+
+    def cores(self, t):
+        return {core_id: (hs, 1.0) for core_id, (hs, _) in self._cores.items()}
+
+    def estimate(self, t):
+        cores_sum = sum(hs for hs, _ in self._cores.values())
+        if self._accepted > 0 and cores_sum > 0:
+            value = self._accepted * 0.7 + cores_sum * 0.3
+        else:
+            value = self._accepted or cores_sum
+        return Estimate(value, value, value)
+
+
+ESTIMATORS = ('ewma', 'kalman', 'blend')
+
+
+def create_estimator(kind='ewma', half_life=30.0):
+    if kind == 'blend':
+        return BlendEstimator()
+    return Estimator(kind if kind in FILTERS else 'ewma', half_life)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Publish/subscribe hub for the Server-Sent Events stream (/api/stream)."""
+import json
+from collections import deque
+from threading import Event, Lock
+
+
+def encode_event(event_type, data):
+    """Encode one SSE message (done once per publish, shared by all subscribers)"""
+    payload = json.dumps(data, separators=(',', ':'))
+    return f"event: {event_type}\ndata: {payload}\n\n".encode('utf-8')
+
+
+class Subscriber:
+    """One connected stream client with its own bounded queue.
+
+    When a client can't keep up the queue drops its OLDEST messages
+    (deque maxlen) so a slow tab never blocks the publishers or grows
+    memory. The client notices gaps via sequence numbers and catches up
+    with a regular poll.
+    """
+    __slots__ = ('queue', 'wakeup', 'dropped')
+
+    def __init__(self, queue_size):
+        self.queue = deque(maxlen=queue_size)
+        self.wakeup = Event()
+        self.dropped = 0
+
+    def put(self, message):
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+        self.queue.append(message)
+        self.wakeup.set()
+
+    def wait(self, timeout):
+        """Block until messages arrive (or timeout), return them as one bytes blob"""
+        if not self.queue:
+            self.wakeup.wait(timeout)
+        # Clear before draining so a put() during the drain isn't lost
+        self.wakeup.clear()
+        messages = []
+        queue = self.queue
+        while queue:
+            messages.append(queue.popleft())
+        return b''.join(messages)
+
+
+class EventHub:
+    """Fan-out of encoded SSE messages to up to max_subscribers subscribers (None = no limit)"""
+
+    def __init__(self, queue_size=256, max_subscribers=None):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._subscribers = ()
+        self._lock = Lock()
+
+    @property
+    def has_subscribers(self):
+        """Cheap check so publishers can skip encoding when nobody listens"""
+        return bool(self._subscribers)
+
+    def subscribe(self):
+        """New subscriber, or None if max_subscribers are already connected"""
+        subscriber = Subscriber(self.queue_size)
+        with self._lock:
+            if self.max_subscribers is not None and len(self._subscribers) >= self.max_subscribers:
+                return None
+            # Copy-on-write tuple: publish() iterates without taking the lock
+            self._subscribers = self._subscribers + (subscriber,)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not subscriber)
+
+    def publish(self, event_type, data):
+        subscribers = self._subscribers
+        if not subscribers:
+            return
+        message = encode_event(event_type, data)
+        for subscriber in subscribers:
+            subscriber.put(message)
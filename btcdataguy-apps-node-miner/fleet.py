@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""Fleet view: polls other node-miner instances and aggregates them.
+
+Every peer is polled on a shared thread pool over its own persistent
+HTTP connection (kept alive when the peer's server allows it). A peer
+that is still busy from the previous round is skipped instead of waited
+for, so one slow or dead node costs one worker for at most its timeout
+and never delays the others. The last good status of every peer is
+cached and served with its age.
+
+Status is polled every interval seconds, hashrate history only every
+history_interval seconds and incrementally (from the newest point
+already held), so 50+ nodes stay cheap.
+"""
+import http.client
+import json
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread, Lock
+from urllib.parse import urlsplit
+
+from buffers import TimeSeriesBuffer
+from miner_parser import to_hs
+
+log = logging.getLogger(__name__)
+
+HISTORY_SECONDS = 10 * 60
+HISTORY_BUCKET_MS = 10 * 1000
+HISTORY_POINTS = 300
+
+
+def parse_hashrate(text):
+    """'123.4 kH/s' -> H/s (for peers that don't report hashrate_hs)"""
+    try:
+        value, unit = text.split()[:2]
+        return to_hs(float(value), unit.split('/')[0])
+    except (AttributeError, ValueError):
+        return 0.0
+
+
+def peer_entry(entry):
+    """A fleet_peers entry ('url' or {'url', 'name'}) as {'url', 'name'}, None if malformed"""
+    if isinstance(entry, str):
+        entry = {'url': entry}
+    if not isinstance(entry, dict):
+        return None
+    url, name = entry.get('url'), entry.get('name')
+    if not isinstance(url, str) or not url.strip() or not (name is None or isinstance(name, str)):
+        return None
+    url = url.strip()
+    try:
+        parts = urlsplit(url if '://' in url else f'http://{url}')
+        parts.port  # Raises on a port that isn't a number
+    except ValueError:
+        return None
+    if not parts.hostname:
+        return None
+    return {'url': url, 'name': name}
+
+
+class Peer:
+    """One remote node-miner instance and its cached state"""
+    __slots__ = ('url', 'name', 'host', 'port', 'https', 'conn', 'in_flight', 'status', 'status_at',
+                 'latency_ms', 'error', 'failures', 'output_seq', 'history', 'history_at')
+
+    def __init__(self, url, name=None):
+        if '://' not in url:
+            url = f'http://{url}'
+        parts = urlsplit(url)
+        self.url = url.rstrip('/')
+        self.https = parts.scheme == 'https'
+        self.host = parts.hostname
+        self.port = parts.port or (443 if self.https else 80)
+        self.name = name or f"{self.host}:{self.port}"
+        self.conn = None
+        self.in_flight = False
+        self.status = None  # Last good /api/status
+        self.status_at = None
+        self.latency_ms = None
+        self.error = None
+        self.failures = 0
+        self.output_seq = 0  # Only fetch new terminal lines with each status
+        self.history = TimeSeriesBuffer(HISTORY_POINTS, max_age=HISTORY_SECONDS * 1000)
+        self.history_at = 0.0
+
+
+class FleetPoller:
+    def __init__(self, interval=5.0, timeout=3.0, history_interval=30.0, max_workers=64):
+        self.interval = interval
+        self.timeout = timeout
+        self.history_interval = history_interval
+        self.peers = ()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fleet')
+        self._lock = Lock()
+        self._thread = None
+
+    def set_peers(self, peers):
+        """Replace the peer list ([url] or [{'url', 'name'}]), keeping known peers' state"""
+        with self._lock:
+            known = {peer.url: peer for peer in self.peers}
+            updated = []
+            for raw in peers:
+                entry = peer_entry(raw)
+                if entry is None:
+                    log.warning(f"Ignoring malformed fleet peer: {raw!r}")
+                    continue
+                peer = Peer(entry['url'], entry['name'])
+                if peer.url in known:
+                    peer = known[peer.url]
+                    peer.name = entry.get('name') or peer.name
+                updated.append(peer)
+            self.peers = tuple(updated)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        next_round = time.monotonic()
+        while True:
+            self.poll_round()
+            next_round += self.interval
+            time.sleep(max(0.0, next_round - time.monotonic()))
+
+    def poll_round(self):
+        """Submit every idle peer to the pool (busy peers are skipped this round)"""
+        for peer in self.peers:
+            if not peer.in_flight:
+                peer.in_flight = True
+                self._executor.submit(self._poll, peer)
+
+    def _poll(self, peer):
+        try:
+            started = time.perf_counter()
+            status = self._get_json(peer, f'/api/status?since={peer.output_seq}')
+            peer.latency_ms = round((time.perf_counter() - started) * 1000, 1)
+            output = status.pop('output', None)
+            if output:
+                peer.output_seq = output.get('last_seq', peer.output_seq)
+            for key in ('recent_output', 'full_output'):
+                status.pop(key, None)
+            peer.status = status
+            peer.status_at = time.time()
+            peer.error = None
+            peer.failures = 0
+
+            if time.monotonic() - peer.history_at >= self.history_interval:
+                self._fetch_history(peer)
+                peer.history_at = time.monotonic()
+        except Exception as e:
+            peer.error = str(e) or type(e).__name__
+            peer.failures += 1
+            if peer.conn is not None:
+                peer.conn.close()
+                peer.conn = None
+        finally:
+            peer.in_flight = False
+
+    def _fetch_history(self, peer):
+        latest = peer.history.latest()
+        start = latest[0] + 1 if latest else (time.time() - HISTORY_SECONDS) * 1000
+        data = self._get_json(peer, f'/api/hashrate-history?from={int(start)}&max_points=5000&format=columnar')
+        if 'timestamps' in data:
+            points = zip(data['timestamps'], data['values'])
+        else:
+            # Older peers: rows, no range support
+            points = ((row['timestamp'], row['value']) for row in data.get('history', []))
+        for ts, value in points:
+            if ts >= start:
+                peer.history.append(ts, value)
+
+    def _get_json(self, peer, path):
+        if peer.conn is None:
+            cls = http.client.HTTPSConnection if peer.https else http.client.HTTPConnection
+            peer.conn = cls(peer.host, peer.port, timeout=self.timeout)
+        peer.conn.request('GET', path, headers={'Accept': 'application/json'})
+        response = peer.conn.getresponse()
+        body = response.read()
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status}")
+        return json.loads(body)
+
+    def snapshot(self, local_status=None, local_history=None, include_history=True):
+        """Per-node and combined view. local_* add this instance without HTTP."""
+        now = time.time()
+        stale_after = max(3 * self.interval, 2 * self.timeout)
+        offline_after = max(12 * self.interval, 60)
+        nodes = []
+        series = {}
+
+        if local_status is not None:
+            nodes.append(self._node_entry('local', None, local_status, 0.0, 'ok', 0.0, None))
+            if local_history is not None:
+                series['local'] = local_history
+
+        for peer in self.peers:
+            age = now - peer.status_at if peer.status_at else None
+            if peer.status is None:
+                state = 'error' if peer.error else 'pending'
+            elif age > offline_after:
+                state = 'offline'
+            elif age > stale_after or peer.error:
+                state = 'stale'
+            else:
+                state = 'ok'
+            nodes.append(self._node_entry(peer.name, peer.url, peer.status, age, state, peer.latency_ms, peer.error))
+            if state in ('ok', 'stale'):
+                series[peer.name] = peer.history.last(HISTORY_POINTS)
+
+        live = [n for n in nodes if n['state'] in ('ok', 'stale')]
+        temps = [n['cpu_temp'] for n in live if n['cpu_temp'] is not None]
+        result = {
+            'timestamp': now,
+            'combined': {
+                'hashrate_hs': sum(n['hashrate_hs'] for n in live),
+                'nodes_total': len(nodes),
+                'nodes_online': len(live),
+                'nodes_mining': sum(1 for n in live if n['running']),
+                'session_best_difficulty': max((n['session_best_difficulty'] for n in live), default=0.0),
+                'all_time_best_difficulty': max((n['all_time_best_difficulty'] for n in live), default=0.0),
+                'max_temp': max(temps) if temps else None,
+                'avg_temp': round(sum(temps) / len(temps), 1) if temps else None
+            },
+            'nodes': nodes
+        }
+        if include_history:
+            result['history'] = merge_history(series)
+        return result
+
+    @staticmethod
+    def _node_entry(name, url, status, age, state, latency_ms, error):
+        status = status or {}
+        hashrate_hs = status.get('hashrate_hs')
+        if hashrate_hs is None:
+            hashrate_hs = parse_hashrate(status.get('hashrate'))
+        running = bool(status.get('running'))
+        return {
+            'name': name,
+            'url': url,
+            'state': state,
+            'age_seconds': round(age, 1) if age is not None else None,
+            'latency_ms': latency_ms,
+            'error': error,
+            'running': running,
+            'hashrate': status.get('hashrate', '0 H/s'),
+            'hashrate_hs': hashrate_hs if running else 0.0,
+            'session_best_difficulty': status.get('session_best_difficulty') or 0.0,
+            'all_time_best_difficulty': status.get('all_time_best_difficulty') or 0.0,
+            'cpu_temp': status.get('cpu_temp'),
+            'cpu_usage_live': status.get('cpu_usage_live'),
+            'uptime_seconds': status.get('mining_uptime_seconds', 0),
+            'uptime': status.get('mining_uptime', '00:00:00'),
+            'pool': status.get('pool')
+        }
+
+
+def merge_history(series, bucket_ms=HISTORY_BUCKET_MS):
+    """Align per-node (timestamps, values) on common buckets and sum them.
+
+    Each node contributes its average within a bucket; a node without
+    points in a bucket contributes nothing there (reported as None).
+    """
+    buckets = {}
+    for name, (timestamps, values) in series.items():
+        for ts, value in zip(timestamps, values):
+            if value is None or math.isnan(value):
+                continue
+            key = ts - ts % bucket_ms
+            total, count = buckets.setdefault(key, {}).get(name, (0.0, 0))
+            buckets[key][name] = (total + value, count + 1)
+
+    keys = sorted(buckets)
+    nodes = {name: [] for name in series}
+    totals = []
+    for key in keys:
+        total = 0.0
+        for name, column in nodes.items():
+            entry = buckets[key].get(name)
+            if entry is None:
+                column.append(None)
+            else:
+                avg = entry[0] / entry[1]
+                column.append(avg)
+                total += avg
+        totals.append(total)
+    return {'bucket_ms': bucket_ms, 'timestamps': keys, 'total': totals, 'nodes': nodes}
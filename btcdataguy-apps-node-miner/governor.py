@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""Closed-loop CPU budget governor for the running miner.
+
+Every interval seconds the governor derives a budget from two limits and
+applies the lower one to the miner's throttle:
+
+  thermal  PI controller on the CPU temperature: budget = ceiling
+           + kp * error + ki * integral, error = target - temperature.
+           The integral only ever holds the budget down (it is clamped
+           at 0), so it cannot wind up while the box is cool.
+  load     CPU demand of everything else on the box plus a headroom is
+           kept free, so bitcoind/electrs get the cores they ask for
+           during IBD or a reindex. They run in other containers, which
+           this one can't list, so their demand is the system-wide CPU
+           usage (/proc/stat is not namespaced) minus the miner's own
+           process tree.
+
+The ceiling is the configured cpu_percentage - the governor only ever
+lowers the budget. Reductions apply at once, increases are limited to
+max_step per interval so the loop doesn't oscillate. Every change is
+recorded with its reason.
+"""
+import logging
+import os
+import time
+from collections import deque
+from threading import Thread, Lock
+
+import psutil
+
+log = logging.getLogger(__name__)
+
+
+class Governor:
+    def __init__(self, temperature, interval=5.0, kp=1.5, ki=0.05, max_step=5, max_adjustments=200):
+        self.temperature = temperature  # Callable returning the CPU temperature (or None)
+        self.interval = interval
+        self.kp = kp  # Budget % per degree over target
+        self.ki = ki  # Budget % per degree-second over target
+        self.max_step = max_step
+        self.enabled = False
+        self.temp_target = 75.0
+        self.min_percentage = 5
+        self.headroom = 10.0  # % of total CPU kept free for other processes
+        self.ceiling = None
+        self.adjustments = deque(maxlen=max_adjustments)
+        self.last = {}  # Inputs of the latest tick
+        self._throttle = None
+        self._miner_pid = None
+        self._procs = {}  # Miner process tree, kept so cpu_percent() measures since the last tick
+        self._cpu_times = None  # System-wide, at the last tick
+        self._live = True  # False once the backend refused a live change
+        self._integral = 0.0
+        self._last_tick = None
+        self._lock = Lock()
+        self._thread = None
+
+    def configure(self, enabled, temp_target, min_percentage, headroom):
+        with self._lock:
+            self.enabled = enabled
+            self.temp_target = temp_target
+            self.min_percentage = min_percentage
+            self.headroom = headroom
+            if not enabled and self._throttle is not None and self._throttle.cpu_percentage != self.ceiling:
+                self._apply(self.ceiling, "governor disabled")
+
+    @property
+    def attached(self):
+        return self._throttle is not None
+
+    def attach(self, throttle, miner_pid):
+        """Start governing a freshly started miner (its budget is the ceiling)"""
+        with self._lock:
+            self._throttle = throttle
+            self._miner_pid = miner_pid
+            self._procs = {}
+            self.ceiling = throttle.cpu_percentage
+            self._live = True
+            self._integral = 0.0
+            self._last_tick = None
+
+    def detach(self):
+        with self._lock:
+            self._throttle = None
+            self._miner_pid = None
+            self._procs = {}
+
+    def set_ceiling(self, cpu_percentage):
+        """New configured budget while mining. Returns False if the backend can't follow live."""
+        with self._lock:
+            self.ceiling = cpu_percentage
+            throttle = self._throttle
+            if throttle is None:
+                return True
+            if throttle.cpu_percentage > cpu_percentage or not self.enabled:
+                return self._apply(cpu_percentage, "budget changed")
+            return True
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        next_tick = time.monotonic()
+        while True:
+            next_tick += self.interval
+            time.sleep(max(0.0, next_tick - time.monotonic()))
+            try:
+                self.tick()
+            except Exception as e:
+                log.error(f"Governor error: {e}")
+
+    def miner_cpu(self):
+        """CPU % of the whole box used by the miner, its children, its throttle helper and this app
+
+        None until every one of them has been measured once (cpu_percent() needs two readings).
+        """
+        pids = {os.getpid(), self._miner_pid}
+        helper = getattr(self._throttle, 'process', None)  # e.g. cpulimit
+        if helper is not None:
+            pids.add(helper.pid)
+        try:
+            pids.update(child.pid for child in psutil.Process(self._miner_pid).children(recursive=True))
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+        total = 0.0
+        complete = True
+        procs = {}
+        for pid in pids:
+            proc = self._procs.get(pid)
+            try:
+                if proc is None:
+                    proc = psutil.Process(pid)
+                    proc.cpu_percent(None)  # First reading - measured from the next tick on
+                    complete = False
+                else:
+                    total += proc.cpu_percent(None)
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+            procs[pid] = proc
+        self._procs = procs
+        return total / (psutil.cpu_count() or 1) if complete else None
+
+    def system_cpu(self):
+        """CPU % of the whole box, all containers, since the last tick (None on the first)
+
+        From cpu_times() rather than psutil.cpu_percent(), whose window the stats sampler resets.
+        """
+        times = psutil.cpu_times()
+        previous, self._cpu_times = self._cpu_times, times
+        if previous is None:
+            return None
+        idle = sum(getattr(times, field, 0.0) - getattr(previous, field, 0.0) for field in ('idle', 'iowait'))
+        # guest time is already counted in user (as psutil does)
+        total = sum(times) - sum(previous) - sum(
+            getattr(times, field, 0.0) - getattr(previous, field, 0.0) for field in ('guest', 'guest_nice'))
+        return max(0.0, min(100.0, 100.0 * (total - idle) / total)) if total > 0 else 0.0
+
+    def other_cpu(self):
+        """CPU % of the whole box used by everything but the miner (None while unknown)"""
+        system = self.system_cpu()
+        miner = self.miner_cpu()
+        if system is None or miner is None:
+            return None
+        return max(0.0, system - miner)
+
+    def tick(self):
+        with self._lock:
+            throttle = self._throttle
+            if throttle is None:
+                return
+            now = time.monotonic()
+            dt = self.interval if self._last_tick is None else now - self._last_tick
+            self._last_tick = now
+
+            other = self.other_cpu()
+            temp = self.temperature()
+            self.last = {'temp': temp, 'other_cpu': round(other, 1) if other is not None else None}
+            if not self.enabled or not self._live:
+                return
+
+            ceiling = self.ceiling
+            thermal = float(ceiling)
+            if temp is not None:
+                error = self.temp_target - temp
+                self._integral = min(0.0, self._integral + error * dt)
+                thermal = ceiling + self.kp * error + self.ki * self._integral
+            load = float(ceiling)
+            if other is not None:
+                # Cores left for the miner, as % of its own CPU set (which may exclude reserved cores)
+                free_cores = (psutil.cpu_count() or 1) * (100.0 - self.headroom - other) / 100.0
+                load = 100.0 * free_cores / throttle.cpu_count
+
+            target = min(thermal, load, ceiling)
+            target = int(max(self.min_percentage, min(ceiling, target)))
+            current = throttle.cpu_percentage
+            if target > current:
+                target = min(target, current + self.max_step)
+            if target == current:
+                return
+
+            if target < current and load <= thermal:
+                reason = f"node load {other:.0f}%"
+            elif target < current:
+                reason = f"temperature {temp}°C (target {self.temp_target}°C)"
+            elif target == ceiling:
+                reason = "back to configured budget"
+            else:
+                reason = "recovering"
+            self._apply(target, reason)
+
+    def _apply(self, cpu_percentage, reason):
+        throttle = self._throttle
+        previous = throttle.cpu_percentage
+        applied = throttle.set_percentage(cpu_percentage)
+        if not applied:
+            # e.g. the threads backend - the budget is fixed until restart
+            throttle.cpu_percentage = previous
+            self._live = False
+            reason = f"{reason} - not applied, {throttle.name} backend can't change live"
+        self.adjustments.append({
+            'timestamp': time.time(),
+            'from': previous,
+            'to': cpu_percentage if applied else previous,
+            'reason': reason,
+            'temp': self.last.get('temp'),
+            'other_cpu': self.last.get('other_cpu')
+        })
+        log.info(f"Governor: CPU budget {previous}% -> {cpu_percentage}% ({reason})")
+        return applied
+
+    def snapshot(self, limit=None):
+        adjustments = list(self.adjustments)
+        if limit is not None:
+            adjustments = adjustments[-limit:]
+        throttle = self._throttle
+        return {
+            'enabled': self.enabled,
+            'active': self.enabled and throttle is not None and self._live,
+            'cpu_percentage': throttle.cpu_percentage if throttle is not None else None,
+            'ceiling': self.ceiling,
+            'temp_target': self.temp_target,
+            'min_percentage': self.min_percentage,
+            'headroom': self.headroom,
+            'temp': self.last.get('temp'),
+            'other_cpu': self.last.get('other_cpu'),
+            'adjustments': adjustments
+        }
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""Persistent hashrate time series with minute/hour rollups.
+
+Three tiers, each a fixed-size ring file of fixed-width little-endian
+records, memory-mapped for reads and writes:
+
+    raw.bin     (timestamp, value)                   2-second points,  1 day
+    minute.bin  (timestamp, avg, min, max, count)    1-minute buckets, 30 days
+    hour.bin    (timestamp, avg, min, max, count)    1-hour buckets,   10 years
+
+Timestamps are unix seconds (bucket start for rollups), values are H/s.
+Because every tier is a ring, memory and disk use are fixed at creation
+(~5.9 MB total) no matter how long the miner runs. New points are written
+into the mapped pages immediately (a memory copy) and msync()ed in batches
+by flush().
+"""
+import atexit
+import logging
+import mmap
+import os
+import struct
+import time
+from threading import Thread, Lock
+
+log = logging.getLogger(__name__)
+
+MAGIC = b'NMTS'
+VERSION = 1
+# magic, version, record size, capacity, start index, record count
+HEADER = struct.Struct('<4sHHIII')
+HEADER_SIZE = 32
+
+RAW_RECORD = struct.Struct('<dd')
+ROLLUP_RECORD = struct.Struct('<ddddd')
+
+RAW_RETENTION = 24 * 3600
+MINUTE_RETENTION = 30 * 24 * 3600
+HOUR_RETENTION = 10 * 365 * 24 * 3600
+
+
+class RingFile:
+    """Fixed-capacity ring of fixed-width records in a memory-mapped file.
+
+    The first field of every record is its timestamp and records are
+    appended in timestamp order, so lookups by time are binary searches.
+    """
+
+    def __init__(self, path, record, capacity):
+        self.path = path
+        self.record = record
+        self.capacity = capacity
+        self._start = 0
+        self._count = 0
+        size = HEADER_SIZE + record.size * capacity
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size != size or not self._header_ok(fd):
+                if os.fstat(fd).st_size:
+                    log.warning(f"Hashrate store: {os.path.basename(path)} has a different layout, starting fresh")
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+                os.pwrite(fd, HEADER.pack(MAGIC, VERSION, record.size, capacity, 0, 0), 0)
+            self._mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+        _, _, _, _, self._start, self._count = HEADER.unpack_from(self._mm, 0)
+
+    def _header_ok(self, fd):
+        magic, version, record_size, capacity, start, count = HEADER.unpack(os.pread(fd, HEADER.size, 0))
+        return (magic == MAGIC and version == VERSION and record_size == self.record.size
+                and capacity == self.capacity and start < capacity and count <= capacity)
+
+    def __len__(self):
+        return self._count
+
+    def _offset(self, index):
+        """File offset of logical record index (0 = oldest)"""
+        return HEADER_SIZE + ((self._start + index) % self.capacity) * self.record.size
+
+    def append(self, values):
+        if self._count == self.capacity:
+            self.record.pack_into(self._mm, self._offset(0), *values)
+            self._start = (self._start + 1) % self.capacity
+        else:
+            self.record.pack_into(self._mm, self._offset(self._count), *values)
+            self._count += 1
+        HEADER.pack_into(self._mm, 0, MAGIC, VERSION, self.record.size, self.capacity, self._start, self._count)
+
+    def timestamp(self, index):
+        return struct.unpack_from('<d', self._mm, self._offset(index))[0]
+
+    def last(self):
+        """Newest record or None"""
+        if not self._count:
+            return None
+        return self.record.unpack_from(self._mm, self._offset(self._count - 1))
+
+    def bisect(self, timestamp):
+        """Logical index of the first record with a timestamp >= the given one"""
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.timestamp(mid) < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def read(self, first, end):
+        """Records [first, end) in logical order as a list of tuples"""
+        first = max(0, first)
+        end = min(end, self._count)
+        if first >= end:
+            return []
+        size = self.record.size
+        a = (self._start + first) % self.capacity
+        b = a + (end - first)
+        if b <= self.capacity:
+            chunks = [(a, b)]
+        else:
+            chunks = [(a, self.capacity), (0, b - self.capacity)]
+        rows = []
+        for lo, hi in chunks:
+            rows.extend(self.record.iter_unpack(self._mm[HEADER_SIZE + lo * size:HEADER_SIZE + hi * size]))
+        return rows
+
+    def flush(self):
+        self._mm.flush()
+
+    def close(self):
+        self._mm.flush()
+        self._mm.close()
+
+
+class Rollup:
+    """Running avg/min/max for the current bucket of one rollup tier"""
+    __slots__ = ('period', 'start', 'total', 'weight', 'low', 'high')
+
+    def __init__(self, period):
+        self.period = period
+        self.start = None
+        self.total = 0.0
+        self.weight = 0
+        self.low = 0.0
+        self.high = 0.0
+
+    def add(self, timestamp, avg, low, high, weight=1):
+        """Feed a point (or a finished finer bucket).
+
+        Returns the finished previous bucket (start, avg, min, max, weight)
+        when timestamp falls into a new bucket, otherwise None.
+        """
+        bucket = timestamp - (timestamp % self.period)
+        done = None
+        if self.start is not None and bucket != self.start:
+            done = self.finish()
+        if self.start is None:
+            self.start = bucket
+            self.low = low
+            self.high = high
+        self.total += avg * weight
+        self.weight += weight
+        self.low = min(self.low, low)
+        self.high = max(self.high, high)
+        return done
+
+    def finish(self):
+        """Close the current bucket and return it (None if empty)"""
+        if self.start is None or not self.weight:
+            return None
+        done = (self.start, self.total / self.weight, self.low, self.high, self.weight)
+        self.start = None
+        self.total = 0.0
+        self.weight = 0
+        return done
+
+
+class HashrateStore:
+    """Raw + minute + hour hashrate tiers under one directory"""
+
+    def __init__(self, directory, raw_interval=2.0):
+        self.directory = directory
+        self.raw_interval = raw_interval
+        self.raw = None
+        self.minute = None
+        self.hour = None
+        self._minute_rollup = Rollup(60)
+        self._hour_rollup = Rollup(3600)
+        self._lock = Lock()
+        self._thread = None
+
+    @property
+    def is_open(self):
+        return self.raw is not None
+
+    def open(self):
+        """Create/map the tier files and restore the partially filled rollup buckets"""
+        with self._lock:
+            if self.raw is not None:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            self.raw = RingFile(os.path.join(self.directory, 'raw.bin'), RAW_RECORD,
+                                int(RAW_RETENTION / self.raw_interval))
+            self.minute = RingFile(os.path.join(self.directory, 'minute.bin'), ROLLUP_RECORD,
+                                   MINUTE_RETENTION // 60)
+            self.hour = RingFile(os.path.join(self.directory, 'hour.bin'), ROLLUP_RECORD,
+                                 HOUR_RETENTION // 3600)
+            self._restore_rollups()
+            atexit.register(self.close)
+        log.info(f"Hashrate store opened: {len(self.raw)} raw, {len(self.minute)} minute, {len(self.hour)} hour points")
+
+    def _restore_rollups(self):
+        """Rebuild the current (unfinished) minute and hour buckets after a restart"""
+        last_minute = self.minute.last()
+        minute_done = last_minute[0] + 60 if last_minute else 0.0
+        last_hour = self.hour.last()
+        hour_done = last_hour[0] + 3600 if last_hour else 0.0
+
+        for ts, avg, low, high, count in self.minute.read(self.minute.bisect(hour_done), len(self.minute)):
+            self._hour_rollup.add(ts, avg, low, high, count)
+        for ts, value in self.raw.read(self.raw.bisect(minute_done), len(self.raw)):
+            self._minute_rollup.add(ts, value, value, value)
+
+    def append(self, timestamp, value):
+        """Store one raw point (unix seconds, H/s) and roll it up"""
+        with self._lock:
+            if self.raw is None:
+                return
+            self.raw.append((timestamp, value))
+            minute = self._minute_rollup.add(timestamp, value, value, value)
+            if minute is not None:
+                self._store_minute(minute)
+
+    def _store_minute(self, minute):
+        self.minute.append(minute)
+        start, avg, low, high, count = minute
+        hour = self._hour_rollup.add(start, avg, low, high, count)
+        if hour is not None:
+            self.hour.append(hour)
+
+    def tier_for(self, start, now=None):
+        """Finest tier that still holds data back to start"""
+        now = time.time() if now is None else now
+        if start >= now - RAW_RETENTION:
+            return 'raw'
+        if start >= now - MINUTE_RETENTION:
+            return 'minute'
+        return 'hour'
+
+    def query(self, start, end, tier=None):
+        """Points with start <= timestamp < end as columns.
+
+        Returns {'tier', 'timestamps', 'values'} plus 'min'/'max' columns for
+        rollup tiers. Rollup tiers include the still-open current bucket.
+        """
+        tier = tier or self.tier_for(start)
+        result = {'tier': tier, 'timestamps': [], 'values': []}
+        with self._lock:
+            if self.raw is None:
+                return result
+            if tier == 'raw':
+                rows = self.raw.read(self.raw.bisect(start), self.raw.bisect(end))
+                result['timestamps'] = [row[0] for row in rows]
+                result['values'] = [row[1] for row in rows]
+                return result
+
+            ring, rollup = (self.minute, self._minute_rollup) if tier == 'minute' else (self.hour, self._hour_rollup)
+            rows = ring.read(ring.bisect(start), ring.bisect(end))
+            if rollup.weight and start <= rollup.start < end:
+                rows.append((rollup.start, rollup.total / rollup.weight, rollup.low, rollup.high, rollup.weight))
+        result['timestamps'] = [row[0] for row in rows]
+        result['values'] = [row[1] for row in rows]
+        result['min'] = [row[2] for row in rows]
+        result['max'] = [row[3] for row in rows]
+        return result
+
+    def recent(self, seconds):
+        """Raw points from the last seconds as (timestamps, values)"""
+        now = time.time()
+        result = self.query(now - seconds, now + 1, tier='raw')
+        return result['timestamps'], result['values']
+
+    def flush(self):
+        """msync() all tiers (pending records are already in the mapped pages)"""
+        with self._lock:
+            if self.raw is None:
+                return
+            for ring in (self.raw, self.minute, self.hour):
+                ring.flush()
+
+    def start_flusher(self, interval=30):
+        """Background thread that flushes every interval seconds"""
+        if self._thread is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.flush()
+                except Exception as e:
+                    log.error(f"Error flushing hashrate store: {e}")
+
+        self._thread = Thread(target=run, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        with self._lock:
+            if self.raw is None:
+                return
+            for ring in (self.raw, self.minute, self.hour):
+                ring.close()
+            self.raw = self.minute = self.hour = None
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Logging for the app and the miner output.
+
+App messages go through the standard logging module (one logger per
+module) to stdout and to an in-memory ring that the UI reads from
+/api/logs. High-frequency categories get a RateLimit filter, so a busy
+miner can't flood Docker's json-file log:
+
+    node_miner.hashrate   per-core and accepted hashrate updates
+    node_miner.chart      chart writer ticks (every 2 seconds)
+
+Raw miner output does not go to stdout at all but to size-rotated,
+gzip-compressed files (miner.log, miner.log.1.gz, ...) under the data
+directory.
+
+LOG_LEVEL (environment) sets the level, default INFO.
+"""
+import gzip
+import logging
+import os
+import shutil
+import sys
+import time
+from logging.handlers import RotatingFileHandler
+from threading import Lock
+
+from buffers import LineBuffer
+
+LOG_RING_LINES = 1000
+OUTPUT_MAX_BYTES = 5 * 1024 * 1024
+OUTPUT_BACKUPS = 5
+
+# Category -> RateLimit arguments
+CATEGORY_LIMITS = {
+    'node_miner.hashrate': {'rate': 1 / 10, 'burst': 3, 'sample': 5},
+    'node_miner.chart': {'rate': 1 / 60, 'burst': 1},
+}
+
+LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+
+
+class RateLimit(logging.Filter):
+    """Token bucket for one logger: burst records at once, then rate per second.
+
+    With sample > 1 only every n-th record is considered at all. Warnings
+    and errors always pass. The number of dropped records is appended to
+    the next one that gets through.
+    """
+
+    def __init__(self, rate, burst=1, sample=1):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.sample = sample
+        self.suppressed = 0  # Dropped since the last record that passed
+        self.suppressed_total = 0
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._seen = 0
+        self._lock = Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        with self._lock:
+            self._seen += 1
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._seen % self.sample or self._tokens < 1:
+                self.suppressed += 1
+                self.suppressed_total += 1
+                return False
+            self._tokens -= 1
+            dropped, self.suppressed = self.suppressed, 0
+        if dropped:
+            record.msg = f"{record.getMessage()} (+{dropped} suppressed)"
+            record.args = None
+        return True
+
+
+class LogRing(logging.Handler):
+    """Keeps the last records as compact [time, level, logger, message] entries"""
+
+    def __init__(self, capacity=LOG_RING_LINES):
+        super().__init__()
+        self.buffer = LineBuffer(capacity)
+
+    def emit(self, record):
+        try:
+            self.buffer.append([round(record.created, 3), record.levelname, record.name, record.getMessage()])
+        except Exception:
+            self.handleError(record)
+
+    def since(self, seq, min_level=logging.NOTSET, limit=None, epoch=None):
+        """Entries after seq (see LineBuffer.since), optionally only min_level and up"""
+        result = self.buffer.since(seq, limit, epoch)
+        if min_level > logging.NOTSET:
+            result = result._replace(lines=[entry for entry in result.lines
+                                            if logging.getLevelName(entry[1]) >= min_level])
+        return result
+
+
+def _gzip_namer(name):
+    return name + '.gz'
+
+
+def _gzip_rotator(source, dest):
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def output_handler(directory, max_bytes=OUTPUT_MAX_BYTES, backups=OUTPUT_BACKUPS):
+    """miner.log in directory, rotated at max_bytes into gzip files"""
+    os.makedirs(directory, exist_ok=True)
+    handler = RotatingFileHandler(os.path.join(directory, 'miner.log'), maxBytes=max_bytes,
+                                  backupCount=backups, encoding='utf-8', delay=True)
+    handler.namer = _gzip_namer
+    handler.rotator = _gzip_rotator
+    handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+    return handler
+
+
+def setup_logging(data_dir, level=None):
+    """Configure stdout, the UI ring and the miner output files. Returns the LogRing."""
+    level = (level or os.environ.get('LOG_LEVEL') or 'INFO').upper()
+    if level not in LEVELS:
+        level = 'INFO'
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    ring = LogRing()
+    root.handlers = [console, ring]
+
+    for category, limits in CATEGORY_LIMITS.items():
+        logging.getLogger(category).addFilter(RateLimit(**limits))
+
+    # Request lines for every poll are noise unless debugging
+    if level != 'DEBUG':
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    # Miner output: files only, never stdout or the ring
+    output = logging.getLogger('miner_output')
+    output.handlers = [output_handler(os.path.join(data_dir, 'logs'))]
+    output.setLevel(logging.INFO)
+    output.propagate = False
+    return ring
+
+
+def suppressed_counts():
+    """Records dropped so far per rate-limited category"""
+    counts = {}
+    for category in CATEGORY_LIMITS:
+        for log_filter in logging.getLogger(category).filters:
+            if isinstance(log_filter, RateLimit):
+                counts[category] = log_filter.suppressed_total
+    return counts
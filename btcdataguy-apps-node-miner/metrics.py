@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""Counters, gauges and histograms in the Prometheus text format (/metrics).
+
+Updates take no lock. Every metric fed from the miner output has exactly
+one writer, the session's reader thread, so a plain += can't lose
+increments; a scrape running at the same time may see a histogram one
+observation behind in some of its fields, which the next scrape fixes.
+Metrics written from several threads (request latency) pass lock=True.
+
+Gauges can also be functions evaluated at scrape time, so values that
+already live elsewhere (the session snapshot, the thread count) are not
+copied on every change.
+"""
+from bisect import bisect_left
+from threading import Lock
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = []
+    for name, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+class Metric:
+    """Base: name, help text and optional label names with one child per label set"""
+    kind = 'untyped'
+
+    def __init__(self, name, help_text, labelnames=(), lock=False):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock() if lock else None
+        self._children = {}
+        self._child_lock = Lock()  # Only taken when a new label set appears
+
+    def labels(self, *values):
+        """Child metric for one set of label values (created on first use)"""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._child_lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._new_child()
+                    self._children[key] = child
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self):
+        """(suffix, labels, value) tuples"""
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        if self.labelnames:
+            for key, child in list(self._children.items()):
+                base = dict(zip(self.labelnames, key))
+                for suffix, labels, value in child._samples():
+                    lines.append(f'{self.name}{suffix}{_format_labels({**base, **labels})} {_format_value(value)}')
+        else:
+            for suffix, labels, value in self._samples():
+                lines.append(f'{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """Only goes up; the name should end in _total"""
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labelnames=(), lock=False):
+        super().__init__(name, help_text, labelnames, lock)
+        self.value = 0
+
+    def _new_child(self):
+        return Counter(self.name, self.help, lock=self._lock is not None)
+
+    def inc(self, amount=1):
+        if self._lock is None:
+            self.value += amount
+        else:
+            with self._lock:
+                self.value += amount
+
+    def _samples(self):
+        return [('', {}, self.value)]
+
+
+class Gauge(Metric):
+    """Set directly, or computed at scrape time by function.
+
+    A function returns a number, or for a labelled gauge an iterable of
+    (label values tuple, number).
+    """
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, labelnames=(), function=None):
+        super().__init__(name, help_text, labelnames)
+        self.value = 0
+        self.function = function
+
+    def _new_child(self):
+        return Gauge(self.name, self.help)
+
+    def set(self, value):
+        self.value = value
+
+    def _samples(self):
+        return [('', {}, self.value if self.function is None else self.function())]
+
+    def render(self):
+        if self.function is None or not self.labelnames:
+            return super().render()
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        for key, value in self.function():
+            lines.append(f'{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Histogram(Metric):
+    """Observations counted into fixed buckets (upper bounds, +Inf is added)"""
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets, labelnames=(), lock=False):
+        super().__init__(name, help_text, labelnames, lock)
+        self.bounds = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.bounds) + 1)  # Per bucket, made cumulative when rendered
+        self.sum = 0.0
+
+    def _new_child(self):
+        return Histogram(self.name, self.help, self.bounds, lock=self._lock is not None)
+
+    def observe(self, value):
+        index = bisect_left(self.bounds, value)
+        if self._lock is None:
+            self.counts[index] += 1
+            self.sum += value
+        else:
+            with self._lock:
+                self.counts[index] += 1
+                self.sum += value
+
+    def _samples(self):
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + (float('inf'),), list(self.counts)):
+            cumulative += count
+            samples.append(('_bucket', {'le': _format_value(float(bound))}, cumulative))
+        samples.append(('_sum', {}, self.sum))
+        samples.append(('_count', {}, cumulative))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=(), lock=False):
+        return self.register(Counter(name, help_text, labelnames, lock))
+
+    def gauge(self, name, help_text, labelnames=(), function=None):
+        return self.register(Gauge(name, help_text, labelnames, function))
+
+    def histogram(self, name, help_text, buckets, labelnames=(), lock=False):
+        return self.register(Histogram(name, help_text, buckets, labelnames, lock))
+
+    def render(self):
+        """Text exposition of all metrics"""
+        return '\n'.join(metric.render() for metric in self._metrics) + '\n'
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""Single-pass parser for cpuminer-multi output lines.
+
+Every line is classified in a single pass over a dispatch table of
+precompiled patterns and returned as a typed event. Lines we don't care
+about return None without ever entering the regex engine.
+"""
+import re
+from typing import NamedTuple, Optional
+
+# Multipliers to convert cpuminer units to H/s (base unit)
+UNIT_FACTORS = {
+    'H': 1.0,
+    'KH': 1e3,
+    'MH': 1e6,
+    'GH': 1e9,
+    'TH': 1e12
+}
+
+# Canonical unit spelling by upper-cased unit (cpuminer prints kH, but any casing is accepted)
+UNIT_NAMES = {'H': 'H', 'KH': 'kH', 'MH': 'MH', 'GH': 'GH', 'TH': 'TH'}
+
+
+def to_hs(value, unit):
+    """Convert a hashrate value with unit (H, kH, MH, GH, TH) to H/s"""
+    return value * UNIT_FACTORS.get(unit.upper(), 1.0)
+
+
+def from_hs(hs):
+    """H/s -> (value, unit) in the largest unit that keeps the value >= 1"""
+    for unit in ('TH', 'GH', 'MH', 'kH'):
+        factor = UNIT_FACTORS[unit.upper()]
+        if hs >= factor:
+            return hs / factor, unit
+    return hs, 'H'
+
+
+class CoreHashrate(NamedTuple):
+    """'CPU #3: 2205.12 kH/s'"""
+    core: int
+    value: float
+    unit: str
+
+    @property
+    def core_id(self):
+        return f"CPU #{self.core}"
+
+    @property
+    def hs(self):
+        return to_hs(self.value, self.unit)
+
+
+class ShareResult(NamedTuple):
+    """'accepted: 3/4 (diff 0.012), 8820.41 kH/s (yes!)' - accepted or rejected share"""
+    accepted: bool
+    accepted_count: int
+    total_count: int
+    value: Optional[float]
+    unit: Optional[str]
+    share_diff: Optional[float]
+
+    @property
+    def hs(self):
+        if self.value is None:
+            return None
+        return to_hs(self.value, self.unit)
+
+
+class ShareFound(NamedTuple):
+    """'DEBUG: hash <= target' - a share was found and is being submitted"""
+
+
+class ShareDifficulty(NamedTuple):
+    """'share diff 0.00123'"""
+    difficulty: float
+
+
+class StratumDifficulty(NamedTuple):
+    """'Stratum difficulty set to 0.1'"""
+    difficulty: float
+
+
+class StratumSession(NamedTuple):
+    """'Stratum session id: 6a3f01bc'"""
+    session_id: str
+
+
+class NewJob(NamedTuple):
+    """'pool asks job 1a2b for block 850000' / 'sha256d block 850000, diff 83148355189239.773'"""
+    job_id: Optional[str]
+    height: Optional[int]
+    network_difficulty: Optional[float]
+
+
+class MinerError(NamedTuple):
+    """Connection / authentication errors reported by cpuminer"""
+    kind: str
+    message: str
+
+
+SHARE_FOUND = ShareFound()  # Carries no data, so one shared instance
+
+# Error phrases (lower case, matched case-insensitively) -> short error kind
+ERROR_KINDS = {
+    'connection failed': 'connection_failed',
+    'connection refused': 'connection_refused',
+    'failed to connect': 'connection_failed',
+    'could not resolve host': 'dns_failed',
+    'empty reply from server': 'empty_reply',
+    'invalid address': 'invalid_address',
+    'authentication failed': 'auth_failed',
+    'connection interrupted': 'connection_interrupted',
+    # "Stratum connection timeout" / "timed out", curl "Connection timed out after N ms"
+    'connection timeout': 'timeout',
+    'connection timed out': 'timeout',
+    'operation timed out': 'timeout'  # curl "Operation timed out after N ms"
+}
+
+_NUM = r'[\d.]+(?:e[+-]?\d+)?'
+
+# Hashrates are always printed as plain decimals, so the hot pattern skips _NUM
+# Units in any casing ("kH/s", "Mh/s", "KH/S")
+_UNIT = r'([kKmMgGtT]?[hH])/[sS]'
+
+_CORE = re.compile(r'CPU #(\d+):\s*([\d.]+)\s*' + _UNIT)
+_SHARE = re.compile(
+    r'accepted:\s*(\d+)/(\d+)'
+    r'(?:\s*\((?:diff\s+(' + _NUM + r'))?[^)]*\))?'
+    r'(?:,?\s*(' + _NUM + r')\s*' + _UNIT + r')?'
+)
+_SHARE_DIFF = re.compile(r'share diff (' + _NUM + r')')
+_STRATUM_DIFF = re.compile(r'Stratum difficulty set to (' + _NUM + r')')
+_SESSION = re.compile(r'Stratum session id:\s*(\S+)')
+_JOB = re.compile(r'asks job (\S+) for block (\d+)')
+_BLOCK = re.compile(r'block (\d+), diff (' + _NUM + r')')
+_NEW_JOB = re.compile(r'new job(?:[\s:#]+([0-9a-fA-F]+))?')
+_SHARE_FOUND = re.compile(r'hash <= target')
+
+
+
+def _share(m, line):
+    diff, value, unit = m.group(3, 4, 5)
+    # cpuminer-multi marks rejected shares with "booooo" (accepted ones with "yes!")
+    rejected = 'boo' in line[m.end():]
+    return ShareResult(
+        not rejected,
+        int(m.group(1)),
+        int(m.group(2)),
+        float(value) if value else None,
+        UNIT_NAMES[unit.upper()] if unit else None,
+        float(diff) if diff else None
+    )
+
+
+def _share_found(m, line):
+    return SHARE_FOUND
+
+
+def _share_diff(m, line):
+    return ShareDifficulty(float(m.group(1)))
+
+
+def _stratum_diff(m, line):
+    return StratumDifficulty(float(m.group(1)))
+
+
+def _session(m, line):
+    return StratumSession(m.group(1))
+
+
+def _job(m, line):
+    return NewJob(m.group(1), int(m.group(2)), None)
+
+
+def _block(m, line):
+    return NewJob(None, int(m.group(1)), float(m.group(2)))
+
+
+def _new_job(m, line):
+    return NewJob(m.group(1), None, None)
+
+
+# Dispatch table: (literal trigger, anchored pattern, event builder), ordered
+# by frequency. The literal check runs in C and rejects non-matching lines
+# without entering the regex engine at all. "CPU #" lines (nearly every line
+# with --debug) are handled inline in parse_line before this table.
+_RULES = (
+    ('accepted:', _SHARE, _share),
+    ('share diff', _SHARE_DIFF, _share_diff),
+    ('hash <= target', _SHARE_FOUND, _share_found),
+    ('asks job', _JOB, _job),
+    ('Stratum difficulty', _STRATUM_DIFF, _stratum_diff),
+    ('Stratum session', _SESSION, _session),
+    ('block ', _BLOCK, _block),
+    ('new job', _NEW_JOB, _new_job)
+)
+
+
+def parse_line(line):
+    """Classify a single (decoded, stripped) miner line.
+
+    Returns one of the event tuples above, or None if the line carries
+    nothing we track.
+    """
+    # Hot path: no table loop or builder call for per-core hashrate lines
+    idx = line.find('CPU #')
+    if idx >= 0:
+        m = _CORE.match(line, idx)
+        if m is not None:
+            core, value, unit = m.groups()
+            return CoreHashrate(int(core), float(value), UNIT_NAMES[unit.upper()])
+
+    for trigger, pattern, build in _RULES:
+        idx = line.find(trigger)
+        if idx >= 0:
+            m = pattern.match(line, idx)
+            if m is not None:
+                return build(m, line)
+
+    # Only lines no rule matched get here, so lower-casing a copy is cheap enough
+    lowered = line.lower()
+    for phrase, kind in ERROR_KINDS.items():
+        if phrase in lowered:
+            return MinerError(kind, line)
+    return None
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""State of a mining session and the status published from it.
+
+MinerSession holds everything about one miner: process, throttle,
+placement, start job, hashrate and difficulty tracking. Writers (the
+session's reader thread, start/stop) change it under its lock and then
+publish a new immutable SessionSnapshot by swapping one reference
+(copy-on-write). Readers never take the lock - they read .snapshot once
+and get a consistent view, however many threads are mutating.
+
+A process can only be in one session, but nothing is global: several
+sessions can run side by side, each with its own reader thread.
+
+StatusCache builds the /api/status payload once per tick and keeps it
+both as a dict and as pre-encoded JSON bytes shared by every request.
+"""
+import json
+import time
+from threading import Lock
+from typing import NamedTuple, Optional, Tuple
+
+from estimator import Estimate, create_estimator
+from miner_parser import from_hs
+from share_ledger import ShareLedger
+
+NO_ESTIMATE = Estimate(0.0, 0.0, 0.0)
+
+
+class SessionSnapshot(NamedTuple):
+    """Immutable view of a MinerSession (replaced as a whole on every change)"""
+    running: bool
+    pid: Optional[int]
+    hashrate: str  # e.g. "123.4 kH/s"
+    hashrate_value: float  # in hashrate_unit (scaled for display)
+    hashrate_unit: str
+    hashrate_hs: float
+    hashrate_low_hs: float  # 95% band of the estimate
+    hashrate_high_hs: float
+    cores: Tuple[Tuple[str, float, float], ...]  # (core id, H/s, weight - below 1 while fading out)
+    session_best_difficulty: float
+    all_time_best_difficulty: float
+    stratum_difficulty: Optional[float]
+    start_time: Optional[float]
+    stopped_time: Optional[float]
+    pool_switching: bool
+    process: object
+    throttle: object
+    placement: object
+    start_job: object
+
+
+class MinerSession:
+    __slots__ = ('name', 'process', 'throttle', 'placement', 'start_job', 'estimator', 'estimate', 'cores',
+                 'session_best_difficulty', 'all_time_best_difficulty', 'stratum_difficulty',
+                 'start_time', 'stopped_time', 'pool_switching', 'shares', 'snapshot', '_lock')
+
+    def __init__(self, name='main'):
+        self.name = name
+        self.process = None
+        self.throttle = None  # CPU throttling backend (throttle.py)
+        self.placement = None  # CPU set and priority (placement.py)
+        self.start_job = None  # Latest background start (start_job.py)
+        self.estimator = create_estimator()  # Hashrate from the core and total samples (estimator.py)
+        self.estimate = NO_ESTIMATE
+        self.cores = ()
+        self.session_best_difficulty = 0.0
+        self.all_time_best_difficulty = 0.0
+        self.stratum_difficulty = None  # Current share difficulty set by the pool
+        self.start_time = None
+        self.stopped_time = None  # When mining stopped (for the chart cooldown)
+        self.pool_switching = False
+        self.shares = ShareLedger()  # Every share the pool answered (share_ledger.py)
+        self.snapshot = None
+        self._lock = Lock()
+        self._publish()
+
+    @property
+    def running(self):
+        process = self.process
+        return process is not None and process.poll() is None
+
+    def _publish(self):
+        """Build and swap in a new snapshot (caller holds the lock, or __init__)"""
+        process = self.process
+        estimate = self.estimate
+        value, unit = from_hs(estimate.value)
+        self.snapshot = SessionSnapshot(
+            running=process is not None and process.poll() is None,
+            pid=process.pid if process is not None else None,
+            hashrate=f"{value:.1f} {unit}/s" if value else "0 H/s",
+            hashrate_value=value,
+            hashrate_unit=unit,
+            hashrate_hs=estimate.value,
+            hashrate_low_hs=estimate.low,
+            hashrate_high_hs=estimate.high,
+            cores=self.cores,
+            session_best_difficulty=self.session_best_difficulty,
+            all_time_best_difficulty=self.all_time_best_difficulty,
+            stratum_difficulty=self.stratum_difficulty,
+            start_time=self.start_time,
+            stopped_time=self.stopped_time,
+            pool_switching=self.pool_switching,
+            process=process,
+            throttle=self.throttle,
+            placement=self.placement,
+            start_job=self.start_job
+        )
+
+    def publish(self):
+        """Re-publish after something outside the session changed (the process exited, time passed)"""
+        with self._lock:
+            if self.process is not None:
+                self._update_estimate(time.time())
+            self._publish()
+
+    # --- Lifecycle (start/stop) ---
+
+    def begin(self, all_time_best_difficulty, keep_stats=False, estimator=None):
+        """Reset for a new miner process (keep_stats: failover within the same session)"""
+        with self._lock:
+            if estimator is not None:
+                self.estimator = estimator
+            if not keep_stats:
+                self.session_best_difficulty = 0.0
+                self.start_time = time.time()
+                self.shares = ShareLedger()
+            self.stopped_time = None
+            self.stratum_difficulty = None
+            self.all_time_best_difficulty = all_time_best_difficulty
+            self._reset_hashrate()
+            self._publish()
+
+    def set_start_job(self, job):
+        with self._lock:
+            self.start_job = job
+            self._publish()
+
+    def attach(self, process, throttle, placement):
+        with self._lock:
+            self.process = process
+            self.throttle = throttle
+            self.placement = placement
+            self._publish()
+
+    def detach(self, process=None, stopped=True):
+        """Forget the miner process (only if it is still process, when given).
+
+        stopped marks the end of the session; False keeps it open (pool switch).
+        Returns False if another process has taken over in the meantime.
+        """
+        with self._lock:
+            if process is not None and self.process is not process:
+                return False
+            self.process = None
+            self.throttle = None
+            self.placement = None
+            self._reset_hashrate()
+            if stopped:
+                self.stopped_time = time.time()
+                self.start_time = None
+            self._publish()
+            return True
+
+    def try_begin_switch(self):
+        """Claim the pool switch (True if no switch was in progress)"""
+        with self._lock:
+            if self.pool_switching:
+                return False
+            self.pool_switching = True
+            self._publish()
+            return True
+
+    def end_switch(self):
+        with self._lock:
+            self.pool_switching = False
+            self._publish()
+
+    def _reset_hashrate(self):
+        self.estimator.reset()
+        self.estimate = NO_ESTIMATE
+        self.cores = ()
+
+    def _update_estimate(self, now):
+        self.estimate = self.estimator.estimate(now)
+        self.cores = tuple((core, hs, weight) for core, (hs, weight) in self.estimator.cores(now).items())
+
+    # --- Events from the reader thread ---
+
+    def core_hashrate(self, core_id, hs):
+        """Per-core rate from a "CPU #n" line, in H/s"""
+        with self._lock:
+            now = time.time()
+            self.estimator.core(core_id, hs, now)
+            self._update_estimate(now)
+            self._publish()
+
+    def accepted_hashrate(self, hs):
+        """Total rate from an "accepted:" line, in H/s"""
+        with self._lock:
+            now = time.time()
+            self.estimator.total(hs, now)
+            self._update_estimate(now)
+            self._publish()
+
+    def share_difficulty(self, difficulty):
+        """Returns (new session best, new all-time best)"""
+        with self._lock:
+            session_best = difficulty > self.session_best_difficulty
+            all_time_best = difficulty > self.all_time_best_difficulty
+            if session_best:
+                self.session_best_difficulty = difficulty
+            if all_time_best:
+                self.all_time_best_difficulty = difficulty
+            if session_best or all_time_best:
+                self._publish()
+            return session_best, all_time_best
+
+    def set_stratum_difficulty(self, difficulty):
+        with self._lock:
+            self.stratum_difficulty = difficulty
+            self._publish()
+
+
+class StatusCache:
+    """Status built at most once per max_age seconds, shared as a dict and as JSON bytes.
+
+    The tick thread calls refresh(); requests call get(), which only
+    rebuilds if the last build is older than max_age (or was invalidated
+    by a start/stop). Consumers must not mutate the returned dict.
+    """
+
+    def __init__(self, build, max_age=1.0):
+        self._build = build
+        self.max_age = max_age
+        self._entry = None  # (monotonic build time, dict, JSON bytes)
+        self._lock = Lock()
+
+    def refresh(self):
+        with self._lock:
+            status = self._build()
+            entry = (time.monotonic(), status, json.dumps(status, separators=(',', ':')).encode('utf-8'))
+            self._entry = entry
+            return entry
+
+    def get(self):
+        """(status dict, encoded JSON)"""
+        entry = self._entry
+        if entry is None or time.monotonic() - entry[0] > self.max_age:
+            with self._lock:
+                entry = self._entry
+                fresh = entry is not None and time.monotonic() - entry[0] <= self.max_age
+            if not fresh:
+                entry = self.refresh()
+        return entry[1], entry[2]
+
+    def invalidate(self):
+        self._entry = None
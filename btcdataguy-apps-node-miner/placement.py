@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Where and at which priority the miner runs.
+
+The CPU set, nice value and scheduling class are applied in the child
+right before cpuminer is exec'd, so every mining thread inherits them -
+setting them on the PID afterwards would only move the main thread.
+
+    miner_cpus        CPUs the miner may use ("2-7", [2, 3] or empty = all)
+    reserve_cores     keep the first N CPUs free for the node
+    miner_nice        nice value (0-19)
+    miner_sched_idle  SCHED_IDLE: only run when nothing else wants the CPU
+
+The CPU budget (cpu_percentage) is relative to the miner's CPU set.
+"""
+import os
+
+import psutil
+
+
+def parse_cpu_list(value):
+    """'0-3,6' or [0, 1] -> sorted list of CPU ids"""
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        return sorted({int(cpu) for cpu in value})
+    cpus = set()
+    for part in str(value).split(','):
+        part = part.strip()
+        if '-' in part:
+            first, last = part.split('-')
+            cpus.update(range(int(first), int(last) + 1))
+        elif part:
+            cpus.add(int(part))
+    return sorted(cpus)
+
+
+def allowed_cpus():
+    """CPUs this process may run on (container cpusets included)"""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(psutil.cpu_count()))
+
+
+class Placement:
+    def __init__(self, cpus=None, reserve_cores=0, nice=0, sched_idle=False):
+        available = allowed_cpus()
+        selected = [cpu for cpu in (cpus or available) if cpu in available]
+        if reserve_cores > 0:
+            reserved = set(available[:reserve_cores])
+            selected = [cpu for cpu in selected if cpu not in reserved]
+        if not selected:
+            # Never leave the miner without a CPU - keep the last one
+            selected = available[-1:]
+        self.cpus = selected
+        self.restricted = len(selected) < len(available)
+        self.reserve_cores = reserve_cores
+        self.nice = max(0, min(19, nice))
+        self.sched_idle = sched_idle and hasattr(os, 'SCHED_IDLE')
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            parse_cpu_list(config.get('miner_cpus')),
+            int(config.get('reserve_cores', 0) or 0),
+            int(config.get('miner_nice', 0) or 0),
+            bool(config.get('miner_sched_idle', False))
+        )
+
+    @property
+    def cpu_count(self):
+        return len(self.cpus)
+
+    def preexec(self):
+        """preexec_fn for Popen (None if there is nothing to apply)"""
+        if not (self.restricted or self.nice or self.sched_idle):
+            return None
+        cpus, restricted, nice, sched_idle = set(self.cpus), self.restricted, self.nice, self.sched_idle
+
+        def apply():
+            # Runs in the forked child: only plain os calls
+            if restricted:
+                os.sched_setaffinity(0, cpus)
+            if nice:
+                os.nice(nice)
+            if sched_idle:
+                os.sched_setscheduler(0, os.SCHED_IDLE, os.sched_param(0))
+        return apply
+
+    def describe(self, pid=None):
+        """Configured placement, plus what the kernel reports for pid"""
+        info = {
+            'cpus': self.cpus,
+            'cpu_count': self.cpu_count,
+            'restricted': self.restricted,
+            'reserve_cores': self.reserve_cores,
+            'nice': self.nice,
+            'sched_idle': self.sched_idle
+        }
+        if pid is not None:
+            try:
+                proc = psutil.Process(pid)
+                info['active'] = {
+                    'cpus': proc.cpu_affinity(),
+                    'nice': proc.nice(),
+                    'policy': 'idle' if os.sched_getscheduler(pid) == getattr(os, 'SCHED_IDLE', None) else 'normal'
+                }
+            except (psutil.Error, OSError, AttributeError):
+                info['active'] = None
+        return info
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""Pool list with latency ranking, failure tracking and failover decisions.
+
+All pools are probed concurrently (one asyncio.gather over the Stratum
+probe) on a background thread. The ranking is by priority first (lower
+number = preferred), then by the measured latency, with unreachable
+pools last. The monitor thread feeds share and connection events in;
+the manager only decides - app.py performs the actual switch.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from threading import Thread, Lock
+
+from stratum import probe_pool_async
+
+log = logging.getLogger(__name__)
+
+# Weight of a new latency sample in the running averages
+LATENCY_ALPHA = 0.3
+
+
+def _ewma(old, new):
+    return new if old is None else old + LATENCY_ALPHA * (new - old)
+
+
+class PoolStats:
+    """Measurements and accounting for one pool"""
+    __slots__ = ('url', 'priority', 'reachable', 'connect_ms', 'response_ms', 'share_latency_ms',
+                 'last_error', 'last_probe', 'probes', 'probe_failures', 'seconds_active',
+                 'accepted', 'rejected', 'switches_away')
+
+    def __init__(self, url, priority):
+        self.url = url
+        self.priority = priority
+        self.reachable = None  # None = never probed
+        self.connect_ms = None
+        self.response_ms = None  # subscribe + authorize round trips
+        self.share_latency_ms = None  # submit ("hash <= target") -> accepted/rejected
+        self.last_error = None
+        self.last_probe = None
+        self.probes = 0
+        self.probe_failures = 0
+        self.seconds_active = 0.0
+        self.accepted = 0
+        self.rejected = 0
+        self.switches_away = 0
+
+    def score(self):
+        """Lower is better: probe round trips, then the measured share-accept latency.
+
+        Probe latency comes first because every pool has it - share latency
+        is only known for pools the miner has actually worked on.
+        """
+        inf = float('inf')
+        probe = inf if self.connect_ms is None else self.connect_ms + (self.response_ms or 0.0)
+        return probe, inf if self.share_latency_ms is None else self.share_latency_ms
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class PoolManager:
+    def __init__(self, probe_interval=300, failure_threshold=3, stall_minutes=20, max_switches=50):
+        self.probe_interval = probe_interval
+        self.failure_threshold = failure_threshold
+        self.stall_minutes = stall_minutes
+        self.switches = deque(maxlen=max_switches)  # Recent switch decisions
+        self.active_url = None
+        self._pools = {}
+        self._active_since = None
+        self._consecutive_failures = 0
+        self._last_accepted = None
+        self._pending_shares = deque(maxlen=64)
+        self._credentials = None
+        self._lock = Lock()
+        self._thread = None
+
+    def set_pools(self, pools):
+        """Replace the pool list ([{'url', 'priority'}]), keeping stats of known URLs"""
+        with self._lock:
+            updated = {}
+            for index, pool in enumerate(pools):
+                url = pool['url']
+                stats = self._pools.get(url) or PoolStats(url, pool.get('priority', index))
+                stats.priority = pool.get('priority', index)
+                updated[url] = stats
+            if self.active_url in self._pools and self.active_url not in updated:
+                updated[self.active_url] = self._pools[self.active_url]
+            self._pools = updated
+
+    @property
+    def urls(self):
+        return list(self._pools)
+
+    def set_credentials(self, username, password):
+        """Credentials used by the background prober"""
+        self._credentials = (username, password)
+
+    def probe_all(self, username=None, password=None, timeout=5.0):
+        """Probe every pool concurrently and update the stats"""
+        if username is None:
+            if self._credentials is None:
+                return []
+            username, password = self._credentials
+        urls = self.urls
+        if not urls:
+            return []
+
+        async def run():
+            return await asyncio.gather(*(probe_pool_async(url, username, password, timeout) for url in urls))
+
+        results = asyncio.run(run())
+        now = time.time()
+        with self._lock:
+            for result in results:
+                stats = self._pools.get(result['pool_url'])
+                if stats is None:
+                    continue
+                stats.probes += 1
+                stats.last_probe = now
+                # A pool that answers subscribe is usable even if this probe's authorize failed
+                stats.reachable = result['subscribe_ms'] is not None
+                if stats.reachable:
+                    stats.connect_ms = _ewma(stats.connect_ms, result['connect_ms'])
+                    stats.response_ms = _ewma(stats.response_ms,
+                                              result['subscribe_ms'] + (result['authorize_ms'] or 0.0))
+                else:
+                    stats.probe_failures += 1
+                stats.last_error = result['error_code']
+        return results
+
+    def start_prober(self):
+        """Background thread that re-probes all pools every probe_interval seconds"""
+        if self._thread is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(self.probe_interval)
+                if len(self._pools) < 2:
+                    continue
+                try:
+                    self.probe_all()
+                except Exception as e:
+                    log.error(f"Error probing pools: {e}")
+
+        self._thread = Thread(target=run, daemon=True)
+        self._thread.start()
+
+    def ranked(self):
+        """Pool URLs from best to worst"""
+        with self._lock:
+            return self._ranked()
+
+    def _ranked(self):
+        pools = sorted(self._pools.values(), key=lambda p: (p.reachable is False, p.priority, p.score()))
+        return [p.url for p in pools]
+
+    def best(self):
+        ranked = self.ranked()
+        return ranked[0] if ranked else None
+
+    def next_pool(self):
+        """Best pool other than the active one (None if there is no alternative)"""
+        for url in self.ranked():
+            if url != self.active_url and self._pools[url].reachable is not False:
+                return url
+        return None
+
+    # --- Session accounting (called by start/stop/failover) ---
+
+    def activate(self, url, reason, previous=None):
+        """Record that the miner now runs on url (previous: pool it failed over from)"""
+        with self._lock:
+            now = time.time()
+            self._account(now)
+            if url not in self._pools:
+                self._pools[url] = PoolStats(url, len(self._pools))
+            if previous and previous != url and previous in self._pools:
+                self._pools[previous].switches_away += 1
+            self.active_url = url
+            self._active_since = now
+            self._consecutive_failures = 0
+            self._last_accepted = time.monotonic()
+            self._pending_shares.clear()
+            self.switches.append({'timestamp': now, 'from': previous, 'to': url, 'reason': reason})
+        log.info(f"Pool selected: {url} ({reason})")
+
+    def deactivate(self):
+        with self._lock:
+            self._account(time.time())
+            self.active_url = None
+            self._active_since = None
+
+    def _account(self, now):
+        if self.active_url in self._pools and self._active_since is not None:
+            self._pools[self.active_url].seconds_active += now - self._active_since
+            self._active_since = now
+
+    # --- Events from monitor_miner_output ---
+
+    def share_submitted(self):
+        self._pending_shares.append(time.monotonic())
+
+    def share_result(self, accepted):
+        """Record the pool's answer. Returns the submit -> answer latency in ms (None if unknown)."""
+        now = time.monotonic()
+        stats = self._pools.get(self.active_url)
+        self._consecutive_failures = 0
+        latency = None
+        if self._pending_shares:
+            latency = (now - self._pending_shares.popleft()) * 1000
+            if stats is not None:
+                stats.share_latency_ms = _ewma(stats.share_latency_ms, latency)
+        if stats is not None:
+            if accepted:
+                stats.accepted += 1
+            else:
+                stats.rejected += 1
+        if accepted:
+            self._last_accepted = now
+        return latency
+
+    def connection_ok(self):
+        self._consecutive_failures = 0
+
+    def reset_tracking(self):
+        """Restart failure counting and the stall window (e.g. no other pool to switch to)"""
+        self._consecutive_failures = 0
+        self._last_accepted = time.monotonic()
+
+    def connection_failed(self, kind):
+        """Returns True once failures reached the failover threshold"""
+        self._consecutive_failures += 1
+        stats = self._pools.get(self.active_url)
+        if stats is not None:
+            stats.last_error = kind
+        return self._consecutive_failures >= self.failure_threshold
+
+    def stalled(self, expected_share_seconds=None):
+        """True if no share was accepted for stall_minutes.
+
+        With a slow miner a share can legitimately take longer than the
+        window, so the check only applies when at least three shares would
+        be expected within it (expected_share_seconds from the current
+        stratum difficulty and hashrate).
+        """
+        if not self.stall_minutes or self._last_accepted is None:
+            return False
+        window = self.stall_minutes * 60
+        if expected_share_seconds is None or expected_share_seconds * 3 > window:
+            return False
+        return time.monotonic() - self._last_accepted > window
+
+    def snapshot(self):
+        """Pools, active pool and recent switch decisions for the API"""
+        with self._lock:
+            now = time.time()
+            pools = []
+            for url in self._ranked():
+                entry = self._pools[url].as_dict()
+                if url == self.active_url and self._active_since is not None:
+                    entry['seconds_active'] += now - self._active_since
+                entry['seconds_active'] = round(entry['seconds_active'], 1)
+                entry['active'] = url == self.active_url
+                pools.append(entry)
+            return {
+                'active': self.active_url,
+                'active_since': self._active_since,
+                'consecutive_failures': self._consecutive_failures,
+                'failure_threshold': self.failure_threshold,
+                'stall_minutes': self.stall_minutes,
+                'pools': pools,
+                'switches': list(self.switches)
+            }
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""HTTP serving helpers: response compression and cache headers for static files.
+
+- compress() gzips (or, if the brotli module is installed and the client
+  accepts it, brotli-compresses) JSON, text and HTML responses. Streams
+  (/api/stream) and files are left alone.
+- StaticFiles hashes everything under static/ once at startup. A URL
+  carrying the current hash (?v=<hash>) is cached for a year; without it
+  the browser revalidates with the ETag and gets a 304. Files precompressed
+  at build time (name.br / name.gz next to the original, see Dockerfile)
+  are sent as they are.
+- HtmlPage serves index.html with ?v=<hash> added to its /static/ URLs,
+  so a new image never leaves browsers on old scripts.
+"""
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+
+from flask import Response, abort, send_file
+
+try:
+    import brotli
+except ImportError:  # Optional - gzip only
+    brotli = None
+
+log = logging.getLogger(__name__)
+
+COMPRESSIBLE = {'application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript', 'image/svg+xml'}
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # Per response; the precompressed static files use 11
+CACHE_FOREVER = 'public, max-age=31536000, immutable'
+# Precompressed siblings, preferred first
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+_STATIC_URL = re.compile(r'''((?:src|href)=["'])/static/([^"'?#]+)(["'])''')
+
+
+def _file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def compress(request, response):
+    """after_request hook: compress the body if it is worth it and the client accepts it"""
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE):
+        return response
+    data = response.get_data()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return response
+    if brotli is not None and 'br' in request.accept_encodings:
+        encoding, body = 'br', brotli.compress(data, quality=BROTLI_QUALITY)
+    elif 'gzip' in request.accept_encodings:
+        encoding, body = 'gzip', gzip.compress(data, GZIP_LEVEL, mtime=0)
+    else:
+        return response
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    # A strong ETag names exact bytes, so each encoding needs its own
+    tag, weak = response.get_etag()
+    if tag and not weak:
+        response.set_etag(f'{tag}-{encoding}')
+    return response
+
+
+def _not_modified(request, tag, cache_control):
+    if not request.if_none_match.contains_weak(tag):
+        return None
+    response = Response(status=304)
+    response.set_etag(tag, weak=True)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
+class StaticFiles:
+    """Content hashes (and precompressed variants) of the files under root, taken once"""
+
+    def __init__(self, root):
+        self.root = root
+        self._files = {}  # {relative path: (hash, (encoding, suffix) variants on disk)}
+        for directory, _, names in os.walk(root):
+            for name in names:
+                if name.endswith(('.br', '.gz')):
+                    continue
+                path = os.path.join(directory, name)
+                variants = tuple(v for v in PRECOMPRESSED if os.path.exists(path + v[1]))
+                self._files[os.path.relpath(path, root).replace(os.sep, '/')] = (_file_hash(path), variants)
+        log.debug(f"Static files: {len(self._files)} fingerprinted")
+
+    def version(self, path):
+        """Content hash of a static file (None if unknown)"""
+        entry = self._files.get(path)
+        return entry[0] if entry else None
+
+    def serve(self, request, path):
+        entry = self._files.get(path)
+        if entry is None:
+            abort(404)
+        version, variants = entry
+        cache_control = CACHE_FOREVER if request.args.get('v') == version else 'no-cache'
+        not_modified = _not_modified(request, version, cache_control)
+        if not_modified is not None:
+            return not_modified
+
+        full_path = os.path.join(self.root, path)
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        encoding = next((v for v in variants if v[0] in request.accept_encodings), None)
+        response = send_file(full_path + encoding[1] if encoding else full_path, mimetype=mimetype,
+                             conditional=False, etag=False, max_age=None)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding[0]
+        if variants:
+            response.vary.add('Accept-Encoding')
+        response.set_etag(version, weak=True)
+        response.headers['Cache-Control'] = cache_control
+        return response
+
+
+class HtmlPage:
+    """An HTML file with fingerprinted /static/ URLs, read once and revalidated by ETag"""
+
+    def __init__(self, path, static_files):
+        with open(path, 'r', encoding='utf-8') as f:
+            html = f.read()
+
+        def fingerprint(match):
+            version = static_files.version(match.group(2))
+            if version is None:
+                return match.group(0)
+            return f'{match.group(1)}/static/{match.group(2)}?v={version}{match.group(3)}'
+
+        self.body = _STATIC_URL.sub(fingerprint, html).encode('utf-8')
+        self.etag = hashlib.sha1(self.body).hexdigest()[:12]
+
+    def serve(self, request):
+        not_modified = _not_modified(request, self.etag, 'no-cache')
+        if not_modified is not None:
+            return not_modified
+        response = Response(self.body, mimetype='text/html')
+        response.set_etag(self.etag, weak=True)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""Session ledger: one SQLite row per mining session, kept for months.
+
+A session is one miner run on one pool: from a validated start until it
+is stopped, fails over to another pool (which starts the next session),
+the miner exits or the app shuts down. Each row holds the pool, worker,
+CPU budget, threads and throttle backend it ran with, and what came out:
+average and peak hashrate, shares, best difficulty, average temperature
+and why it ended.
+
+The database (sessions.db under /data) runs in WAL mode, so the API reads
+while the flusher writes. Nothing is written per sample: the open session
+is kept in memory and rows are written in one transaction every flush
+interval (finished sessions, plus the open one for crash recovery - a
+session without stop time is closed as 'interrupted' on the next start).
+"""
+import atexit
+import logging
+import os
+import sqlite3
+import time
+from threading import Lock, Thread
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    start_time REAL NOT NULL,
+    stop_time REAL,
+    updated_at REAL NOT NULL,
+    pool TEXT,
+    worker TEXT,
+    cpu_percentage REAL,
+    threads INTEGER,
+    throttle_backend TEXT,
+    avg_hashrate_hs REAL,
+    peak_hashrate_hs REAL,
+    accepted INTEGER NOT NULL DEFAULT 0,
+    rejected INTEGER NOT NULL DEFAULT 0,
+    best_difficulty REAL,
+    avg_temp REAL,
+    stop_reason TEXT
+);
+CREATE INDEX IF NOT EXISTS sessions_start_time ON sessions (start_time);
+CREATE INDEX IF NOT EXISTS sessions_pool ON sessions (pool, start_time);
+"""
+
+COLUMNS = ('id', 'start_time', 'stop_time', 'updated_at', 'pool', 'worker', 'cpu_percentage', 'threads',
+           'throttle_backend', 'avg_hashrate_hs', 'peak_hashrate_hs', 'accepted', 'rejected',
+           'best_difficulty', 'avg_temp', 'stop_reason')
+
+# Averages over many sessions are weighted by session length
+_AGGREGATES = """
+    COUNT(*) AS sessions,
+    SUM(stop_time - start_time) AS seconds,
+    SUM(avg_hashrate_hs * (stop_time - start_time)) / NULLIF(SUM(stop_time - start_time), 0) AS avg_hashrate_hs,
+    MAX(peak_hashrate_hs) AS peak_hashrate_hs,
+    SUM(accepted) AS accepted,
+    SUM(rejected) AS rejected,
+    MAX(best_difficulty) AS best_difficulty,
+    SUM(avg_temp * (stop_time - start_time)) / NULLIF(SUM(CASE WHEN avg_temp IS NOT NULL
+                                                          THEN stop_time - start_time END), 0) AS avg_temp
+"""
+
+
+class SessionRecord:
+    """The open session, updated in memory"""
+    __slots__ = ('id', 'pid', 'start_time', 'stop_time', 'pool', 'worker', 'cpu_percentage', 'threads',
+                 'throttle_backend', 'accepted', 'rejected', 'best_difficulty', 'stop_reason',
+                 '_hashrate_sum', '_hashrate_count', 'peak_hashrate_hs', '_temp_sum', '_temp_count')
+
+    def __init__(self, pid, pool, worker, cpu_percentage, threads, throttle_backend):
+        self.id = None  # Row id once written
+        self.pid = pid
+        self.start_time = time.time()
+        self.stop_time = None
+        self.pool = pool
+        self.worker = worker
+        self.cpu_percentage = cpu_percentage
+        self.threads = threads
+        self.throttle_backend = throttle_backend
+        self.accepted = 0
+        self.rejected = 0
+        self.best_difficulty = None
+        self.stop_reason = None
+        self._hashrate_sum = 0.0
+        self._hashrate_count = 0
+        self.peak_hashrate_hs = None
+        self._temp_sum = 0.0
+        self._temp_count = 0
+
+    def row(self):
+        """Column values in COLUMNS order (without id)"""
+        return (self.start_time, self.stop_time, time.time(), self.pool, self.worker, self.cpu_percentage,
+                self.threads, self.throttle_backend,
+                self._hashrate_sum / self._hashrate_count if self._hashrate_count else None,
+                self.peak_hashrate_hs, self.accepted, self.rejected, self.best_difficulty,
+                self._temp_sum / self._temp_count if self._temp_count else None, self.stop_reason)
+
+    def as_dict(self):
+        return dict(zip(COLUMNS, (self.id,) + self.row()))
+
+
+class SessionLedger:
+    def __init__(self, path):
+        self.path = path
+        self.current = None
+        self._finished = []  # Ended sessions not written yet
+        self._lock = Lock()  # Guards current/_finished
+        self._db = None
+        self._db_lock = Lock()  # The write connection
+        self._thread = None
+
+    def open(self):
+        """Create the database, close sessions a crash left open"""
+        with self._db_lock:
+            if self._db is not None:
+                return
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')  # WAL keeps the database consistent; a crash loses the last flush at most
+            db.executescript(SCHEMA)
+            with db:
+                interrupted = db.execute(
+                    "UPDATE sessions SET stop_time = updated_at, stop_reason = 'interrupted' WHERE stop_time IS NULL"
+                ).rowcount
+            self._db = db
+            count = db.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+        atexit.register(self.close)
+        log.info(f"Session ledger opened: {count} sessions"
+                 f"{f', {interrupted} interrupted' if interrupted else ''}")
+
+    def begin(self, pid, pool, worker, cpu_percentage, threads, throttle_backend):
+        """A new miner process (ends a session still open for another process as 'replaced')"""
+        with self._lock:
+            if self.current is not None:
+                self._end('replaced')
+            self.current = SessionRecord(pid, pool, worker, cpu_percentage, threads, throttle_backend)
+
+    def discard(self, pid):
+        """Forget the open session of pid (its start failed) - only a written row is kept"""
+        with self._lock:
+            if self.current is not None and self.current.pid == pid:
+                if self.current.id is not None:
+                    self._end('start failed')
+                self.current = None
+
+    def end(self, reason, pid=None):
+        """Close the open session (only if it belongs to pid, when given)"""
+        with self._lock:
+            if self.current is None or (pid is not None and self.current.pid != pid):
+                return False
+            self._end(reason)
+            return True
+
+    def _end(self, reason):
+        """Caller holds the lock"""
+        record = self.current
+        record.stop_time = time.time()
+        record.stop_reason = reason
+        self._finished.append(record)
+        self.current = None
+        log.info(f"Session ended ({reason}): {record.stop_time - record.start_time:.0f} s on {record.pool}, "
+                 f"{record.accepted} accepted / {record.rejected} rejected")
+
+    def sample(self, hashrate_hs, temperature=None):
+        """One tick of the open session (every 2 seconds while mining)"""
+        record = self.current
+        if record is None:
+            return
+        with self._lock:
+            if hashrate_hs > 0:
+                record._hashrate_sum += hashrate_hs
+                record._hashrate_count += 1
+                if record.peak_hashrate_hs is None or hashrate_hs > record.peak_hashrate_hs:
+                    record.peak_hashrate_hs = hashrate_hs
+            if temperature is not None:
+                record._temp_sum += temperature
+                record._temp_count += 1
+
+    def share(self, accepted):
+        record = self.current
+        if record is None:
+            return
+        with self._lock:
+            if accepted:
+                record.accepted += 1
+            else:
+                record.rejected += 1
+
+    def difficulty(self, difficulty):
+        record = self.current
+        if record is None:
+            return
+        with self._lock:
+            if record.best_difficulty is None or difficulty > record.best_difficulty:
+                record.best_difficulty = difficulty
+
+    def flush(self):
+        """Write finished sessions and the open one in one transaction"""
+        # The rows are copied under the write lock: a flush that copied the open session and
+        # wrote after another flush had written it as ended would set stop_time back to NULL
+        with self._db_lock:
+            with self._lock:
+                records = self._finished
+                self._finished = []
+                if self.current is not None:
+                    records = records + [self.current]
+                rows = [(record, record.row()) for record in records]
+            if not rows or self._db is None:
+                return
+            placeholders = ', '.join('?' * (len(COLUMNS) - 1))
+            assignments = ', '.join(f'{column} = ?' for column in COLUMNS[1:])
+            with self._db:
+                for record, row in rows:
+                    if record.id is None:
+                        record.id = self._db.execute(
+                            f"INSERT INTO sessions ({', '.join(COLUMNS[1:])}) VALUES ({placeholders})", row
+                        ).lastrowid
+                    else:
+                        self._db.execute(f'UPDATE sessions SET {assignments} WHERE id = ?', row + (record.id,))
+
+    def start_flusher(self, interval=60):
+        """Background thread that flushes every interval seconds"""
+        if self._thread is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.flush()
+                except Exception as e:
+                    log.error(f"Error writing session ledger: {e}")
+
+        self._thread = Thread(target=run, daemon=True)
+        self._thread.start()
+
+    def _reader(self):
+        """Separate read-only connection - WAL readers don't wait for the writer"""
+        return sqlite3.connect(f'file:{self.path}?mode=ro', uri=True)
+
+    def query(self, limit=50, offset=0, pool=None, since=None, until=None):
+        """Finished sessions (newest first), their total count and aggregates per pool and per config"""
+        with self._lock:
+            pending = bool(self._finished)
+            current = self.current.as_dict() if self.current is not None else None
+        if pending:
+            self.flush()  # So a just-stopped session shows up
+
+        where, params = ['stop_time IS NOT NULL'], []
+        if pool:
+            where.append('pool = ?')
+            params.append(pool)
+        if since is not None:
+            where.append('start_time >= ?')
+            params.append(since)
+        if until is not None:
+            where.append('start_time < ?')
+            params.append(until)
+        where = ' AND '.join(where)
+
+        result = {'current': current, 'sessions': [], 'total': 0, 'by_pool': [], 'by_config': []}
+        if self._db is None:
+            return result
+        db = self._reader()
+        try:
+            db.row_factory = sqlite3.Row
+            result['total'] = db.execute(f'SELECT COUNT(*) FROM sessions WHERE {where}', params).fetchone()[0]
+            result['sessions'] = [dict(row) for row in db.execute(
+                f'SELECT {", ".join(COLUMNS)} FROM sessions WHERE {where} ORDER BY start_time DESC LIMIT ? OFFSET ?',
+                params + [limit, offset])]
+            result['by_pool'] = [dict(row) for row in db.execute(
+                f'SELECT pool, {_AGGREGATES} FROM sessions WHERE {where} GROUP BY pool ORDER BY seconds DESC',
+                params)]
+            result['by_config'] = [dict(row) for row in db.execute(
+                f'SELECT cpu_percentage, threads, throttle_backend, {_AGGREGATES} FROM sessions WHERE {where} '
+                'GROUP BY cpu_percentage, threads, throttle_backend ORDER BY avg_hashrate_hs DESC',
+                params)]
+        finally:
+            db.close()
+        return result
+
+    def close(self):
+        """End the open session ('shutdown'), write everything and close the database"""
+        self.end('shutdown')
+        try:
+            self.flush()
+        except Exception as e:
+            log.error(f"Error writing session ledger: {e}")
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Share ledger: what the pool actually credited, independent of cpuminer's own rate.
+
+Every accepted or rejected share is recorded with its time, the pool's
+target difficulty (what the share is worth) and the difficulty the hash
+actually reached. Memory stays bounded:
+
+    - one-minute buckets for the last 24 hours (preallocated arrays),
+      summed for the sliding windows
+    - a log10 histogram of reached share difficulty
+    - the last RECENT_SHARES shares individually
+
+The effective hashrate is the credited work over a window:
+
+    sum(target difficulty of accepted shares) * 2^32 / window seconds
+
+which is what the pool pays on, so it includes luck - over short windows
+with few shares it is noisy, the share count of each window is reported
+next to it. The expected time to a block is network difficulty * 2^32 /
+hashrate.
+"""
+import math
+import time
+from array import array
+from collections import deque
+from threading import Lock
+
+BUCKET_SECONDS = 60
+BUCKETS = 24 * 60
+WINDOWS = (('5m', 300), ('15m', 900), ('1h', 3600), ('6h', 6 * 3600), ('24h', 24 * 3600))
+RECENT_SHARES = 50
+# Histogram of reached difficulty: one bin per power of ten from 1e-6 to 1e12
+HISTOGRAM_MIN_EXP = -6
+HISTOGRAM_MAX_EXP = 12
+
+
+class ShareLedger:
+    __slots__ = ('started_at', 'network_difficulty', 'accepted', 'rejected', 'accepted_work', 'best_difficulty',
+                 '_minute', '_accepted', '_rejected', '_work', '_histogram', '_recent', '_lock')
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.network_difficulty = None  # From the miner's "block N, diff X" lines
+        self.accepted = 0
+        self.rejected = 0
+        self.accepted_work = 0.0  # Sum of the target difficulty of accepted shares
+        self.best_difficulty = 0.0
+        self._minute = array('q', [-1]) * BUCKETS  # Which minute each slot currently holds
+        self._accepted = array('l', [0]) * BUCKETS
+        self._rejected = array('l', [0]) * BUCKETS
+        self._work = array('d', [0.0]) * BUCKETS
+        self._histogram = [0] * (HISTOGRAM_MAX_EXP - HISTOGRAM_MIN_EXP + 1)
+        self._recent = deque(maxlen=RECENT_SHARES)
+        self._lock = Lock()
+
+    def _slot(self, minute):
+        """Bucket slot for minute, cleared if it still holds an older minute (caller holds the lock)"""
+        slot = minute % BUCKETS
+        if self._minute[slot] != minute:
+            self._minute[slot] = minute
+            self._accepted[slot] = 0
+            self._rejected[slot] = 0
+            self._work[slot] = 0.0
+        return slot
+
+    def record(self, accepted, target_difficulty, share_difficulty=None, timestamp=None):
+        """One share answered by the pool.
+
+        target_difficulty is the pool's difficulty when it was submitted
+        (falls back to share_difficulty if the pool never sent one).
+        """
+        now = time.time() if timestamp is None else timestamp
+        work = target_difficulty or share_difficulty or 0.0
+        with self._lock:
+            slot = self._slot(int(now // BUCKET_SECONDS))
+            if accepted:
+                self.accepted += 1
+                self.accepted_work += work
+                self._accepted[slot] += 1
+                self._work[slot] += work
+            else:
+                self.rejected += 1
+                self._rejected[slot] += 1
+            if share_difficulty:
+                exponent = min(HISTOGRAM_MAX_EXP, max(HISTOGRAM_MIN_EXP, math.floor(math.log10(share_difficulty))))
+                self._histogram[exponent - HISTOGRAM_MIN_EXP] += 1
+                if accepted and share_difficulty > self.best_difficulty:
+                    self.best_difficulty = share_difficulty
+            self._recent.append((now, accepted, work, share_difficulty))
+
+    def set_network_difficulty(self, difficulty):
+        self.network_difficulty = difficulty
+
+    def window(self, seconds, now=None):
+        """(accepted, rejected, credited work, covered seconds) over the last seconds"""
+        now = time.time() if now is None else now
+        current = int(now // BUCKET_SECONDS)
+        first = max(int((now - seconds) // BUCKET_SECONDS), current - BUCKETS + 1)
+        # Whole buckets are summed, so the window starts at the first bucket - but never
+        # before the ledger existed (a fresh session isn't "24h at 0 H/s")
+        covered = max(0.0, now - max(first * BUCKET_SECONDS, self.started_at))
+        accepted = rejected = 0
+        work = 0.0
+        with self._lock:
+            for minute in range(first, current + 1):
+                slot = minute % BUCKETS
+                if self._minute[slot] == minute:
+                    accepted += self._accepted[slot]
+                    rejected += self._rejected[slot]
+                    work += self._work[slot]
+        return accepted, rejected, work, covered
+
+    def histogram(self):
+        """[(lower bound, count), ...] for non-empty bins"""
+        with self._lock:
+            counts = list(self._histogram)
+        return [(10.0 ** (i + HISTOGRAM_MIN_EXP), count) for i, count in enumerate(counts) if count]
+
+    def expected_block_seconds(self, hashrate_hs):
+        if not self.network_difficulty or not hashrate_hs:
+            return None
+        return self.network_difficulty * 2**32 / hashrate_hs
+
+    def snapshot(self, reported_hashrate_hs=0.0):
+        """Windows, reject ratio, histogram and time to block for the API.
+
+        reported_hashrate_hs (cpuminer's rate) is used for the time to block
+        until shares have been accepted.
+        """
+        now = time.time()
+        windows = {}
+        for name, seconds in WINDOWS:
+            accepted, rejected, work, covered = self.window(seconds, now)
+            windows[name] = {
+                'accepted': accepted,
+                'rejected': rejected,
+                'effective_hashrate_hs': work * 2**32 / covered if covered > 0 else 0.0,
+                'reject_ratio': rejected / (accepted + rejected) if accepted + rejected else None,
+                'seconds': round(covered, 1)
+            }
+        total = self.accepted + self.rejected
+        elapsed = now - self.started_at
+        effective = self.accepted_work * 2**32 / elapsed if elapsed > 0 else 0.0
+        block_hashrate = effective if self.accepted else reported_hashrate_hs
+        with self._lock:
+            recent = list(self._recent)
+        return {
+            'started_at': self.started_at,
+            'accepted': self.accepted,
+            'rejected': self.rejected,
+            'reject_ratio': self.rejected / total if total else None,
+            'accepted_work': self.accepted_work,
+            'effective_hashrate_hs': effective,
+            'best_difficulty': self.best_difficulty,
+            'windows': windows,
+            'histogram': [{'min_difficulty': bound, 'count': count} for bound, count in self.histogram()],
+            'network_difficulty': self.network_difficulty,
+            'expected_block_seconds': self.expected_block_seconds(block_hashrate),
+            'recent': [{'time': t, 'accepted': ok, 'difficulty': work, 'share_difficulty': diff}
+                       for t, ok, work, diff in recent]
+        }
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Background start of the miner, with progress for the status endpoint.
+
+/api/start only creates a StartJob and returns its id. The job thread
+selects the pool, launches cpuminer and then becomes the output reader;
+while the job is validating, every parsed line is also shown to
+observe(), which decides when the connection is good:
+
+    connected   Stratum difficulty, a new job or a share result
+    failed      an error line, or the miner exits
+    timeout     still running after validate_seconds - assumed fine
+"""
+import time
+import uuid
+from threading import Event
+
+from miner_parser import MinerError, NewJob, ShareResult, StratumDifficulty
+
+# States in order; 'running', 'failed' and 'cancelled' are final
+PENDING_STATES = ('starting', 'launching', 'validating')
+
+
+class StartJob:
+    def __init__(self, reason='start', previous=None, validate_seconds=5.0):
+        self.id = uuid.uuid4().hex[:12]
+        self.reason = reason
+        self.previous = previous  # Pool this start fails over from
+        self.validate_seconds = validate_seconds
+        self.state = 'starting'
+        self.message = 'Preparing'
+        self.pool_url = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.deadline = None  # monotonic end of the validation window
+        self.lines_seen = 0
+        self.cancelled = False
+        self._done = Event()
+
+    @property
+    def pending(self):
+        return self.state in PENDING_STATES
+
+    def step(self, state, message):
+        self.state = state
+        self.message = message
+        if state == 'validating':
+            self.deadline = time.monotonic() + self.validate_seconds
+
+    def remaining(self):
+        """Seconds left in the validation window (None if not validating)"""
+        if self.state != 'validating':
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def observe(self, event, line):
+        """Validation verdict for one parsed line: (success, message) or None to keep waiting"""
+        self.lines_seen += 1
+        if type(event) is MinerError:
+            return False, f"Connection failed: {line}"
+        if type(event) in (StratumDifficulty, NewJob, ShareResult):
+            return True, "Connected successfully"
+        return None
+
+    def finish(self, success, message):
+        if not self.pending:
+            return
+        if self.cancelled:
+            self.state = 'cancelled'
+        else:
+            self.state = 'running' if success else 'failed'
+        self.message = message
+        self.finished_at = time.time()
+        self._done.set()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def wait(self, timeout=None):
+        """Block until the job is final. Returns (success, message)."""
+        self._done.wait(timeout)
+        return self.state == 'running', self.message
+
+    def snapshot(self):
+        return {
+            'id': self.id,
+            'state': self.state,
+            'message': self.message,
+            'reason': self.reason,
+            'pool_url': self.pool_url,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+            'validate_remaining': self.remaining(),
+            'lines_seen': self.lines_seen
+        }
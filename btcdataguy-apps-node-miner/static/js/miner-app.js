@@ -114,6 +114,27 @@ let hashrateChart = null;
 let cpuUsageGauge = null;
 let cpuTempGauge = null;
 
+// Terminal output (fetched incrementally via /api/status?since=<seq>)
+const MAX_OUTPUT_LINES = 500;
+let outputLines = [];
+let outputEpoch = null;  // Server output buffer id (changes when the server restarts)
+let outputFromSeq = 1;   // Sequence number of outputLines[0]
+let outputLastSeq = 0;   // Last sequence number received
+
+// Hashrate chart datapoints (last 10 minutes, max 300 points)
+const MAX_CHART_POINTS = 300;
+const CHART_WINDOW_MS = 10 * 60 * 1000;
+let chartHistory = [];
+
+// Live updates: Server-Sent Events with 2-second polling as fallback
+const STREAM_RETRY_MS = 60000;  // Reconnect delay after the server refused the stream
+let eventSource = null;
+let statusTimer = null;
+let historyTimer = null;
+
+// Background start (/api/start returns a job id, the result arrives with the status)
+let pendingStartJob = null;
+
 /**
  * Initialize the application on page load
  */
@@ -129,13 +150,12 @@ document.addEventListener('DOMContentLoaded', function() {
     // Initialize gauges
     initGauges();
     
-    // Start status updates
+    // Initial status and chart data
     updateStatus();
-    setInterval(updateStatus, 2000); // Update every 2 seconds
-    
-    // Start chart updates (synced with UI)
     fetchHashrateHistory();
-    setInterval(fetchHashrateHistory, 2000); // Update every 2 seconds (synced with UI)
+    
+    // Live updates via /api/stream (falls back to polling every 2 seconds)
+    connectStream();
     
     // Show dashboard by default
     showPage('dashboard');
@@ -387,7 +407,8 @@ function startMining() {
     .then(response => response.json())
     .then(data => {
         if (data.success) {
-            showNotification('Mining started successfully!', 'success');
+            pendingStartJob = data.job_id;
+            showNotification('Starting mining...', 'info');
             updateStatus();
         } else {
             // Show detailed error message
@@ -428,136 +449,297 @@ function stopMining() {
     });
 }
 
+/**
+ * Start polling status and chart every 2 seconds (fallback when the stream is down)
+ */
+function startPolling() {
+    if (!statusTimer) {
+        statusTimer = setInterval(updateStatus, 2000); // Update every 2 seconds
+    }
+    if (!historyTimer) {
+        historyTimer = setInterval(fetchHashrateHistory, 2000); // Update every 2 seconds (synced with UI)
+    }
+}
+
+/**
+ * Stop polling (stream is delivering updates)
+ */
+function stopPolling() {
+    clearInterval(statusTimer);
+    clearInterval(historyTimer);
+    statusTimer = null;
+    historyTimer = null;
+}
+
+/**
+ * Connect to the Server-Sent Events stream
+ */
+function connectStream() {
+    if (typeof EventSource === 'undefined') {
+        startPolling();
+        return;
+    }
+    
+    eventSource = new EventSource('/api/stream');
+    
+    eventSource.onopen = function() {
+        console.log('Live stream connected');
+        stopPolling();
+        // Catch up on anything missed while disconnected
+        updateStatus();
+        fetchHashrateHistory();
+    };
+    
+    eventSource.onerror = function() {
+        // Browser reconnects automatically - poll in the meantime
+        console.warn('Live stream interrupted, falling back to polling');
+        startPolling();
+        if (eventSource.readyState === EventSource.CLOSED) {
+            // Refused (e.g. 503: too many open streams) - the browser won't retry, try again later
+            eventSource = null;
+            setTimeout(connectStream, STREAM_RETRY_MS);
+        }
+    };
+    
+    eventSource.addEventListener('status', function(e) {
+        renderStatus(JSON.parse(e.data));
+    });
+    
+    eventSource.addEventListener('output', function(e) {
+        const output = JSON.parse(e.data);
+        if (output.epoch !== outputEpoch || output.from_seq > outputFromSeq + outputLines.length) {
+            // Missed lines (slow client, dropped events, server restart) - catch up via /api/status?since=
+            updateStatus();
+            return;
+        }
+        updateTerminalOutput(output, true);
+    });
+    
+    eventSource.addEventListener('hashrate', function(e) {
+        chartHistory.push(JSON.parse(e.data));
+        trimChartHistory();
+        updateHashrateChart(chartHistory);
+    });
+    
+    eventSource.addEventListener('history_reset', function() {
+        chartHistory = [];
+    });
+    
+    eventSource.addEventListener('share', function(e) {
+        const share = JSON.parse(e.data);
+        const hashrate = document.getElementById('hashrate');
+        if (hashrate && share.hashrate) {
+            hashrate.textContent = share.hashrate;
+        }
+    });
+    
+    eventSource.addEventListener('difficulty', function(e) {
+        const diff = JSON.parse(e.data);
+        const sessionBest = document.getElementById('sessionBest');
+        if (sessionBest) {
+            sessionBest.textContent = diff.session_best_difficulty.toFixed(5);
+        }
+        const allTimeBest = document.getElementById('allTimeBest');
+        if (allTimeBest) {
+            allTimeBest.textContent = diff.all_time_best_difficulty.toFixed(5);
+        }
+    });
+}
+
 /**
  * Update mining status and statistics
  */
 function updateStatus() {
-    fetch('/api/status')
+    // The epoch tells the server which run outputLastSeq is from (all lines after a restart)
+    fetch('/api/status?since=' + outputLastSeq + (outputEpoch ? '&epoch=' + outputEpoch : ''))
         .then(response => response.json())
-        .then(data => {
-            // Update mining status
-            const miningStatus = document.getElementById('miningStatus');
-            if (miningStatus) {
-                miningStatus.textContent = data.running ? 'Running' : 'Stopped';
-                miningStatus.className = data.running ? 'text-success' : 'text-info';
-            }
-            
-            // Update status icon
-            const statusIcon = document.getElementById('statusIcon');
-            if (statusIcon) {
-                if (data.running) {
-                    statusIcon.className = 'tim-icons icon-check-2 text-success';
-                } else {
-                    statusIcon.className = 'tim-icons icon-simple-remove text-muted';
-                }
-            }
-            
-            // Update hashrate
-            const hashrate = document.getElementById('hashrate');
-            if (hashrate) {
-                hashrate.textContent = data.hashrate;
-            }
-            
-            // Update mining uptime
-            const miningUptime = document.getElementById('miningUptime');
-            if (miningUptime) {
-                miningUptime.textContent = data.mining_uptime;
-            }
-            
-            // Update system stats
-            const cpuCores = document.getElementById('cpuCores');
-            if (cpuCores) {
-                cpuCores.textContent = data.cpu_count;
-            }
-            
-            // Update CPU Usage Gauge
-            if (cpuUsageGauge) {
-                const cpuValue = data.cpu_usage_live;
-                let color = '#00f2c3'; // Green
-                if (cpuValue >= 80) color = '#fd5d93'; // Red
-                else if (cpuValue >= 60) color = '#ffc107'; // Yellow
-                cpuUsageGauge.update(cpuValue, color);
-            }
-            
-            // Update CPU Temperature Gauge
-            if (cpuTempGauge && data.cpu_temp !== null) {
-                const tempValue = data.cpu_temp;
-                let color = '#00f2c3'; // Green
-                if (tempValue >= 90) color = '#fd5d93'; // Red
-                else if (tempValue >= 75) color = '#ffc107'; // Yellow
-                cpuTempGauge.update(tempValue, color);
-            } else if (cpuTempGauge) {
-                // No temperature data available
-                cpuTempGauge.update(0, '#334455');
-            }
-            
-            // cpulimit status
-            const cpulimitStatus = document.getElementById('cpulimitStatus');
-            if (cpulimitStatus) {
-                if (data.running && data.cpulimit_active) {
-                    cpulimitStatus.textContent = '(target: ' + data.cpu_percentage + '%)';
-                } else {
-                    cpulimitStatus.textContent = '';
-                }
-            }
-            
-            // Update difficulty records
-            const sessionBest = document.getElementById('sessionBest');
-            if (sessionBest) {
-                sessionBest.textContent = data.session_best_difficulty.toFixed(5);
-            }
-            
-            const allTimeBest = document.getElementById('allTimeBest');
-            if (allTimeBest) {
-                allTimeBest.textContent = data.all_time_best_difficulty.toFixed(5);
-            }
-            
-            // Format all-time best date
-            const allTimeBestDate = document.getElementById('allTimeBestDate');
-            if (allTimeBestDate) {
-                if (data.all_time_best_difficulty_date) {
-                    const date = new Date(data.all_time_best_difficulty_date * 1000);
-                    allTimeBestDate.textContent = '(' + date.toLocaleDateString() + ' ' + date.toLocaleTimeString() + ')';
-                } else {
-                    allTimeBestDate.textContent = '';
-                }
-            }
-            
-            // Update buttons
-            const startBtn = document.getElementById('startBtn');
-            const stopBtn = document.getElementById('stopBtn');
-            
-            if (startBtn) {
-                startBtn.disabled = data.running;
-            }
-            if (stopBtn) {
-                stopBtn.disabled = !data.running;
-            }
-            
-            // Update terminal output
-            const outputElement = document.getElementById('minerOutput');
-            if (outputElement && data.full_output) {
-                if (data.full_output.length > 0) {
-                    // Store current scroll position
-                    const isScrolledToBottom = outputElement.scrollHeight - outputElement.clientHeight <= outputElement.scrollTop + 1;
-                    
-                    // Update content
-                    outputElement.textContent = data.full_output.join('\n');
-                    
-                    // Auto-scroll to bottom if was already at bottom
-                    if (isScrolledToBottom) {
-                        outputElement.scrollTop = outputElement.scrollHeight;
-                    }
-                } else if (!data.running) {
-                    outputElement.textContent = 'No output yet';
-                }
-            }
-        })
+        .then(data => renderStatus(data))
         .catch(error => {
             console.error('Error updating status:', error);
         });
 }
 
+/**
+ * Render status data (from /api/status or a stream 'status' event)
+ */
+function renderStatus(data) {
+    const start = data.start;
+    const starting = start && ['starting', 'launching', 'validating'].includes(start.state);
+    
+    // Update mining status
+    const miningStatus = document.getElementById('miningStatus');
+    if (miningStatus) {
+        if (starting) {
+            miningStatus.textContent = 'Starting: ' + start.message;
+            miningStatus.className = 'text-warning';
+        } else {
+            miningStatus.textContent = data.running ? 'Running' : 'Stopped';
+            miningStatus.className = data.running ? 'text-success' : 'text-info';
+        }
+    }
+    
+    // Report the result of our start once
+    if (start && start.id === pendingStartJob && !starting) {
+        pendingStartJob = null;
+        if (start.state === 'running') {
+            showNotification('Mining started successfully!', 'success');
+        } else if (start.state === 'failed') {
+            showNotification('Failed to start mining: ' + start.message, 'danger');
+        }
+    }
+    
+    // Update status icon
+    const statusIcon = document.getElementById('statusIcon');
+    if (statusIcon) {
+        if (data.running) {
+            statusIcon.className = 'tim-icons icon-check-2 text-success';
+        } else {
+            statusIcon.className = 'tim-icons icon-simple-remove text-muted';
+        }
+    }
+    
+    // Update hashrate
+    const hashrate = document.getElementById('hashrate');
+    if (hashrate) {
+        hashrate.textContent = data.hashrate;
+    }
+    
+    // Update mining uptime
+    const miningUptime = document.getElementById('miningUptime');
+    if (miningUptime) {
+        miningUptime.textContent = data.mining_uptime;
+    }
+    
+    // Update system stats
+    const cpuCores = document.getElementById('cpuCores');
+    if (cpuCores) {
+        cpuCores.textContent = data.cpu_count;
+    }
+    
+    // Update CPU Usage Gauge
+    if (cpuUsageGauge) {
+        const cpuValue = data.cpu_usage_live;
+        let color = '#00f2c3'; // Green
+        if (cpuValue >= 80) color = '#fd5d93'; // Red
+        else if (cpuValue >= 60) color = '#ffc107'; // Yellow
+        cpuUsageGauge.update(cpuValue, color);
+    }
+    
+    // Update CPU Temperature Gauge
+    if (cpuTempGauge && data.cpu_temp !== null) {
+        const tempValue = data.cpu_temp;
+        let color = '#00f2c3'; // Green
+        if (tempValue >= 90) color = '#fd5d93'; // Red
+        else if (tempValue >= 75) color = '#ffc107'; // Yellow
+        cpuTempGauge.update(tempValue, color);
+    } else if (cpuTempGauge) {
+        // No temperature data available
+        cpuTempGauge.update(0, '#334455');
+    }
+    
+    // cpulimit status
+    const cpulimitStatus = document.getElementById('cpulimitStatus');
+    if (cpulimitStatus) {
+        if (data.running && data.throttle_backend) {
+            cpulimitStatus.textContent = '(target: ' + data.cpu_percentage + '% via ' + data.throttle_backend + ')';
+        } else {
+            cpulimitStatus.textContent = '';
+        }
+    }
+    
+    // Update difficulty records
+    const sessionBest = document.getElementById('sessionBest');
+    if (sessionBest) {
+        sessionBest.textContent = data.session_best_difficulty.toFixed(5);
+    }
+    
+    const allTimeBest = document.getElementById('allTimeBest');
+    if (allTimeBest) {
+        allTimeBest.textContent = data.all_time_best_difficulty.toFixed(5);
+    }
+    
+    // Format all-time best date
+    const allTimeBestDate = document.getElementById('allTimeBestDate');
+    if (allTimeBestDate) {
+        if (data.all_time_best_difficulty_date) {
+            const date = new Date(data.all_time_best_difficulty_date * 1000);
+            allTimeBestDate.textContent = '(' + date.toLocaleDateString() + ' ' + date.toLocaleTimeString() + ')';
+        } else {
+            allTimeBestDate.textContent = '';
+        }
+    }
+    
+    // Update buttons
+    const startBtn = document.getElementById('startBtn');
+    const stopBtn = document.getElementById('stopBtn');
+    
+    if (startBtn) {
+        startBtn.disabled = data.running;
+    }
+    if (stopBtn) {
+        stopBtn.disabled = !data.running;
+    }
+    
+    // Update terminal output
+    if (data.output) {
+        updateTerminalOutput(data.output, data.running);
+    }
+}
+
+/**
+ * Merge new output lines from /api/status into the terminal
+ */
+function updateTerminalOutput(output, running) {
+    let changed = false;
+    const expectedSeq = outputFromSeq + outputLines.length;
+    
+    if (output.epoch !== outputEpoch || output.from_seq > expectedSeq) {
+        // Start over: first load, server restarted, or we fell too far behind
+        outputEpoch = output.epoch;
+        outputLines = output.lines.slice();
+        outputFromSeq = output.from_seq;
+        outputLastSeq = output.last_seq;
+        changed = true;
+    } else {
+        // Append only lines we don't have yet (stream and poll can overlap)
+        const fresh = output.lines.slice(expectedSeq - output.from_seq);
+        if (fresh.length > 0) {
+            outputLines.push(...fresh);
+            changed = true;
+        }
+        outputLastSeq = Math.max(outputLastSeq, output.last_seq);
+    }
+    
+    // Drop lines the server no longer has (output is cleared on mining start)
+    const dropCount = Math.min(outputLines.length, Math.max(0, output.first_seq - outputFromSeq));
+    const overflow = Math.max(0, outputLines.length - dropCount - MAX_OUTPUT_LINES);
+    if (dropCount + overflow > 0) {
+        outputLines.splice(0, dropCount + overflow);
+        outputFromSeq += dropCount + overflow;
+        changed = true;
+    }
+    
+    const outputElement = document.getElementById('minerOutput');
+    if (!outputElement || !changed) {
+        return;
+    }
+    
+    if (outputLines.length > 0) {
+        // Store current scroll position
+        const isScrolledToBottom = outputElement.scrollHeight - outputElement.clientHeight <= outputElement.scrollTop + 1;
+        
+        // Update content
+        outputElement.textContent = outputLines.join('\n');
+        
+        // Auto-scroll to bottom if was already at bottom
+        if (isScrolledToBottom) {
+            outputElement.scrollTop = outputElement.scrollHeight;
+        }
+    } else if (!running) {
+        outputElement.textContent = 'No output yet';
+    }
+}
+
 /**
  * Scroll terminal output to bottom
  */
@@ -742,14 +924,33 @@ function updateHashrateChart(historyData) {
  * Fetch hashrate history from the API
  */
 function fetchHashrateHistory() {
-    fetch('/api/hashrate-history?limit=300')  // 10 minutes at 2-second intervals
+    fetch('/api/hashrate-history?limit=300&format=columnar')  // 10 minutes at 2-second intervals
         .then(response => response.json())
         .then(data => {
-            if (data.history && data.history.length > 0) {
-                updateHashrateChart(data.history);
+            if (data.timestamps && data.timestamps.length > 0) {
+                chartHistory = data.timestamps.map((timestamp, i) => ({
+                    timestamp: timestamp,
+                    value: data.values[i]
+                }));
+                updateHashrateChart(chartHistory);
             }
         })
         .catch(error => {
             console.error('Error fetching hashrate history:', error);
         });
 }
+
+/**
+ * Keep streamed chart data within the 10-minute / 300-point window
+ */
+function trimChartHistory() {
+    const cutoff = Date.now() - CHART_WINDOW_MS;
+    let drop = 0;
+    while (drop < chartHistory.length && chartHistory[drop].timestamp <= cutoff) {
+        drop++;
+    }
+    drop = Math.max(drop, chartHistory.length - MAX_CHART_POINTS);
+    if (drop > 0) {
+        chartHistory.splice(0, drop);
+    }
+}
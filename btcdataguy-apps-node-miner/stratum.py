@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""Minimal Stratum v1 client used to probe pools without starting cpuminer."""
+import asyncio
+import json
+import socket
+import time
+from urllib.parse import urlsplit
+
+CLIENT_NAME = 'node-miner/1.0'
+
+
+class StratumError(Exception):
+    """Probe failure with a short machine-readable code"""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def parse_pool_url(pool_url):
+    """Split 'stratum+tcp://host:port' (or 'host:port') into (host, port)"""
+    if '://' not in pool_url:
+        pool_url = f'stratum+tcp://{pool_url}'
+    parts = urlsplit(pool_url)
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if not parts.hostname or not port:
+        raise StratumError('invalid_url', f"Invalid pool URL (expected host:port): {pool_url}")
+    return parts.hostname, port
+
+
+class StratumConnection:
+    """Line-framed JSON-RPC over an asyncio stream.
+
+    Notifications (mining.set_difficulty, mining.notify, ...) that arrive
+    while waiting for a response are handed to on_notification.
+    """
+
+    def __init__(self, reader, writer, on_notification=None):
+        self.reader = reader
+        self.writer = writer
+        self.on_notification = on_notification
+        self._next_id = 1
+
+    @classmethod
+    async def connect(cls, host, port, on_notification=None):
+        reader, writer = await asyncio.open_connection(host, port)
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return cls(reader, writer, on_notification)
+
+    async def send(self, method, params, msg_id=None):
+        if msg_id is None:
+            msg_id = self._next_id
+            self._next_id += 1
+        message = {'id': msg_id, 'method': method, 'params': params}
+        self.writer.write(json.dumps(message).encode('utf-8') + b'\n')
+        await self.writer.drain()
+        return msg_id
+
+    async def read_message(self):
+        line = await self.reader.readline()
+        if not line:
+            raise StratumError('connection_closed', "Pool closed the connection")
+        try:
+            return json.loads(line)
+        except ValueError:
+            raise StratumError('protocol_error', f"Invalid JSON from pool: {line[:80]!r}")
+
+    async def call(self, method, params):
+        """Send a request and wait for the response with the same id"""
+        msg_id = await self.send(method, params)
+        while True:
+            message = await self.read_message()
+            if message.get('id') == msg_id and 'method' not in message:
+                return message
+            if message.get('method') and self.on_notification:
+                self.on_notification(message)
+
+    def close(self):
+        try:
+            self.writer.close()
+        except Exception:
+            pass
+
+
+def _error_text(error):
+    """Stratum errors are [code, message, traceback] or a plain string"""
+    if isinstance(error, (list, tuple)) and len(error) >= 2:
+        return f"{error[1]} (code {error[0]})"
+    return str(error)
+
+
+async def probe_pool_async(pool_url, username, password, timeout=10.0):
+    """Connect, subscribe and authorize against a Stratum v1 pool.
+
+    Returns a dict with latencies in milliseconds, the initial difficulty
+    and an error code/message if something failed. Never raises.
+    """
+    result = {
+        'ok': False,
+        'pool_url': pool_url,
+        'host': None,
+        'port': None,
+        'connect_ms': None,
+        'subscribe_ms': None,
+        'authorize_ms': None,
+        'total_ms': None,
+        'difficulty': None,
+        'extranonce1': None,
+        'extranonce2_size': None,
+        'error_code': None,
+        'error': None
+    }
+    difficulty_set = asyncio.Event()
+
+    def on_notification(message):
+        if message.get('method') == 'mining.set_difficulty' and message.get('params'):
+            result['difficulty'] = float(message['params'][0])
+            difficulty_set.set()
+
+    started = time.perf_counter()
+    conn = None
+
+    async def run():
+        nonlocal conn
+        host, port = parse_pool_url(pool_url)
+        result['host'] = host
+        result['port'] = port
+
+        t = time.perf_counter()
+        try:
+            conn = await StratumConnection.connect(host, port, on_notification)
+        except socket.gaierror:
+            raise StratumError('dns_failed', f"Could not resolve hostname {host}")
+        except ConnectionRefusedError:
+            raise StratumError('connection_refused', "Connection refused - pool may be offline")
+        except OSError as e:
+            raise StratumError('connection_failed', f"Failed to connect: {e.strerror or e}")
+        result['connect_ms'] = round((time.perf_counter() - t) * 1000, 1)
+
+        t = time.perf_counter()
+        response = await conn.call('mining.subscribe', [CLIENT_NAME])
+        if response.get('error') or not response.get('result'):
+            raise StratumError('subscribe_failed', f"Subscribe failed: {_error_text(response.get('error'))}")
+        result['subscribe_ms'] = round((time.perf_counter() - t) * 1000, 1)
+        subscription = response['result']
+        if isinstance(subscription, list) and len(subscription) >= 3:
+            result['extranonce1'] = subscription[1]
+            result['extranonce2_size'] = subscription[2]
+
+        t = time.perf_counter()
+        response = await conn.call('mining.authorize', [username, password])
+        if response.get('error') or response.get('result') is not True:
+            raise StratumError('auth_failed', f"Authorization failed: {_error_text(response.get('error') or 'rejected')}")
+        result['authorize_ms'] = round((time.perf_counter() - t) * 1000, 1)
+
+        # Most pools send the initial difficulty right after authorize
+        if not difficulty_set.is_set():
+            async def drain():
+                while not difficulty_set.is_set():
+                    message = await conn.read_message()
+                    if message.get('method'):
+                        on_notification(message)
+            try:
+                await asyncio.wait_for(drain(), timeout=min(2.0, max(0.1, timeout - (time.perf_counter() - started))))
+            except asyncio.TimeoutError:
+                pass
+
+    try:
+        await asyncio.wait_for(run(), timeout=timeout)
+        result['ok'] = True
+    except asyncio.TimeoutError:
+        result['error_code'] = 'timeout'
+        result['error'] = f"No response within {timeout:.0f} seconds - pool may be unreachable"
+    except ConnectionError:
+        result['error_code'] = 'connection_closed'
+        result['error'] = "Pool closed the connection"
+    except StratumError as e:
+        result['error_code'] = e.code
+        result['error'] = e.message
+    except Exception as e:
+        result['error_code'] = 'error'
+        result['error'] = str(e)
+    finally:
+        if conn is not None:
+            conn.close()
+        result['total_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+def probe_pool(pool_url, username, password, timeout=10.0):
+    """Blocking wrapper around probe_pool_async (for Flask request threads)"""
+    return asyncio.run(probe_pool_async(pool_url, username, password, timeout))
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""Stratum v1 aggregation proxy.
+
+Many miners (the local cpuminer and those of other nodes) connect to the
+proxy, the proxy keeps ONE upstream connection to the pool:
+
+    pool  <-- 1 connection -->  proxy  <-- N connections -->  miners
+
+The upstream extranonce2 space is split between the miners: every
+downstream connection gets a unique prefix byte appended to the pool's
+extranonce1 and a correspondingly smaller extranonce2_size. Submitted
+shares get the prefix put back in front of their extranonce2 and are
+forwarded upstream unchanged otherwise, so the pool sees valid work from
+a single subscription. Jobs and difficulty changes from the pool are
+fanned out to all miners.
+
+The proxy runs its own asyncio loop on a background thread; the public
+methods are safe to call from Flask request threads.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from threading import Thread, Event
+
+from stratum import parse_pool_url, StratumError, CLIENT_NAME
+
+log = logging.getLogger(__name__)
+
+# Window for the fleet-wide share rate
+SHARE_WINDOW_SECONDS = 600
+UPSTREAM_TIMEOUT = 30
+MAX_RECONNECT_DELAY = 60
+
+
+class Downstream:
+    """One connected miner"""
+    __slots__ = ('writer', 'address', 'prefix', 'session', 'extranonce1', 'workers', 'connected_at',
+                 'subscribed', 'submitted', 'accepted', 'rejected', 'last_share')
+
+    def __init__(self, writer, address):
+        self.writer = writer
+        self.address = address
+        self.prefix = None
+        self.session = None  # Upstream subscription the prefix belongs to
+        self.extranonce1 = None
+        self.workers = set()
+        self.connected_at = time.time()
+        self.subscribed = False
+        self.submitted = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.last_share = None
+
+    def send(self, message):
+        self.writer.write(json.dumps(message).encode('utf-8') + b'\n')
+
+    def as_dict(self):
+        return {
+            'address': self.address,
+            'extranonce1': self.extranonce1,
+            'workers': sorted(self.workers),
+            'connected_at': self.connected_at,
+            'submitted': self.submitted,
+            'accepted': self.accepted,
+            'rejected': self.rejected,
+            'last_share': self.last_share
+        }
+
+
+class StratumProxy:
+    def __init__(self, host='0.0.0.0', port=3334, prefix_bytes=1):
+        self.host = host
+        self.port = port
+        self.prefix_bytes = prefix_bytes
+        self.pool_url = None
+        self.username = None
+        self.password = None
+        # Upstream session state
+        self.upstream_connected = False
+        self.extranonce1 = None
+        self.extranonce2_size = None
+        self.difficulty = None
+        self.last_notify = None
+        self.upstream_reconnects = 0
+        self.upstream_error = None
+        self.jobs_received = 0
+        self.last_fanout_ms = None
+        self.started_at = None
+        self.downstreams = {}
+        self._accepted_shares = deque()  # (monotonic time, difficulty) within SHARE_WINDOW_SECONDS
+        self._accepted_total = 0
+        self._rejected_total = 0
+        self._free_prefixes = []
+        self._session = 0
+        self._pending = {}
+        self._next_id = 1
+        self._upstream_writer = None
+        self._upstream_ready = None
+        self._upstream_task = None
+        self._server = None
+        self._shutdown = None
+        self._loop = None
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    # --- Control (called from other threads) ---
+
+    def start(self, pool_url, username, password):
+        """Start listening and connect upstream. Returns (success, message)"""
+        if self.running:
+            self.set_upstream(pool_url, username, password)
+            return True, "Proxy already running"
+        self.pool_url = pool_url
+        self.username = username
+        self.password = password
+        started = Event()
+        errors = []
+
+        def run():
+            try:
+                asyncio.run(self._main(started))
+            except Exception as e:
+                errors.append(e)
+                started.set()
+
+        self._thread = Thread(target=run, daemon=True)
+        self._thread.start()
+        started.wait(5)
+        if errors:
+            self._thread = None
+            return False, f"Proxy failed to start: {errors[0]}"
+        log.info(f"Stratum proxy listening on {self.host}:{self.port} -> {pool_url}")
+        return True, f"Proxy listening on port {self.port}"
+
+    def stop(self):
+        if not self.running:
+            return False, "Proxy is not running"
+        self._loop.call_soon_threadsafe(self._shutdown.set)
+        self._thread.join(5)
+        self._thread = None
+        log.info("Stratum proxy stopped")
+        return True, "Proxy stopped"
+
+    def set_upstream(self, pool_url, username, password):
+        """Switch the upstream pool (miners are reconnected on the new subscription)"""
+        if (pool_url, username, password) == (self.pool_url, self.username, self.password):
+            return
+        self.pool_url = pool_url
+        self.username = username
+        self.password = password
+        if self.running:
+            log.info(f"Stratum proxy switching upstream to {pool_url}")
+            self._loop.call_soon_threadsafe(self._restart_upstream)
+
+    def snapshot(self):
+        """Upstream state, share rates and per-miner stats for the API"""
+        now = time.monotonic()
+        shares = [s for s in list(self._accepted_shares) if now - s[0] <= SHARE_WINDOW_SECONDS]
+        window = min(SHARE_WINDOW_SECONDS, time.time() - self.started_at) if self.started_at else 0
+        hashes = sum(diff for _, diff in shares) * 2**32
+        return {
+            'running': self.running,
+            'listen': f"{self.host}:{self.port}",
+            'pool_url': self.pool_url,
+            'upstream_connected': self.upstream_connected,
+            'upstream_error': self.upstream_error,
+            'upstream_reconnects': self.upstream_reconnects,
+            'difficulty': self.difficulty,
+            'extranonce1': self.extranonce1,
+            'extranonce2_size': self.extranonce2_size,
+            'jobs_received': self.jobs_received,
+            'last_fanout_ms': self.last_fanout_ms,
+            'downstream_count': len(self.downstreams),
+            'shares_per_minute': round(len(shares) / window * 60, 2) if window > 0 else 0.0,
+            'effective_hashrate': hashes / window if window > 0 else 0.0,  # H/s from accepted share difficulty
+            'accepted_total': self._accepted_total,
+            'rejected_total': self._rejected_total,
+            'downstreams': [d.as_dict() for d in list(self.downstreams.values())]
+        }
+
+    # --- Event loop side ---
+
+    async def _main(self, started):
+        self._loop = asyncio.get_running_loop()
+        self._shutdown = asyncio.Event()
+        self._upstream_ready = asyncio.Event()
+        self.started_at = time.time()
+        self._server = await asyncio.start_server(self._handle_downstream, self.host, self.port)
+        started.set()
+        self._upstream_task = asyncio.ensure_future(self._upstream_loop())
+        try:
+            await self._shutdown.wait()
+        finally:
+            self._upstream_task.cancel()
+            self._server.close()
+            self._drop_downstreams()
+            self._close_upstream()
+            self.upstream_connected = False
+
+    def _restart_upstream(self):
+        self._upstream_task.cancel()
+        self.upstream_connected = False
+        self._upstream_ready.clear()
+        self._close_upstream()
+        self._drop_downstreams()
+        self._upstream_task = asyncio.ensure_future(self._upstream_loop())
+
+    def _close_upstream(self):
+        if self._upstream_writer is not None:
+            self._upstream_writer.close()
+            self._upstream_writer = None
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(StratumError('connection_closed', "Upstream connection lost"))
+        self._pending.clear()
+
+    def _drop_downstreams(self):
+        """Disconnect all miners (they reconnect and resubscribe with the new extranonce)"""
+        for downstream in list(self.downstreams.values()):
+            downstream.writer.close()
+
+    async def _upstream_loop(self):
+        delay = 1
+        while True:
+            try:
+                await self._upstream_session()
+                delay = 1
+            except asyncio.CancelledError:
+                raise
+            except (StratumError, OSError, asyncio.TimeoutError) as e:
+                self.upstream_error = getattr(e, 'message', None) or str(e) or type(e).__name__
+                log.warning(f"Stratum proxy upstream error: {self.upstream_error}")
+            self.upstream_connected = False
+            self._upstream_ready.clear()
+            self._close_upstream()
+            self._drop_downstreams()
+            self.upstream_reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+    async def _upstream_session(self):
+        host, port = parse_pool_url(self.pool_url)
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), UPSTREAM_TIMEOUT)
+        self._upstream_writer = writer
+        reading = asyncio.ensure_future(self._upstream_reader(reader))
+        try:
+            result = await self._upstream_call('mining.subscribe', [CLIENT_NAME])
+            if not isinstance(result, list) or len(result) < 3:
+                raise StratumError('subscribe_failed', f"Unexpected subscribe result: {result!r}")
+            self.extranonce1 = result[1]
+            self.extranonce2_size = int(result[2])
+            if self.extranonce2_size <= self.prefix_bytes:
+                raise StratumError('subscribe_failed', f"Pool extranonce2_size {self.extranonce2_size} too small to split")
+            self._free_prefixes = list(range(256 ** self.prefix_bytes))
+            self._session += 1
+            if await self._upstream_call('mining.authorize', [self.username, self.password]) is not True:
+                raise StratumError('auth_failed', "Upstream authorization failed")
+            self.upstream_connected = True
+            self.upstream_error = None
+            self._upstream_ready.set()
+            log.info(f"Stratum proxy upstream ready: {self.pool_url} (extranonce1 {self.extranonce1}, "
+                     f"extranonce2_size {self.extranonce2_size})")
+            await reading
+        finally:
+            reading.cancel()
+
+    async def _upstream_reader(self, reader):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    raise StratumError('connection_closed', "Pool closed the connection")
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue
+                method = message.get('method')
+                if method:
+                    self._upstream_notification(method, message.get('params') or [])
+                    continue
+                future = self._pending.pop(message.get('id'), None)
+                if future is not None and not future.done():
+                    if message.get('error'):
+                        future.set_exception(StratumError('rejected', str(message['error'])))
+                    else:
+                        future.set_result(message.get('result'))
+        except (StratumError, OSError):
+            # Fail outstanding calls right away instead of letting them time out
+            self._close_upstream()
+            raise
+
+    def _upstream_notification(self, method, params):
+        if method == 'mining.set_difficulty' and params:
+            self.difficulty = float(params[0])
+            self._broadcast({'id': None, 'method': method, 'params': params})
+        elif method == 'mining.notify':
+            self.jobs_received += 1
+            self.last_notify = params
+            started = time.perf_counter()
+            self._broadcast({'id': None, 'method': method, 'params': params})
+            self.last_fanout_ms = round((time.perf_counter() - started) * 1000, 3)
+        elif method == 'mining.set_extranonce':
+            # New extranonce for the whole session - miners have to resubscribe
+            self._loop.call_soon(self._restart_upstream)
+        elif method == 'client.reconnect':
+            self._loop.call_soon(self._restart_upstream)
+
+    def _broadcast(self, message):
+        # Encoded once, written into every miner's transport buffer
+        data = json.dumps(message).encode('utf-8') + b'\n'
+        for downstream in list(self.downstreams.values()):
+            if downstream.subscribed:
+                downstream.writer.write(data)
+
+    async def _upstream_call(self, method, params):
+        if self._upstream_writer is None:
+            raise StratumError('connection_closed', "Upstream not connected")
+        msg_id = self._next_id
+        self._next_id += 1
+        future = self._loop.create_future()
+        self._pending[msg_id] = future
+        self._upstream_writer.write(json.dumps({'id': msg_id, 'method': method, 'params': params}).encode('utf-8') + b'\n')
+        try:
+            return await asyncio.wait_for(future, UPSTREAM_TIMEOUT)
+        finally:
+            self._pending.pop(msg_id, None)
+
+    async def _handle_downstream(self, reader, writer):
+        peer = writer.get_extra_info('peername')
+        downstream = Downstream(writer, f"{peer[0]}:{peer[1]}" if peer else '?')
+        self.downstreams[id(downstream)] = downstream
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue
+                await self._downstream_request(downstream, message)
+                await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        except asyncio.CancelledError:
+            pass  # stop() with the miner still connected
+        finally:
+            self.downstreams.pop(id(downstream), None)
+            if downstream.prefix is not None and downstream.session == self._session:
+                self._free_prefixes.append(downstream.prefix)
+            writer.close()
+
+    async def _downstream_request(self, downstream, message):
+        method = message.get('method')
+        msg_id = message.get('id')
+        params = message.get('params') or []
+
+        if method == 'mining.subscribe':
+            try:
+                await asyncio.wait_for(self._upstream_ready.wait(), 10)
+            except asyncio.TimeoutError:
+                downstream.send({'id': msg_id, 'result': None, 'error': [20, 'Upstream pool not connected', None]})
+                return
+            if not self._free_prefixes:
+                downstream.send({'id': msg_id, 'result': None, 'error': [20, 'Proxy is full', None]})
+                return
+            self._free_prefixes.sort()
+            downstream.prefix = self._free_prefixes.pop(0)
+            downstream.session = self._session
+            prefix_hex = downstream.prefix.to_bytes(self.prefix_bytes, 'big').hex()
+            downstream.extranonce1 = self.extranonce1 + prefix_hex
+            downstream.send({'id': msg_id, 'error': None, 'result': [
+                [['mining.set_difficulty', prefix_hex], ['mining.notify', prefix_hex]],
+                downstream.extranonce1, self.extranonce2_size - self.prefix_bytes]})
+            downstream.subscribed = True
+            if self.difficulty is not None:
+                downstream.send({'id': None, 'method': 'mining.set_difficulty', 'params': [self.difficulty]})
+            if self.last_notify is not None:
+                # Current job with clean_jobs so the miner starts right away
+                downstream.send({'id': None, 'method': 'mining.notify', 'params': self.last_notify[:8] + [True]})
+
+        elif method == 'mining.authorize':
+            # Shares go upstream under the proxy's account; the miner's name is kept for stats
+            if params:
+                downstream.workers.add(str(params[0]))
+            downstream.send({'id': msg_id, 'result': True, 'error': None})
+
+        elif method == 'mining.submit':
+            if downstream.prefix is None or len(params) < 5:
+                downstream.send({'id': msg_id, 'result': None, 'error': [25, 'Not subscribed', None]})
+                return
+            downstream.submitted += 1
+            asyncio.ensure_future(self._forward_submit(downstream, msg_id, params))
+
+        elif method == 'mining.extranonce.subscribe':
+            downstream.send({'id': msg_id, 'result': False, 'error': None})
+
+        else:
+            downstream.send({'id': msg_id, 'result': None, 'error': [20, 'Unsupported method', None]})
+
+    async def _forward_submit(self, downstream, msg_id, params):
+        _, job_id, extranonce2, ntime, nonce = params[:5]
+        prefix_hex = downstream.prefix.to_bytes(self.prefix_bytes, 'big').hex()
+        difficulty = self.difficulty or 0.0
+        try:
+            result = await self._upstream_call('mining.submit', [self.username, job_id, prefix_hex + extranonce2,
+                                                                 ntime, nonce])
+            accepted = result is True
+            error = None if accepted else [23, 'Rejected by pool', None]
+        except StratumError as e:
+            accepted = False
+            error = [20, e.message, None]
+        except asyncio.TimeoutError:
+            accepted = False
+            error = [20, 'Upstream timeout', None]
+
+        downstream.last_share = time.time()
+        if accepted:
+            downstream.accepted += 1
+            self._accepted_total += 1
+            now = time.monotonic()
+            self._accepted_shares.append((now, difficulty))
+            while self._accepted_shares and now - self._accepted_shares[0][0] > SHARE_WINDOW_SECONDS:
+                self._accepted_shares.popleft()
+        else:
+            downstream.rejected += 1
+            self._rejected_total += 1
+        try:
+            downstream.send({'id': msg_id, 'result': accepted if error is None else None, 'error': error})
+        except Exception:
+            pass
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""Background sampler for CPU usage, RAM and CPU temperature."""
+import glob
+import logging
+import math
+import os
+import re
+import time
+from threading import Thread, Lock
+
+import psutil
+
+from buffers import TimeSeriesBuffer
+
+log = logging.getLogger(__name__)
+
+# Known CPU temperature sensors, in order of preference
+SENSOR_NAMES = [
+    'coretemp',     # Linux desktop/server (Intel/AMD)
+    'cpu_thermal',  # Raspberry Pi
+    'k10temp',      # AMD Ryzen
+    'zenpower'      # AMD Ryzen (alternative driver)
+]
+
+TEMP_UNAVAILABLE = 'Temperature sensor not available'
+HWMON_ROOT = '/sys/class/hwmon'
+
+
+def _number(path):
+    """N of .../hwmonN or .../tempN_input - sorted as text, temp10 would come before temp2"""
+    match = re.search(r'(\d+)(?:_input)?$', path)
+    return int(match.group(1)) if match else -1
+
+
+def _read_label(input_path):
+    try:
+        with open(input_path[:-len('_input')] + '_label') as f:
+            return f.read().strip()
+    except OSError:
+        return ''
+
+
+def find_temperature_sensor(hwmon_root=HWMON_ROOT):
+    """Pick the CPU temperature sensor once at startup.
+
+    Returns (sensor_name, sysfs_path). sysfs_path is the temp*_input file
+    with the label of psutil's first entry for that sensor (e.g. "Package
+    id 0" for coretemp), so later samples can read one file instead of
+    scanning every hwmon device. Either value may be None if nothing
+    usable was found.
+    """
+    try:
+        temps = psutil.sensors_temperatures()
+    except (AttributeError, OSError):
+        # sensors_temperatures() not supported on this system
+        return None, None
+
+    name = next((n for n in SENSOR_NAMES if temps.get(n)), None)
+    if name is None:
+        # No known sensor found - try first available sensor
+        name = next((n for n, entries in temps.items() if entries), None)
+    if name is None:
+        return None, None
+
+    inputs = []
+    for hwmon in sorted(glob.glob(os.path.join(hwmon_root, 'hwmon*')), key=_number):
+        try:
+            with open(os.path.join(hwmon, 'name')) as f:
+                if f.read().strip() != name:
+                    continue
+        except OSError:
+            continue
+        found = glob.glob(os.path.join(hwmon, 'temp*_input')) or glob.glob(os.path.join(hwmon, 'device', 'temp*_input'))
+        inputs.extend(sorted(found, key=_number))
+    label = temps[name][0].label
+    return name, next((path for path in inputs if _read_label(path) == label), inputs[0] if inputs else None)
+
+
+class SystemStatsSampler:
+    """Takes one consistent system snapshot every interval seconds.
+
+    Requests read the latest snapshot instead of calling psutil
+    themselves, which also keeps cpu_percent(interval=None) measuring a
+    steady interval instead of "time since some other tab asked".
+    """
+
+    def __init__(self, interval=2.0, history_points=300):
+        self.interval = interval
+        self.sensor_name = None
+        self.sensor_path = None
+        # History for charting (timestamps in ms like the hashrate chart)
+        self.cpu_history = TimeSeriesBuffer(history_points)
+        self.ram_history = TimeSeriesBuffer(history_points)
+        self.temp_history = TimeSeriesBuffer(history_points)
+        self._snapshot = None
+        self._lock = Lock()
+        self._thread = None
+        self._sensor_detected = False
+
+    def start(self):
+        """Detect the temperature sensor, establish the CPU baseline and start sampling"""
+        if self._thread is not None:
+            return
+        if not self._sensor_detected:
+            self._detect_sensor()
+        psutil.cpu_percent(interval=None)  # Baseline for the first sample
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def snapshot(self):
+        """Latest snapshot (sampled synchronously if the sampler hasn't run yet)"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.sample()
+        return snapshot
+
+    def history(self, limit):
+        """Last limit samples as columns (temperature is None where unavailable)"""
+        timestamps, cpu = self.cpu_history.last(limit)
+        _, ram = self.ram_history.last(limit)
+        _, temp = self.temp_history.last(limit)
+        return {
+            'timestamps': timestamps,
+            'cpu_usage': cpu,
+            'ram_percent': ram,
+            'cpu_temp': [None if math.isnan(t) else t for t in temp]
+        }
+
+    def sample(self):
+        """Take one snapshot, store it in the history and publish it"""
+        with self._lock:
+            if not self._sensor_detected:
+                self._detect_sensor()
+
+            stats = {
+                'cpu_usage_live': 0.0,
+                'cpu_temp': None,
+                'cpu_temp_warning': None,
+                'ram_used_gb': 0.0,
+                'ram_total_gb': 0.0,
+                'ram_percent': 0.0
+            }
+
+            try:
+                # Non-blocking CPU usage measurement (average since the previous sample)
+                stats['cpu_usage_live'] = psutil.cpu_percent(interval=None)
+
+                # RAM usage
+                ram = psutil.virtual_memory()
+                stats['ram_used_gb'] = round(ram.used / (1024**3), 1)
+                stats['ram_total_gb'] = round(ram.total / (1024**3), 1)
+                stats['ram_percent'] = ram.percent
+
+                stats['cpu_temp'] = self._read_temperature()
+                if stats['cpu_temp'] is None:
+                    stats['cpu_temp_warning'] = TEMP_UNAVAILABLE
+            except Exception as e:
+                log.error(f"Error getting system stats: {e}")
+
+            timestamp = time.time() * 1000
+            self.cpu_history.append(timestamp, stats['cpu_usage_live'])
+            self.ram_history.append(timestamp, stats['ram_percent'])
+            self.temp_history.append(timestamp, stats['cpu_temp'] if stats['cpu_temp'] is not None else math.nan)
+
+            # Replace the reference - readers never see a half-filled dict
+            self._snapshot = stats
+            return stats
+
+    def _detect_sensor(self):
+        self.sensor_name, self.sensor_path = find_temperature_sensor()
+        self._sensor_detected = True
+        if self.sensor_name:
+            log.info(f"CPU temperature sensor: {self.sensor_name} ({self.sensor_path or 'via psutil'})")
+        else:
+            log.warning(TEMP_UNAVAILABLE)
+
+    def _read_temperature(self):
+        """Read the sensor picked at startup (one sysfs file when possible)"""
+        if self.sensor_path:
+            try:
+                with open(self.sensor_path) as f:
+                    return round(int(f.read().strip()) / 1000.0, 1)
+            except (OSError, ValueError):
+                pass
+        if self.sensor_name:
+            try:
+                entries = psutil.sensors_temperatures().get(self.sensor_name)
+                if entries:
+                    return round(entries[0].current, 1)
+            except (AttributeError, OSError):
+                pass
+        return None
+
+    def _run(self):
+        next_sample = time.monotonic()
+        while True:
+            # Fixed cadence, independent of how long a sample takes
+            next_sample += self.interval
+            time.sleep(max(0.0, next_sample - time.monotonic()))
+            self.sample()
@@ -0,0 +1,39 @@
+"""LineBuffer cursors across a restart (a new buffer with a new epoch)"""
+from buffers import LineBuffer
+
+
+def filled(count, capacity=100):
+    buffer = LineBuffer(capacity)
+    for n in range(1, count + 1):
+        buffer.append(f'line {n}')
+    return buffer
+
+
+def test_since_same_epoch():
+    buffer = filled(10)
+    result = buffer.since(7, epoch=buffer.epoch)
+    assert (result.from_seq, result.last_seq) == (8, 10)
+    assert result.lines == ['line 8', 'line 9', 'line 10']
+
+
+def test_stale_cursor_below_last_seq_gets_everything():
+    old = filled(5)
+    restarted = filled(20)
+    # The old cursor (5) is a valid seq in the new run, only the epoch tells them apart
+    result = restarted.since(old.last_seq, epoch=old.epoch)
+    assert result.epoch == restarted.epoch != old.epoch
+    assert result.from_seq == 1
+    assert len(result.lines) == 20
+
+
+def test_stale_cursor_beyond_last_seq_without_epoch():
+    restarted = filled(3)
+    result = restarted.since(50)
+    assert (result.from_seq, result.lines) == (1, ['line 1', 'line 2', 'line 3'])
+
+
+def test_since_after_lines_were_dropped():
+    buffer = filled(10, capacity=4)
+    result = buffer.since(2, epoch=buffer.epoch)
+    assert (result.first_seq, result.from_seq) == (7, 7)
+    assert result.lines == ['line 7', 'line 8', 'line 9', 'line 10']
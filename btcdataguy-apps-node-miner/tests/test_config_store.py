@@ -0,0 +1,32 @@
+"""ConfigStore writes against a temporary directory"""
+import json
+import os
+import stat
+
+from config_store import ConfigStore
+
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_new_config_is_0644(tmp_path):
+    path = str(tmp_path / 'config.json')
+    store = ConfigStore(path, {'cpu_percentage': 10})
+    assert store.update({'worker_name': 'rig1'})
+    assert mode(path) == 0o644
+    with open(path) as f:
+        assert json.load(f) == {'cpu_percentage': 10, 'worker_name': 'rig1'}
+
+
+def test_save_keeps_file_mode(tmp_path):
+    path = str(tmp_path / 'config.json')
+    with open(path, 'w') as f:
+        json.dump({'cpu_percentage': 10}, f)
+    os.chmod(path, 0o640)
+    store = ConfigStore(path, {})
+    assert store.update({'cpu_percentage': 20})
+    assert store.save({'cpu_percentage': 30})
+    assert mode(path) == 0o640
+    assert store.load()['cpu_percentage'] == 30
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
@@ -0,0 +1,36 @@
+"""fleet_peers validation and FleetPoller.set_peers with malformed entries"""
+import pytest
+
+from fleet import FleetPoller, peer_entry
+
+
+@pytest.mark.parametrize('entry, expected', [
+    ('node2.local:5000', {'url': 'node2.local:5000', 'name': None}),
+    ({'url': 'http://10.0.0.3', 'name': 'garage'}, {'url': 'http://10.0.0.3', 'name': 'garage'}),
+    ({'url': ' http://10.0.0.4 '}, {'url': 'http://10.0.0.4', 'name': None}),
+])
+def test_valid_entries(entry, expected):
+    assert peer_entry(entry) == expected
+
+
+@pytest.mark.parametrize('entry', [
+    {'name': 'no url'}, {'url': 5}, {'url': 'http://a', 'name': 2}, 3, None, [], '', 'host:port'
+])
+def test_malformed_entries(entry):
+    assert peer_entry(entry) is None
+
+
+def test_set_peers_skips_malformed_entries():
+    poller = FleetPoller()
+    poller.set_peers(['a:5000', {'name': 'x'}, None, 7, {'url': 'b', 'name': 'B'}])
+    assert [(peer.url, peer.name) for peer in poller.peers] == [('http://a:5000', 'a:5000'), ('http://b', 'B')]
+
+
+def test_set_peers_keeps_known_peer_state():
+    poller = FleetPoller()
+    poller.set_peers(['a:5000'])
+    peer = poller.peers[0]
+    peer.failures = 3
+    poller.set_peers([{'url': 'a:5000', 'name': 'renamed'}, {'url': None}])
+    assert poller.peers == (peer,)
+    assert peer.name == 'renamed'
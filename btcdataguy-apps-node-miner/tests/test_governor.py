@@ -0,0 +1,81 @@
+"""Governor.tick() load limit with fake system-wide and miner CPU readings"""
+from collections import namedtuple
+
+import psutil
+import pytest
+
+from governor import Governor
+
+
+class FakeThrottle:
+    name = 'cgroup'
+
+    def __init__(self, cpu_percentage, cpu_count):
+        self.cpu_percentage = cpu_percentage
+        self.cpu_count = cpu_count
+
+    def set_percentage(self, cpu_percentage):
+        self.cpu_percentage = cpu_percentage
+        return True
+
+
+@pytest.fixture
+def governor(monkeypatch):
+    """Governor on a 4-core box at an 80% ceiling, 10% headroom, no temperature sensor"""
+    monkeypatch.setattr(psutil, 'cpu_count', lambda *args, **kwargs: 4)
+    governor = Governor(temperature=lambda: None)
+    governor.configure(True, 75.0, 5, 10.0)
+    governor.attach(FakeThrottle(80, 4), miner_pid=None)
+    return governor
+
+
+def feed(monkeypatch, governor, system, miner):
+    """Next tick sees system% of the whole box in use, miner% of it by the miner"""
+    monkeypatch.setattr(governor, 'system_cpu', lambda: system)
+    monkeypatch.setattr(governor, 'miner_cpu', lambda: miner)
+
+
+def test_node_load_cuts_budget(monkeypatch, governor):
+    # bitcoind in another container: 90% busy overall, only 20% of it is the miner
+    feed(monkeypatch, governor, 90.0, 20.0)
+    governor.tick()
+    # 100 - 10 headroom - 70 other = 20% of the box left for the miner
+    assert governor._throttle.cpu_percentage == 20
+    assert governor.last['other_cpu'] == 70.0
+    adjustment = governor.adjustments[-1]
+    assert (adjustment['from'], adjustment['to']) == (80, 20)
+    assert adjustment['reason'] == 'node load 70%'
+
+
+def test_miner_own_load_keeps_budget(monkeypatch, governor):
+    # The box is busy, but it's the miner itself
+    feed(monkeypatch, governor, 85.0, 80.0)
+    governor.tick()
+    assert governor._throttle.cpu_percentage == 80
+    assert not governor.adjustments
+
+
+def test_unknown_load_keeps_budget(monkeypatch, governor):
+    # First tick: no baseline yet for the system or the miner's processes
+    feed(monkeypatch, governor, None, 20.0)
+    governor.tick()
+    assert governor.last['other_cpu'] is None
+    assert governor._throttle.cpu_percentage == 80
+
+
+def test_budget_recovers_in_steps(monkeypatch, governor):
+    feed(monkeypatch, governor, 90.0, 20.0)
+    governor.tick()
+    feed(monkeypatch, governor, 30.0, 20.0)
+    governor.tick()
+    assert governor._throttle.cpu_percentage == 20 + governor.max_step
+    assert governor.adjustments[-1]['reason'] == 'recovering'
+
+
+def test_system_cpu_from_cpu_times(monkeypatch, governor):
+    scputimes = namedtuple('scputimes', 'user system idle iowait')
+    times = iter([scputimes(100.0, 50.0, 800.0, 50.0), scputimes(160.0, 70.0, 810.0, 60.0)])
+    monkeypatch.setattr(psutil, 'cpu_times', lambda: next(times))
+    assert governor.system_cpu() is None
+    # 80 busy of 100 elapsed
+    assert governor.system_cpu() == pytest.approx(80.0)
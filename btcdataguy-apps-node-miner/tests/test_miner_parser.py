@@ -0,0 +1,41 @@
+"""miner_parser.parse_line on cpuminer lines in the casings seen in the wild"""
+import pytest
+
+from miner_parser import CoreHashrate, MinerError, ShareResult, parse_line
+
+
+@pytest.mark.parametrize('line, unit', [
+    ('[2024-01-06 12:00:05] CPU #3: 2205.12 kH/s', 'kH'),
+    ('[2024-01-06 12:00:05] CPU #3: 2205.12 KH/S', 'kH'),
+    ('[2024-01-06 12:00:05] CPU #3: 2205.12 Mh/s', 'MH'),
+])
+def test_core_hashrate_any_unit_casing(line, unit):
+    assert parse_line(line) == CoreHashrate(3, 2205.12, unit)
+
+
+def test_share_result():
+    event = parse_line('[2024-01-06 12:00:20] accepted: 3/4 (diff 0.012), 8820.41 kH/s (yes!)')
+    assert event == ShareResult(True, 3, 4, 8820.41, 'kH', 0.012)
+    assert parse_line('[2024-01-06 12:00:20] accepted: 3/5 (diff 0.012), 8820.41 kH/s (booooo)').accepted is False
+
+
+@pytest.mark.parametrize('line, kind', [
+    ('[2024-01-06 12:00:01] Stratum connection failed: Connection refused', 'connection_failed'),
+    ('[2024-01-06 12:00:01] CONNECTION FAILED', 'connection_failed'),
+    ('[2024-01-06 12:00:01] Connection Refused', 'connection_refused'),
+    ('[2024-01-06 12:00:01] HTTP request failed: Failed to connect to pool.example.com port 3333', 'connection_failed'),
+    ('[2024-01-06 12:00:01] Stratum connection timeout', 'timeout'),
+    ('[2024-01-06 12:00:01] HTTP request failed: Operation timed out after 30000 milliseconds', 'timeout'),
+    ('[2024-01-06 12:00:01] Could not resolve host: pool.example.com', 'dns_failed'),
+    ('[2024-01-06 12:00:01] Stratum authentication failed', 'auth_failed'),
+])
+def test_errors_any_casing(line, kind):
+    assert parse_line(line) == MinerError(kind, line)
+
+
+@pytest.mark.parametrize('line', [
+    '[2024-01-06 12:00:01] Stratum requested work restart',
+    '[2024-01-06 12:00:01] longpoll timeout, retrying',  # Not a connection timeout
+])
+def test_untracked_lines(line):
+    assert parse_line(line) is None
@@ -0,0 +1,76 @@
+"""SessionLedger writes against a temporary SQLite file"""
+import sqlite3
+import threading
+import time
+
+from session_ledger import SessionLedger
+
+
+class GatedLock:
+    """Lock that makes one thread wait for a gate before acquiring it"""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.gated_thread = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        if threading.current_thread() is self.gated_thread:
+            self.gate.wait(5)
+        self._lock.acquire()
+
+    def __exit__(self, *exc):
+        self._lock.release()
+
+
+def stored(path):
+    db = sqlite3.connect(path)
+    try:
+        return db.execute('SELECT stop_time, stop_reason, accepted FROM sessions').fetchall()
+    finally:
+        db.close()
+
+
+def test_session_lifecycle(tmp_path):
+    path = str(tmp_path / 'sessions.db')
+    ledger = SessionLedger(path)
+    ledger.open()
+    ledger.begin(1, 'stratum+tcp://pool.example.com:3333', 'worker1', 50, 4, 'cgroup')
+    ledger.share(True)
+    ledger.share(False)
+    ledger.sample(2000e3, temperature=50.0)
+    ledger.flush()
+    assert stored(path) == [(None, None, 1)]
+    ledger.end('stopped')
+    result = ledger.query()
+    assert result['total'] == 1
+    session = result['sessions'][0]
+    assert (session['stop_reason'], session['accepted'], session['rejected']) == ('stopped', 1, 1)
+    assert session['avg_hashrate_hs'] == 2000e3
+    ledger.close()
+
+
+def test_late_flush_does_not_reopen_an_ended_session(tmp_path):
+    path = str(tmp_path / 'sessions.db')
+    ledger = SessionLedger(path)
+    ledger.open()
+    ledger.begin(1, 'stratum+tcp://pool.example.com:3333', 'worker1', 50, 4, 'cgroup')
+    ledger.flush()
+
+    # The flusher thread flushes while the session is still open, but reaches the database late
+    lock = GatedLock()
+    ledger._db_lock = lock
+    flusher = threading.Thread(target=ledger.flush)
+    lock.gated_thread = flusher
+    flusher.start()
+    time.sleep(0.1)
+    # Meanwhile the session ends and a query() flush writes it
+    ledger.end('stopped')
+    ledger.flush()
+    lock.gate.set()
+    flusher.join(5)
+
+    [(stop_time, stop_reason, _)] = stored(path)
+    assert stop_time is not None
+    assert stop_reason == 'stopped'
+    ledger.close()
@@ -0,0 +1,71 @@
+"""stratum.probe_pool against the local fake pool (tools/fake_stratum.py), no network needed"""
+import socket
+
+import pytest
+
+from fake_stratum import FakeStratumServer
+from stratum import probe_pool
+
+USERNAME = 'bc1qtest.worker'
+PASSWORD = 'd=0.1'
+
+
+@pytest.fixture
+def pool(request):
+    """Fake pool started with the test's parametrized options"""
+    server = FakeStratumServer(**getattr(request, 'param', {})).start_in_thread()
+    yield server
+    server.stop()
+
+
+def free_port():
+    """A local port nothing listens on"""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@pytest.mark.parametrize('pool', [{'difficulty': 0.5, 'delay_ms': 50}], indirect=True)
+def test_success(pool):
+    result = probe_pool(pool.url, USERNAME, PASSWORD, timeout=5)
+    assert result['ok']
+    assert result['error_code'] is None
+    assert (result['host'], result['port']) == ('127.0.0.1', pool.port)
+    assert result['difficulty'] == 0.5
+    assert result['extranonce1'] == '00000001'
+    assert result['extranonce2_size'] == 4
+    # Every reply is delayed by 50 ms
+    assert result['connect_ms'] >= 0
+    assert result['subscribe_ms'] >= 50
+    assert result['authorize_ms'] >= 50
+    assert result['total_ms'] >= result['connect_ms'] + result['subscribe_ms'] + result['authorize_ms']
+
+
+@pytest.mark.parametrize('pool', [{'reject_auth': True}], indirect=True)
+def test_auth_rejected(pool):
+    result = probe_pool(pool.url, USERNAME, PASSWORD, timeout=5)
+    assert not result['ok']
+    assert result['error_code'] == 'auth_failed'
+    assert 'Unauthorized worker' in result['error']
+    assert result['subscribe_ms'] is not None
+    assert result['authorize_ms'] is None
+    assert result['difficulty'] is None
+
+
+def test_connection_refused():
+    result = probe_pool(f'stratum+tcp://127.0.0.1:{free_port()}', USERNAME, PASSWORD, timeout=5)
+    assert not result['ok']
+    assert result['error_code'] == 'connection_refused'
+    assert result['connect_ms'] is None
+    assert result['total_ms'] is not None
+
+
+@pytest.mark.parametrize('pool', [{'delay_ms': 2000}], indirect=True)
+def test_timeout(pool):
+    result = probe_pool(pool.url, USERNAME, PASSWORD, timeout=0.5)
+    assert not result['ok']
+    assert result['error_code'] == 'timeout'
+    # Connected, but the subscribe answer never came in time
+    assert result['connect_ms'] is not None
+    assert result['subscribe_ms'] is None
+    assert 0.5 * 1000 <= result['total_ms'] < 2000
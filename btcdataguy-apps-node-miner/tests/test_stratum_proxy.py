@@ -0,0 +1,164 @@
+"""StratumProxy between miners and the local fake pool (tools/fake_stratum.py), no network needed"""
+import json
+import logging
+import socket
+import time
+
+import pytest
+
+from fake_stratum import FakeStratumServer
+from stratum_proxy import StratumProxy
+
+USERNAME = 'bc1qproxy.node'
+PASSWORD = 'd=0.1'
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+class Miner:
+    """Blocking Stratum client; notifications are collected while waiting for replies"""
+
+    def __init__(self, port):
+        self.sock = socket.create_connection(('127.0.0.1', port), timeout=5)
+        self.file = self.sock.makefile('r', encoding='utf-8')
+        self.notifications = []
+        self._next_id = 1
+
+    def call(self, method, params):
+        msg_id = self._next_id
+        self._next_id += 1
+        self.sock.sendall(json.dumps({'id': msg_id, 'method': method, 'params': params}).encode() + b'\n')
+        while True:
+            message = self.read()
+            assert message is not None, "proxy closed the connection"
+            if message.get('id') == msg_id:
+                return message
+
+    def read(self):
+        """Next message, None on EOF (a message without id is kept as notification)"""
+        line = self.file.readline()
+        if not line:
+            return None
+        message = json.loads(line)
+        if message.get('method'):
+            self.notifications.append(message)
+        return message
+
+    def notification(self, method):
+        """Wait for the first notification of method"""
+        while True:
+            for message in self.notifications:
+                if message['method'] == method:
+                    return message
+            assert self.read() is not None, "proxy closed the connection"
+
+    def subscribe(self):
+        reply = self.call('mining.subscribe', ['test-miner/1.0'])
+        assert reply['error'] is None
+        return reply['result']
+
+    def close(self):
+        self.sock.close()
+
+
+@pytest.fixture
+def pool():
+    server = FakeStratumServer().start_in_thread()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def proxy(pool):
+    proxy = StratumProxy(host='127.0.0.1', port=free_port())
+    success, message = proxy.start(pool.url, USERNAME, PASSWORD)
+    assert success, message
+    wait_for(lambda: proxy.upstream_connected)
+    yield proxy
+    if proxy.running:
+        proxy.stop()
+
+
+@pytest.fixture
+def miners(proxy):
+    connected = []
+
+    def connect():
+        miner = Miner(proxy.port)
+        connected.append(miner)
+        return miner
+
+    yield connect
+    for miner in connected:
+        miner.close()
+
+
+def test_subscribe_and_authorize(proxy, miners):
+    miner = miners()
+    subscriptions, extranonce1, extranonce2_size = miner.subscribe()
+    # The pool's extranonce1 plus this miner's prefix byte, one byte less of extranonce2
+    assert extranonce1 == proxy.extranonce1 + '00'
+    assert extranonce2_size == proxy.extranonce2_size - 1
+    assert miner.call('mining.authorize', ['other.worker', 'x'])['result'] is True
+    assert miner.notification('mining.set_difficulty')['params'] == [0.1]
+    assert miner.notification('mining.notify')['params'][0]
+    wait_for(lambda: proxy.snapshot()['downstream_count'] == 1)
+    assert proxy.snapshot()['downstreams'][0]['workers'] == ['other.worker']
+
+
+def test_submit_gets_prefix(pool, proxy, miners):
+    first, second = miners(), miners()
+    first.subscribe()
+    assert second.subscribe()[1] == proxy.extranonce1 + '01'
+    job_id = second.notification('mining.notify')['params'][0]
+    reply = second.call('mining.submit', ['other.worker', job_id, 'aabbcc', '5f5e1000', '00000001'])
+    assert reply['result'] is True
+    # Forwarded under the proxy's account with the miner's prefix in front of extranonce2
+    assert pool.submits == [[USERNAME, job_id, '01aabbcc', '5f5e1000', '00000001']]
+    wait_for(lambda: proxy.snapshot()['accepted_total'] == 1)
+
+
+def test_upstream_switch(pool, proxy, miners):
+    miner = miners()
+    miner.subscribe()
+    other_pool = FakeStratumServer(difficulty=0.25).start_in_thread()
+    try:
+        proxy.set_upstream(other_pool.url, USERNAME, PASSWORD)
+        # Miners are dropped and resubscribe on the new upstream
+        while miner.read() is not None:
+            pass
+        wait_for(lambda: proxy.upstream_connected and other_pool.connections == 1)
+        miner = miners()
+        miner.subscribe()
+        assert miner.notification('mining.set_difficulty')['params'] == [0.25]
+        job_id = miner.notification('mining.notify')['params'][0]
+        assert miner.call('mining.submit', ['w', job_id, 'aabbcc', '5f5e1000', '00000002'])['result'] is True
+        assert len(other_pool.submits) == 1
+        assert not pool.submits
+        assert proxy.snapshot()['pool_url'] == other_pool.url
+    finally:
+        other_pool.stop()
+
+
+def test_stop_with_miner_connected(proxy, miners, capfd, caplog):
+    miner = miners()
+    miner.subscribe()
+    with caplog.at_level(logging.DEBUG, logger='asyncio'):
+        assert proxy.stop() == (True, "Proxy stopped")
+        # The miner sees the connection close
+        while miner.read() is not None:
+            pass
+    assert not proxy.running
+    assert 'CancelledError' not in capfd.readouterr().err
+    assert not [r for r in caplog.records if r.name == 'asyncio' and r.levelno >= logging.ERROR]
@@ -0,0 +1,53 @@
+"""find_temperature_sensor() against a fake /sys/class/hwmon tree"""
+from collections import namedtuple
+
+import psutil
+
+from system_stats import find_temperature_sensor
+
+shwtemp = namedtuple('shwtemp', 'label current high critical')
+
+
+def make_hwmon(root, index, name, sensors, subdir=''):
+    """hwmon<index> with temp<N>_input (and temp<N>_label when the label isn't None) per {N: label}"""
+    hwmon = root / f'hwmon{index}'
+    (hwmon / subdir).mkdir(parents=True)
+    (hwmon / 'name').write_text(f'{name}\n')
+    for number, label in sensors.items():
+        (hwmon / subdir / f'temp{number}_input').write_text('45000\n')
+        if label is not None:
+            (hwmon / subdir / f'temp{number}_label').write_text(f'{label}\n')
+    return hwmon
+
+
+def fake_psutil(monkeypatch, temps):
+    monkeypatch.setattr(psutil, 'sensors_temperatures', lambda: temps, raising=False)
+
+
+def test_coretemp_package_with_many_cores(tmp_path, monkeypatch):
+    # 12 cores: temp10_input sorts before temp1_input as text
+    sensors = {1: 'Package id 0'}
+    sensors.update({n: f'Core {n - 2}' for n in range(2, 14)})
+    hwmon = make_hwmon(tmp_path, 1, 'coretemp', sensors)
+    make_hwmon(tmp_path, 0, 'acpitz', {1: None})
+    fake_psutil(monkeypatch, {'acpitz': [shwtemp('', 40.0, None, None)],
+                              'coretemp': [shwtemp('Package id 0', 45.0, 80.0, 100.0)]})
+    assert find_temperature_sensor(str(tmp_path)) == ('coretemp', str(hwmon / 'temp1_input'))
+
+
+def test_unlabeled_inputs_in_numeric_order(tmp_path, monkeypatch):
+    hwmon = make_hwmon(tmp_path, 2, 'cpu_thermal', {10: None, 2: None, 9: None}, subdir='device')
+    fake_psutil(monkeypatch, {'cpu_thermal': [shwtemp('', 50.0, None, None)]})
+    assert find_temperature_sensor(str(tmp_path)) == ('cpu_thermal', str(hwmon / 'device' / 'temp2_input'))
+
+
+def test_hwmon_devices_in_numeric_order(tmp_path, monkeypatch):
+    make_hwmon(tmp_path, 10, 'k10temp', {1: 'Tctl'})
+    first = make_hwmon(tmp_path, 2, 'k10temp', {1: 'Tctl'})
+    fake_psutil(monkeypatch, {'k10temp': [shwtemp('Tctl', 55.0, None, None)]})
+    assert find_temperature_sensor(str(tmp_path)) == ('k10temp', str(first / 'temp1_input'))
+
+
+def test_no_sensor(tmp_path, monkeypatch):
+    fake_psutil(monkeypatch, {})
+    assert find_temperature_sensor(str(tmp_path)) == (None, None)
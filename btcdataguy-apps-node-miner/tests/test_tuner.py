@@ -0,0 +1,32 @@
+"""TuneJob._measure against a fake benchmark miner whose threads report at staggered times"""
+import sys
+
+from tuner import TuneJob
+
+# Every thread reports 1000 H/s every 3 s, thread n first at 0.75 * n s (like cpuminer's
+# per-thread timers: the reports of a step never line up)
+FAKE_MINER = f'''#!{sys.executable}
+import sys, time
+threads = int(sys.argv[sys.argv.index('-t') + 1])
+start = time.monotonic()
+next_report = [0.75 * n for n in range(threads)]
+while True:
+    now = time.monotonic() - start
+    for n in range(threads):
+        if now >= next_report[n]:
+            next_report[n] += 3.0
+            print(f"[2024-01-06 12:00:00] CPU #{{n}}: 1.00 kH/s", flush=True)
+    time.sleep(0.02)
+'''
+
+
+def test_every_sample_sums_all_threads(tmp_path):
+    miner = tmp_path / 'cpuminer'
+    miner.write_text(FAKE_MINER)
+    miner.chmod(0o755)
+    job = TuneJob(100, 4, throttle_backend='threads', step_seconds=6.5, warmup_seconds=3.2, miner=str(miner))
+    result = job._measure({'phase': 1, 'threads': 4, 'affinity': 'none', 'cpus': None, 'cpu_percentage': 100})
+    assert result['error'] is None
+    assert result['samples'] >= 3
+    # Summing only the threads that reported since the warm-up gives 1000, 2000, 3000 here
+    assert result['hashrate_hs'] == 4000.0
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""CPU throttling backends for the miner process.
+
+    cgroup    cgroup v2 cpu.max quota on a child cgroup holding the miner.
+              The kernel scheduler enforces the budget per thread in 100 ms
+              periods - no signals, no whole-process stalls.
+    threads   cpuminer -t N with N = the budget in whole cores. No
+              throttling at all, but only in whole-core steps.
+    cpulimit  SIGSTOP/SIGCONT duty cycling of the whole process (the old
+              behaviour). Fallback for fractional budgets without cgroups;
+              the miner runs only as many threads as the budget needs
+              cores, so fewer threads are stalled.
+
+'auto' picks cgroup if writable, threads if the budget is a whole number
+of cores, then cpulimit if installed, else threads (over budget below one
+core, logged as a warning). Checking availability never changes the
+system; the miner cgroup is set up by the first attach().
+"""
+import errno
+import logging
+import math
+import os
+import shutil
+import subprocess
+
+log = logging.getLogger(__name__)
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+CGROUP_NAME = 'node-miner'
+CPU_PERIOD_US = 100000
+# Budgets this close to a whole number of cores run as plain threads
+WHOLE_CORE_TOLERANCE = 0.05
+
+BACKEND_NAMES = ('cgroup', 'threads', 'cpulimit')
+
+
+def target_cores(cpu_percentage, cpu_count):
+    """CPU budget in cores (50% of 4 cores = 2.0)"""
+    return cpu_percentage / 100.0 * cpu_count
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read().strip()
+
+
+def _write(path, value):
+    with open(path, 'w') as f:
+        f.write(value)
+
+
+def own_cgroup():
+    """Directory of this process's cgroup v2 (None without a v2 hierarchy)"""
+    if not os.path.exists(os.path.join(CGROUP_ROOT, 'cgroup.controllers')):
+        return None
+    try:
+        with open('/proc/self/cgroup') as f:
+            for line in f:
+                if line.startswith('0::'):
+                    return os.path.normpath(CGROUP_ROOT + line[3:].strip())
+    except OSError:
+        pass
+    return None
+
+
+class Throttle:
+    """Base class: no throttling, all threads"""
+    name = None
+
+    def __init__(self, cpu_percentage, cpu_count, threads=None):
+        self.cpu_percentage = cpu_percentage
+        self.cpu_count = cpu_count
+        self.fixed_threads = threads  # e.g. from a tune profile
+
+    @property
+    def cores(self):
+        return target_cores(self.cpu_percentage, self.cpu_count)
+
+    def threads(self):
+        """Value for cpuminer -t (0 = all cores)"""
+        return self.fixed_threads or self._auto_threads()
+
+    def _auto_threads(self):
+        return 0
+
+    def attach(self, pid):
+        """Apply the limit to the started miner process"""
+
+    def set_percentage(self, cpu_percentage):
+        """Change the budget while mining. Returns False if a restart is needed."""
+        return False
+
+    def release(self):
+        """Remove the limit (miner stopped)"""
+
+    @property
+    def active(self):
+        return True
+
+    def describe(self):
+        return {
+            'backend': self.name,
+            'cpu_percentage': self.cpu_percentage,
+            'target_cores': round(self.cores, 2),
+            'threads': self.threads() or self.cpu_count
+        }
+
+
+class CgroupThrottle(Throttle):
+    name = 'cgroup'
+    _path = None  # Miner cgroup, created by the first attach()
+    _available = None
+
+    @classmethod
+    def available(cls):
+        """Read-only check (cached): cgroup v2 with the cpu controller and a writable cgroup"""
+        if cls._available is None:
+            base = own_cgroup()
+            try:
+                cls._available = (base is not None
+                                  and 'cpu' in _read(os.path.join(base, 'cgroup.controllers')).split()
+                                  and os.access(base, os.W_OK)
+                                  and os.access(os.path.join(base, 'cgroup.subtree_control'), os.W_OK))
+            except OSError:
+                cls._available = False
+        return cls._available
+
+    @classmethod
+    def prepare(cls):
+        """Create the miner cgroup with the cpu controller (once, when the backend is used). Returns its path."""
+        if cls._path is not None:
+            return cls._path
+        base = own_cgroup()
+        if base is None:
+            raise OSError(errno.ENOENT, "no cgroup v2 hierarchy")
+        if 'cpu' not in _read(os.path.join(base, 'cgroup.subtree_control')).split():
+            try:
+                _write(os.path.join(base, 'cgroup.subtree_control'), '+cpu')
+            except OSError as e:
+                if e.errno != errno.EBUSY:
+                    raise
+                # "No internal processes": in a container our processes sit in the
+                # namespace root, so move them into a leaf before enabling controllers
+                leaf = os.path.join(base, 'app')
+                os.makedirs(leaf, exist_ok=True)
+                for pid in _read(os.path.join(base, 'cgroup.procs')).split():
+                    try:
+                        _write(os.path.join(leaf, 'cgroup.procs'), pid)
+                    except OSError:
+                        pass
+                _write(os.path.join(base, 'cgroup.subtree_control'), '+cpu')
+        path = os.path.join(base, CGROUP_NAME)
+        os.makedirs(path, exist_ok=True)
+        _write(os.path.join(path, 'cpu.max'), f'max {CPU_PERIOD_US}')
+        cls._path = path
+        return path
+
+    def _quota(self):
+        return max(1000, int(CPU_PERIOD_US * self.cores))
+
+    def attach(self, pid):
+        path = self.prepare()
+        _write(os.path.join(path, 'cpu.max'), f'{self._quota()} {CPU_PERIOD_US}')
+        # Threads follow the process into the cgroup
+        _write(os.path.join(path, 'cgroup.procs'), str(pid))
+        log.info(f"cgroup cpu.max set to {self._quota()}/{CPU_PERIOD_US} ({self.cores:.2f} cores)")
+
+    def set_percentage(self, cpu_percentage):
+        self.cpu_percentage = cpu_percentage
+        if self._path is not None:
+            _write(os.path.join(self._path, 'cpu.max'), f'{self._quota()} {CPU_PERIOD_US}')
+        return True
+
+    def release(self):
+        if self._path is None:
+            return
+        try:
+            _write(os.path.join(self._path, 'cpu.max'), f'max {CPU_PERIOD_US}')
+        except OSError:
+            pass
+
+    def describe(self):
+        info = super().describe()
+        info['cgroup'] = self._path
+        info['quota_us'] = self._quota()
+        info['period_us'] = CPU_PERIOD_US
+        return info
+
+
+class ThreadThrottle(Throttle):
+    name = 'threads'
+
+    @classmethod
+    def available(cls):
+        return True
+
+    def _auto_threads(self):
+        return max(1, min(self.cpu_count, round(self.cores)))
+
+
+class CpulimitThrottle(Throttle):
+    name = 'cpulimit'
+
+    def __init__(self, cpu_percentage, cpu_count, threads=None):
+        super().__init__(cpu_percentage, cpu_count, threads)
+        self.process = None
+        self.pid = None
+
+    @classmethod
+    def available(cls):
+        return shutil.which('cpulimit') is not None
+
+    @property
+    def limit(self):
+        """cpulimit -l value: percent of ONE core (4 cores at 50% = 200)"""
+        return int(self.cpu_percentage * self.cpu_count)
+
+    def _auto_threads(self):
+        return max(1, min(self.cpu_count, math.ceil(self.cores - WHOLE_CORE_TOLERANCE)))
+
+    def attach(self, pid):
+        self.pid = pid
+        self.process = subprocess.Popen(
+            ['cpulimit', '-p', str(pid), '-l', str(self.limit),
+             '-z'],  # exit when the miner exits
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        log.info(f"cpulimit started with PID: {self.process.pid} (limit {self.limit}%)")
+
+    def set_percentage(self, cpu_percentage):
+        # cpulimit can't change its limit, restart it
+        self.cpu_percentage = cpu_percentage
+        if self.pid is None:
+            return True
+        self._stop()
+        self.attach(self.pid)
+        return True
+
+    def _stop(self):
+        if self.process is None or self.process.poll() is not None:
+            return
+        try:
+            self.process.terminate()
+            self.process.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+    def release(self):
+        self._stop()
+        self.pid = None
+
+    @property
+    def active(self):
+        return self.process is not None and self.process.poll() is None
+
+    def describe(self):
+        info = super().describe()
+        info['cpulimit'] = self.limit
+        return info
+
+
+BACKENDS = {
+    'cgroup': CgroupThrottle,
+    'threads': ThreadThrottle,
+    'cpulimit': CpulimitThrottle
+}
+
+
+def available_backends():
+    """{backend name: usable on this system}"""
+    return {name: BACKENDS[name].available() for name in BACKEND_NAMES}
+
+
+def create_throttle(preference, cpu_percentage, cpu_count, threads=None):
+    """Throttle for the configured backend ('auto' or a name), falling back if unavailable.
+
+    threads fixes the miner thread count instead of deriving it from the budget.
+    """
+    if preference in BACKENDS and BACKENDS[preference].available():
+        return BACKENDS[preference](cpu_percentage, cpu_count, threads)
+    if preference not in ('auto', None):
+        log.warning(f"Throttle backend '{preference}' not available, choosing automatically")
+
+    cores = target_cores(cpu_percentage, cpu_count)
+    if threads and threads <= cores + WHOLE_CORE_TOLERANCE:
+        # Fewer threads than the budget - nothing to throttle
+        return ThreadThrottle(cpu_percentage, cpu_count, threads)
+    if CgroupThrottle.available():
+        return CgroupThrottle(cpu_percentage, cpu_count, threads)
+    if not threads and cores >= 1 and abs(cores - round(cores)) <= WHOLE_CORE_TOLERANCE:
+        return ThreadThrottle(cpu_percentage, cpu_count)
+    if CpulimitThrottle.available():
+        return CpulimitThrottle(cpu_percentage, cpu_count, threads)
+    throttle = ThreadThrottle(cpu_percentage, cpu_count, threads)
+    if throttle.threads() > cores + WHOLE_CORE_TOLERANCE:
+        log.warning(f"No cgroup quota or cpulimit: running {throttle.threads()} threads unthrottled, "
+                    f"above the budget of {cores:.2f} cores")
+    return throttle
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Local fake Stratum v1 pool for testing the probe (and anything else
+that talks Stratum) without network access.
+
+Usage:
+    python3 tools/fake_stratum.py [--port 3333] [--difficulty 0.1]
+                                  [--delay-ms 0] [--reject-auth] [--drop]
+
+Then test against stratum+tcp://127.0.0.1:3333. It answers
+mining.subscribe / mining.authorize, sends mining.set_difficulty and a
+mining.notify job after authorize, accepts every mining.submit and sends
+a fresh job every --job-interval seconds.
+
+FakeStratumServer can also be started from Python (e.g. in a thread)
+with start_in_thread(), which returns once the port is listening.
+"""
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+
+
+class FakeStratumServer:
+    """Scriptable Stratum v1 pool"""
+
+    def __init__(self, host='127.0.0.1', port=0, difficulty=0.1, delay_ms=0,
+                 reject_auth=False, drop=False, extranonce2_size=4, job_interval=30.0):
+        self.host = host
+        self.port = port
+        self.difficulty = difficulty
+        self.delay_ms = delay_ms
+        self.reject_auth = reject_auth
+        self.drop = drop
+        self.extranonce2_size = extranonce2_size
+        self.job_interval = job_interval
+        self.connections = 0
+        self.submits = []
+        self._job = 0
+        self._server = None
+        self._loop = None
+        self._ready = threading.Event()
+
+    def _next_job(self):
+        self._job += 1
+        prevhash = os.urandom(32).hex()
+        return {
+            'id': None,
+            'method': 'mining.notify',
+            'params': [f'{self._job:x}', prevhash, '01000000010000', 'ffffffff01', [],
+                       '20000000', '1703a30c', f'{int(time.time()):08x}', True]
+        }
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        extranonce1 = f'{self.connections:08x}'
+        if self.drop:
+            writer.close()
+            return
+
+        async def send(message):
+            writer.write(json.dumps(message).encode('utf-8') + b'\n')
+            await writer.drain()
+
+        async def job_loop():
+            while True:
+                await asyncio.sleep(self.job_interval)
+                await send(self._next_job())
+
+        jobs = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    continue
+                if self.delay_ms:
+                    await asyncio.sleep(self.delay_ms / 1000)
+                method = request.get('method')
+                msg_id = request.get('id')
+
+                if method == 'mining.subscribe':
+                    await send({'id': msg_id, 'error': None, 'result': [
+                        [['mining.set_difficulty', extranonce1], ['mining.notify', extranonce1]],
+                        extranonce1, self.extranonce2_size]})
+                elif method == 'mining.authorize':
+                    if self.reject_auth:
+                        await send({'id': msg_id, 'result': None, 'error': [24, 'Unauthorized worker', None]})
+                        continue
+                    await send({'id': msg_id, 'result': True, 'error': None})
+                    await send({'id': None, 'method': 'mining.set_difficulty', 'params': [self.difficulty]})
+                    await send(self._next_job())
+                    if jobs is None:
+                        jobs = asyncio.ensure_future(job_loop())
+                elif method == 'mining.submit':
+                    self.submits.append(request.get('params'))
+                    await send({'id': msg_id, 'result': True, 'error': None})
+                elif method == 'mining.extranonce.subscribe':
+                    await send({'id': msg_id, 'result': True, 'error': None})
+                else:
+                    await send({'id': msg_id, 'result': None, 'error': [20, 'Unsupported method', None]})
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            if jobs is not None:
+                jobs.cancel()
+            writer.close()
+
+    async def serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        async with self._server:
+            try:
+                await self._server.serve_forever()
+            except asyncio.CancelledError:
+                pass  # stop()
+
+    @property
+    def url(self):
+        return f'stratum+tcp://{self.host}:{self.port}'
+
+    def start_in_thread(self):
+        """Run the server on a daemon thread, return once it is listening"""
+        thread = threading.Thread(target=lambda: asyncio.run(self.serve()), daemon=True)
+        thread.start()
+        self._ready.wait(5)
+        return self
+
+    def stop(self):
+        if self._loop is not None and self._server is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3333)
+    parser.add_argument('--difficulty', type=float, default=0.1)
+    parser.add_argument('--delay-ms', type=int, default=0, help='delay before every reply')
+    parser.add_argument('--reject-auth', action='store_true', help='refuse mining.authorize')
+    parser.add_argument('--drop', action='store_true', help='close connections immediately')
+    parser.add_argument('--job-interval', type=float, default=30.0)
+    args = parser.parse_args()
+
+    server = FakeStratumServer(args.host, args.port, args.difficulty, args.delay_ms,
+                               args.reject_auth, args.drop, job_interval=args.job_interval)
+    print(f"Fake Stratum pool listening on {args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""Benchmark sweep ("tune") that finds the best miner profile for this box.
+
+Runs `cpuminer --benchmark` (no pool involved) in two phases:
+
+  1. every thread count x CPU affinity layout at the configured CPU budget
+  2. lower throttle levels for the winner of phase 1
+
+Each step discards a warm-up period, then measures the steady-state
+hashrate (median of the summed per-core rates), the hashes per
+CPU-second (psutil CPU time of the miner) and the peak temperature.
+The best profile is the fastest one at the configured budget, unless a
+lower throttle level gets within LEVEL_TOLERANCE of it - then the cooler,
+more efficient level wins.
+"""
+import glob
+import logging
+import statistics
+import subprocess
+import time
+from threading import Thread, Event, Lock
+
+import psutil
+
+from miner_parser import parse_line, CoreHashrate
+from throttle import create_throttle, target_cores
+
+log = logging.getLogger(__name__)
+
+# A lower throttle level wins if it reaches this share of the best hashrate
+LEVEL_TOLERANCE = 0.97
+LEVEL_FACTORS = (0.75, 0.5)
+
+
+def physical_core_cpus():
+    """One logical CPU per physical core (first SMT sibling), sorted"""
+    cpus = set()
+    for path in glob.glob('/sys/devices/system/cpu/cpu[0-9]*/topology/thread_siblings_list'):
+        try:
+            with open(path) as f:
+                first = f.read().strip().replace('-', ',').split(',')[0]
+            cpus.add(int(first))
+        except (OSError, ValueError):
+            pass
+    return sorted(cpus)
+
+
+def affinity_mask(cpus):
+    """cpuminer --cpu-affinity mask for a list of logical CPUs"""
+    mask = 0
+    for cpu in cpus:
+        mask |= 1 << cpu
+    return hex(mask)
+
+
+def affinity_layouts(threads, cpus):
+    """{layout name: CPU list or None} worth trying for a thread count on the given CPUs"""
+    layouts = {'none': None}
+    if threads >= len(cpus):
+        return layouts
+    compact = cpus[:threads]
+    layouts['compact'] = compact
+    physical = [cpu for cpu in physical_core_cpus() if cpu in cpus]
+    if len(physical) >= threads and physical[:threads] != compact:
+        # SMT box: one thread per physical core before sharing a core
+        layouts['spread'] = physical[:threads]
+    return layouts
+
+
+def thread_counts(cpu_count, cores):
+    """1, 2, 4, ... up to all CPUs plus the budget rounded up"""
+    counts = set()
+    n = 1
+    while n < cpu_count:
+        counts.add(n)
+        n *= 2
+    counts.add(cpu_count)
+    counts.add(max(1, min(cpu_count, round(cores + 0.49))))
+    return sorted(counts)
+
+
+class TuneJob:
+    """Background benchmark sweep with progress, results and cancellation"""
+
+    def __init__(self, cpu_percentage, cpu_count, throttle_backend='auto', step_seconds=20,
+                 warmup_seconds=5, algorithm='sha256d', temperature=None, miner='cpuminer', on_complete=None,
+                 cpus=None, preexec=None):
+        self.cpu_percentage = cpu_percentage
+        self.cpus = list(cpus) if cpus else list(range(cpu_count))  # CPU set of the miner (placement)
+        self.cpu_count = len(self.cpus)
+        self.preexec = preexec  # Popen preexec_fn applying nice/scheduling class/CPU set
+        self.throttle_backend = throttle_backend
+        self.step_seconds = step_seconds
+        self.warmup_seconds = warmup_seconds
+        self.algorithm = algorithm
+        self.temperature = temperature or (lambda: None)  # Callable returning the CPU temperature
+        self.miner = miner
+        self.on_complete = on_complete  # Called with the best profile when the sweep finishes
+        self.state = 'pending'
+        self.error = None
+        self.results = []
+        self.best = None
+        self.current = None
+        self.started_at = None
+        self.finished_at = None
+        self._plan = []
+        self._levels = []
+        self._cancel = Event()
+        self._lock = Lock()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self.state == 'running'
+
+    def plan_phase1(self):
+        cores = target_cores(self.cpu_percentage, self.cpu_count)
+        steps = []
+        for threads in thread_counts(self.cpu_count, cores):
+            for layout, cpus in affinity_layouts(threads, self.cpus).items():
+                steps.append({'phase': 1, 'threads': threads, 'affinity': layout, 'cpus': cpus,
+                              'cpu_percentage': self.cpu_percentage})
+        return steps
+
+    def start(self):
+        self._plan = self.plan_phase1()
+        self._levels = sorted({max(1, round(self.cpu_percentage * f)) for f in LEVEL_FACTORS}
+                              - {self.cpu_percentage}, reverse=True)
+        self.state = 'running'
+        self.started_at = time.time()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def progress(self):
+        with self._lock:
+            total = len(self._plan) + len(self._levels)
+            done = len(self.results)
+            remaining = max(0, total - done)
+            return {
+                'state': self.state,
+                'error': self.error,
+                'step': done,
+                'total_steps': total,
+                'percent': round(100.0 * done / total, 1) if total else 0.0,
+                'eta_seconds': remaining * self.step_seconds if self.running else 0,
+                'current': self.current,
+                'cpu_percentage': self.cpu_percentage,
+                'step_seconds': self.step_seconds,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'results': list(self.results),
+                'best': self.best
+            }
+
+    def _run(self):
+        try:
+            for step in self._plan:
+                if self._cancel.is_set():
+                    break
+                self._record(step, self._measure(step))
+
+            phase1 = [r for r in self.results if r['phase'] == 1 and r['hashrate_hs'] > 0]
+            if phase1:
+                winner = max(phase1, key=lambda r: r['hashrate_hs'])
+                for level in self._levels:
+                    if self._cancel.is_set():
+                        break
+                    step = {'phase': 2, 'threads': winner['threads'], 'affinity': winner['affinity'],
+                            'cpus': winner['cpus'], 'cpu_percentage': level}
+                    self._record(step, self._measure(step))
+
+            self.best = self._choose_best()
+            if self._cancel.is_set():
+                self.state = 'cancelled'
+            else:
+                if self.best is not None and self.on_complete is not None:
+                    self.on_complete(self.best)
+                self.state = 'done'
+        except Exception as e:
+            self.error = str(e)
+            self.state = 'failed'
+            log.warning(f"Tune job failed: {e}")
+        finally:
+            self.current = None
+            self.finished_at = time.time()
+
+    def _record(self, step, measurement):
+        if measurement is None:
+            return
+        result = dict(step)
+        result.update(measurement)
+        with self._lock:
+            self.results.append(result)
+        log.info(f"Tune: {result['threads']} threads, affinity {result['affinity']}, "
+                 f"{result['cpu_percentage']}% via {result['backend']}: {result['hashrate_hs']:.0f} H/s, "
+                 f"{result['hashes_per_cpu_second']:.0f} H/CPU-s, temp {result['temp_max']}")
+
+    def _choose_best(self):
+        phase1 = [r for r in self.results if r['phase'] == 1 and r['hashrate_hs'] > 0]
+        if not phase1:
+            return None
+        best = max(phase1, key=lambda r: r['hashrate_hs'])
+        for result in sorted((r for r in self.results if r['phase'] == 2), key=lambda r: r['cpu_percentage']):
+            if result['hashrate_hs'] >= best['hashrate_hs'] * LEVEL_TOLERANCE:
+                best = result
+                break
+        return {
+            'threads': best['threads'],
+            'affinity': best['affinity'],
+            'cpus': best['cpus'],
+            'cpu_percentage': best['cpu_percentage'],
+            'backend': best['backend'],
+            'hashrate_hs': best['hashrate_hs'],
+            'hashes_per_cpu_second': best['hashes_per_cpu_second'],
+            'temp_max': best['temp_max'],
+            'cpu_count': self.cpu_count,
+            'algorithm': self.algorithm,
+            'tuned_at': time.time()
+        }
+
+    def _measure(self, step):
+        """Run one benchmark step, returns the measurement or None if cancelled"""
+        throttle = create_throttle(self.throttle_backend, step['cpu_percentage'], self.cpu_count, step['threads'])
+        cmd = [self.miner, '-a', self.algorithm, '--benchmark', '-t', str(step['threads']), '--no-color']
+        if step['cpus'] is not None:
+            cmd += ['--cpu-affinity', affinity_mask(step['cpus'])]
+        self.current = dict(step, backend=throttle.name, started_at=time.time())
+
+        cores = {}
+        samples = []
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, preexec_fn=self.preexec)
+
+        def read_output():
+            for line in iter(process.stdout.readline, b''):
+                event = parse_line(line.decode('utf-8', errors='ignore').strip())
+                if type(event) is CoreHashrate:
+                    cores[event.core] = event.hs
+
+        reader = Thread(target=read_output, daemon=True)
+        reader.start()
+        try:
+            throttle.attach(process.pid)
+            proc = psutil.Process(process.pid)
+            if self._cancel.wait(self.warmup_seconds):
+                return None
+            if process.poll() is not None:
+                return {'backend': throttle.name, 'hashrate_hs': 0.0, 'cpu_seconds': 0.0,
+                        'hashes_per_cpu_second': 0.0, 'temp_max': None, 'samples': 0,
+                        'error': f"miner exited with code {process.returncode}"}
+
+            # Steady state. Each thread's latest rate is kept from the warm-up on and replaced
+            # by its next report - after a clear, the first samples would only sum the threads
+            # that happened to report already, and throttled levels (fewer reports) more often.
+            cpu_start = sum(proc.cpu_times()[:2])
+            started = time.monotonic()
+            temps = []
+            while time.monotonic() - started < self.step_seconds - self.warmup_seconds:
+                if self._cancel.wait(1.0) or process.poll() is not None:
+                    break
+                rates = list(cores.values())
+                if len(rates) >= step['threads']:
+                    samples.append(sum(rates))
+                temp = self.temperature()
+                if temp is not None:
+                    temps.append(temp)
+            if self._cancel.is_set():
+                return None
+            elapsed = time.monotonic() - started
+            cpu_seconds = sum(proc.cpu_times()[:2]) - cpu_start
+        finally:
+            throttle.release()
+            process.terminate()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+            reader.join(1)  # Sees EOF once the miner is gone
+            process.stdout.close()
+
+        hashrate = statistics.median(samples) if samples else 0.0
+        return {
+            'backend': throttle.name,
+            'hashrate_hs': hashrate,
+            'cpu_seconds': round(cpu_seconds, 2),
+            'hashes_per_cpu_second': hashrate * elapsed / cpu_seconds if cpu_seconds > 0 else 0.0,
+            'temp_max': max(temps) if temps else None,
+            'samples': len(samples),
+            'error': None if samples else "not every miner thread reported a rate"
+        }
+